@@ -0,0 +1,120 @@
+"""Catalog listing throughput of the SQL and columnar catalog engines.
+
+    python -m api.benchmarks.bench_catalog --products 50000 --requests 200
+
+Every engine answers the same mix of filtered, sorted and deep page requests
+on ``GET /product/product``. The response cache is disabled so each request
+reaches the engine."""
+
+from api.benchmarks.common import (
+    configure_environment,
+    elapsed_ms,
+    print_table,
+    summarize,
+)
+
+configure_environment()
+
+import argparse  # noqa: E402
+import asyncio  # noqa: E402
+import random  # noqa: E402
+import time  # noqa: E402
+
+import httpx  # noqa: E402
+
+from api.config import config  # noqa: E402
+from api.database import category_table, database, product_table  # noqa: E402
+from api.main import app  # noqa: E402
+from api.utils.columnar_helpers import columnar_catalog  # noqa: E402
+from api.utils.counter_helpers import get_row_count  # noqa: E402
+from api.utils.response_cache_helpers import response_cache  # noqa: E402
+
+WORDS = ["apple", "chair", "lamp", "table", "shirt", "phone", "bottle", "desk"]
+SORTS = [None, "price", "-price", "name", "-name"]
+
+
+async def seed(products: int, rng: random.Random) -> None:
+    category_ids = [
+        await database.execute(category_table.insert().values(name=f"Category {i}"))
+        for i in range(20)
+    ]
+    await database.execute(
+        product_table.insert().values(
+            [
+                {
+                    "name": f"{rng.choice(WORDS).title()} {rng.choice(WORDS)} {i}",
+                    "description": f"{rng.choice(WORDS)} {rng.choice(WORDS)}",
+                    "price_cents": rng.randint(100, 50000),
+                    "category_id": rng.choice(category_ids),
+                }
+                for i in range(products)
+            ]
+        )
+    )
+    await get_row_count(database, product_table)
+
+
+def make_requests(count: int, rng: random.Random) -> list[dict]:
+    requests = []
+    for _ in range(count):
+        params = {"page": rng.choice([1, 2, 5, 50]), "per_page": 20}
+        if sort := rng.choice(SORTS):
+            params["sort"] = sort
+        if rng.random() < 0.5:
+            params["name"] = rng.choice(WORDS)
+        if rng.random() < 0.2:
+            params["description"] = rng.choice(WORDS)
+        requests.append(params)
+    return requests
+
+
+async def run(engine: str, requests: list[dict]) -> dict:
+    config.CATALOG_ENGINE = engine
+    async with httpx.AsyncClient(app=app, base_url="http://bench") as client:
+        # Load the columnar catalog outside of the measurement
+        (await client.get("/product/product")).raise_for_status()
+
+        samples = []
+        start = time.perf_counter()
+        for params in requests:
+            request_start = time.perf_counter()
+            response = await client.get("/product/product", params=params)
+            response.raise_for_status()
+            samples.append(elapsed_ms(request_start))
+        elapsed = time.perf_counter() - start
+
+    return {"req/s": len(requests) / elapsed, **summarize(samples)}
+
+
+async def main(args: argparse.Namespace) -> None:
+    if columnar_catalog is None:
+        raise SystemExit("The columnar engine needs numpy installed")
+
+    rng = random.Random(args.seed)
+    response_cache.max_bytes = 0
+
+    await database.connect()
+    try:
+        start = time.perf_counter()
+        await seed(args.products, rng)
+        print(f"Seeded {args.products} products in {elapsed_ms(start):.0f} ms")
+
+        requests = make_requests(args.requests, rng)
+        results = {
+            engine: await run(engine, requests) for engine in ("sql", "columnar")
+        }
+    finally:
+        await database.disconnect()
+
+    print_table(
+        f"Latency (ms), {args.requests} requests over {args.products} products",
+        results,
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--products", type=int, default=50_000)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,133 @@
+"""Product read latency with the categories join and with the category name map.
+
+    python -m api.benchmarks.bench_category_names --sizes 10000 100000 1000000
+
+The catalog grows to every size in turn. At each size both variants run the
+same listing and lookup queries: ``join`` is the products⋈categories select
+the routers used to run, ``map`` selects products alone and fills in
+``category_name`` from ``category_names``."""
+
+from api.benchmarks.common import (
+    configure_environment,
+    elapsed_ms,
+    print_table,
+    summarize,
+)
+
+configure_environment()
+
+import argparse  # noqa: E402
+import asyncio  # noqa: E402
+import random  # noqa: E402
+import time  # noqa: E402
+
+from sqlalchemy import select  # noqa: E402
+
+from api.database import (  # noqa: E402
+    category_table,
+    database,
+    product_price,
+    product_table,
+)
+from api.utils.category_helpers import with_category_names  # noqa: E402
+
+BATCH_SIZE = 5000
+
+PRODUCT_COLUMNS = [
+    product_table.c.name,
+    product_table.c.description,
+    product_price,
+    product_table.c.image,
+    product_table.c.id,
+    product_table.c.thumbnail,
+]
+
+
+def join_query():
+    return select(*PRODUCT_COLUMNS, category_table.c.name.label("category_name")).join(
+        category_table, product_table.c.category_id == category_table.c.id
+    )
+
+
+def map_query():
+    return select(*PRODUCT_COLUMNS, product_table.c.category_id)
+
+
+def queries(build, size: int, rng: random.Random) -> dict:
+    return {
+        "first page": lambda: build().limit(20),
+        "sort name": lambda: build().order_by("name", "id").limit(20),
+        "-price p50": lambda: build()
+        .order_by(product_price.desc(), "id")
+        .limit(20)
+        .offset(980),
+        "by id": lambda: build().where(product_table.c.id == rng.randint(1, size)),
+    }
+
+
+async def grow(category_ids: list[int], start: int, size: int, rng) -> None:
+    for first in range(start, size, BATCH_SIZE):
+        await database.execute(
+            product_table.insert().values(
+                [
+                    {
+                        "name": f"Product {rng.randrange(size)} {i}",
+                        "description": "Benchmark product",
+                        "price_cents": rng.randint(100, 50000),
+                        "category_id": rng.choice(category_ids),
+                    }
+                    for i in range(first, min(first + BATCH_SIZE, size))
+                ]
+            )
+        )
+
+
+async def measure(name: str, size: int, rng, repeat: int) -> dict:
+    build = join_query if name == "join" else map_query
+    results = {}
+    for label, query in queries(build, size, rng).items():
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            rows = await database.fetch_all(query())
+            if name == "map":
+                rows = await with_category_names(database, rows)
+            samples.append(elapsed_ms(start))
+        results[label] = summarize(samples)["p50"]
+    return results
+
+
+async def main(args: argparse.Namespace) -> None:
+    rng = random.Random(args.seed)
+    await database.connect()
+    try:
+        category_ids = [
+            await database.execute(category_table.insert().values(name=f"Category {i}"))
+            for i in range(args.categories)
+        ]
+
+        results = {}
+        count = 0
+        for size in sorted(args.sizes):
+            start = time.perf_counter()
+            await grow(category_ids, count, size, rng)
+            count = size
+            print(f"Grew the catalog to {size} products in {elapsed_ms(start):.0f} ms")
+
+            for name in ("join", "map"):
+                results[f"{size} {name}"] = await measure(name, size, rng, args.repeat)
+    finally:
+        await database.disconnect()
+
+    print_table(f"p50 latency (ms) of {args.repeat} runs per query", results)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000]
+    )
+    parser.add_argument("--categories", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,127 @@
+"""Request latency with DEBUG logging, handlers on the event loop against the log queue.
+
+    python -m api.benchmarks.bench_logging --requests 2000
+
+``direct`` attaches the Rich console and rotating JSON file handlers to the
+``api`` logger as configure_logging used to, ``queued`` is the current
+pipeline where requests only enqueue records for the listener thread and
+``sampled`` keeps the debug records of one request in ten. The console is
+rendered to /dev/null and api.log goes to the scratch directory."""
+
+import os
+
+from api.benchmarks.common import (
+    configure_environment,
+    elapsed_ms,
+    print_table,
+    summarize,
+)
+
+os.chdir(os.path.dirname(configure_environment()))
+
+import argparse  # noqa: E402
+import asyncio  # noqa: E402
+import logging  # noqa: E402
+import time  # noqa: E402
+
+import httpx  # noqa: E402
+from asgi_correlation_id import CorrelationIdFilter  # noqa: E402
+from rich.console import Console  # noqa: E402
+from rich.logging import RichHandler  # noqa: E402
+
+from api import logging_conf  # noqa: E402
+from api.config import config  # noqa: E402
+from api.database import category_table, database, product_table  # noqa: E402
+from api.main import app  # noqa: E402
+from api.utils.order_helpers import insert_rows  # noqa: E402
+from api.utils.response_cache_helpers import response_cache  # noqa: E402
+
+
+def quiet(handlers: list[logging.Handler]) -> list[logging.Handler]:
+    for handler in handlers:
+        if isinstance(handler, RichHandler):
+            handler.console = Console(file=open(os.devnull, "w"), force_terminal=True)
+    return handlers
+
+
+def configure_direct() -> None:
+    logging_conf.configure_logging()
+    logging_conf.stop_logging()
+    handlers = quiet(logging_conf.sink_handlers())
+    for handler in handlers:
+        handler.addFilter(CorrelationIdFilter(uuid_length=32, default_value="-"))
+    logging.getLogger("api").handlers = handlers
+
+
+def configure_queued() -> None:
+    logging_conf.configure_logging()
+    quiet(logging_conf.listener.handlers)
+
+
+def configure_sampled() -> None:
+    config.LOG_DEBUG_SAMPLE_RATE = 0.1
+    configure_queued()
+
+
+async def run(configure, args: argparse.Namespace) -> dict:
+    configure()
+    logging.getLogger("api").setLevel(logging.DEBUG)
+
+    async with httpx.AsyncClient(app=app, base_url="http://bench") as client:
+        samples = []
+        start = time.perf_counter()
+        for i in range(args.requests):
+            request_start = time.perf_counter()
+            response = await client.get(
+                "/product/product", params={"page": i % 10 + 1, "per_page": 20}
+            )
+            response.raise_for_status()
+            samples.append(elapsed_ms(request_start))
+        elapsed = time.perf_counter() - start
+
+    dropped = sum(logging_conf.log_queue_stats()["dropped"].values())
+    logging_conf.stop_logging()
+    return {"req/s": args.requests / elapsed, **summarize(samples), "dropped": dropped}
+
+
+async def main(args: argparse.Namespace) -> None:
+    response_cache.max_bytes = 0
+
+    await database.connect()
+    try:
+        category_id = await database.execute(
+            category_table.insert().values(name="Bench")
+        )
+        await insert_rows(
+            database,
+            product_table,
+            [
+                {
+                    "name": f"Product {i}",
+                    "description": "Bench product",
+                    "price_cents": 100,
+                    "category_id": category_id,
+                }
+                for i in range(args.products)
+            ],
+        )
+
+        results = {
+            name: await run(configure, args)
+            for name, configure in (
+                ("direct", configure_direct),
+                ("queued", configure_queued),
+                ("sampled", configure_sampled),
+            )
+        }
+    finally:
+        await database.disconnect()
+
+    print_table(f"Latency (ms) of {args.requests} requests at DEBUG", results)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--products", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=2000)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,131 @@
+"""Latency of GET /product/product while a storm of logins is running.
+
+    python -m api.benchmarks.bench_login_storm --logins 64 --concurrency 16
+
+Runs the same load twice: ``blocking`` checks passwords on the event loop as
+the handlers used to, ``executor`` goes through the bounded bcrypt pool."""
+
+from api.benchmarks.common import (
+    PASSWORD,
+    configure_environment,
+    elapsed_ms,
+    print_table,
+    summarize,
+)
+
+configure_environment()
+
+import argparse  # noqa: E402
+import asyncio  # noqa: E402
+import time  # noqa: E402
+
+import httpx  # noqa: E402
+
+from api import security  # noqa: E402
+from api.database import (  # noqa: E402
+    category_table,
+    database,
+    product_table,
+    user_table,
+)
+from api.main import app  # noqa: E402
+
+EMAIL = "storm@example.com"
+
+
+async def seed(products: int) -> None:
+    await database.execute(
+        user_table.insert().values(
+            email=EMAIL,
+            password=security.get_password_hash(PASSWORD),
+            confirmed=True,
+            role="client",
+        )
+    )
+    category_id = await database.execute(category_table.insert().values(name="Bench"))
+    await database.execute(
+        product_table.insert().values(
+            [
+                {
+                    "name": f"Product {i}",
+                    "description": "Benchmark product",
+                    "price_cents": i % 100 * 100,
+                    "category_id": category_id,
+                }
+                for i in range(products)
+            ]
+        )
+    )
+
+
+async def blocking_check_password(plain_password: str, hashed_password: str) -> bool:
+    return security.verify_password(plain_password, hashed_password)
+
+
+async def login_storm(client: httpx.AsyncClient, logins: int, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    statuses = []
+
+    async def login():
+        async with semaphore:
+            response = await client.post(
+                "/user/token", json={"email": EMAIL, "password": PASSWORD}
+            )
+            statuses.append(response.status_code)
+
+    await asyncio.gather(*(login() for _ in range(logins)))
+    return statuses
+
+
+async def catalog_reader(client: httpx.AsyncClient, stop: asyncio.Event):
+    samples = []
+    while not stop.is_set():
+        start = time.perf_counter()
+        await client.get("/product/product")
+        samples.append(elapsed_ms(start))
+    return samples
+
+
+async def run(mode: str, args: argparse.Namespace) -> dict[str, float]:
+    original = security.check_password
+    if mode == "blocking":
+        security.check_password = blocking_check_password
+    try:
+        async with httpx.AsyncClient(app=app, base_url="http://bench") as client:
+            stop = asyncio.Event()
+            readers = [
+                asyncio.create_task(catalog_reader(client, stop))
+                for _ in range(args.readers)
+            ]
+            statuses = await login_storm(client, args.logins, args.concurrency)
+            stop.set()
+            samples = [sample for reader in readers for sample in await reader]
+    finally:
+        security.check_password = original
+
+    result = summarize(samples)
+    result["rejected"] = statuses.count(503)
+    return result
+
+
+async def main(args: argparse.Namespace) -> None:
+    await database.connect()
+    await seed(args.products)
+    results = {mode: await run(mode, args) for mode in ("blocking", "executor")}
+    await database.disconnect()
+    security.password_executor.shutdown()
+
+    print_table(
+        f"GET /product/product latency (ms) during {args.logins} logins, "
+        f"{args.concurrency} concurrent",
+        results,
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logins", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--products", type=int, default=1000)
+    asyncio.run(main(parser.parse_args()))
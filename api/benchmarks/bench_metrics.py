@@ -0,0 +1,70 @@
+"""Per-request overhead of MetricsMiddleware.
+
+    python -m api.benchmarks.bench_metrics --requests 200000
+
+Drives a bare ASGI app that answers straight away, once on its own and once
+behind MetricsMiddleware, and reports the mean time per request in
+microseconds. The difference is what recording a request costs."""
+
+from api.benchmarks.common import configure_environment, print_table
+
+configure_environment()
+
+import argparse  # noqa: E402
+import asyncio  # noqa: E402
+import time  # noqa: E402
+
+from api.utils.metrics_helpers import MetricsMiddleware, RequestMetrics  # noqa: E402
+
+START = {"type": "http.response.start", "status": 200, "headers": []}
+BODY = {"type": "http.response.body", "body": b"{}"}
+
+
+class Route:
+    path = "/product/{product_id}"
+
+
+async def app(scope, receive, send) -> None:
+    scope["route"] = Route
+    await send(START)
+    await send(BODY)
+
+
+async def receive() -> dict:
+    return {"type": "http.request", "body": b""}
+
+
+async def send(message) -> None:
+    pass
+
+
+async def measure(asgi_app, requests: int) -> float:
+    scope = {"type": "http", "method": "GET", "path": "/product/1", "root_path": ""}
+    start = time.perf_counter()
+    for _ in range(requests):
+        await asgi_app(dict(scope), receive, send)
+    return (time.perf_counter() - start) / requests * 1_000_000
+
+
+async def main(args: argparse.Namespace) -> None:
+    instrumented = MetricsMiddleware(app, RequestMetrics())
+    # Warm up both paths before measuring
+    await measure(app, 1000)
+    await measure(instrumented, 1000)
+
+    bare = await measure(app, args.requests)
+    metered = await measure(instrumented, args.requests)
+    print_table(
+        f"Mean time per request (us) over {args.requests} requests",
+        {
+            "bare": {"us": bare},
+            "metrics": {"us": metered},
+            "overhead": {"us": metered - bare},
+        },
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200_000)
+    asyncio.run(main(parser.parse_args()))
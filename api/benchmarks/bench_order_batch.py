@@ -0,0 +1,121 @@
+"""Order ingestion throughput, one order per request against POST /order/batch.
+
+    python -m api.benchmarks.bench_order_batch --orders 2000 --items 5
+
+``single`` posts every order to POST /order/ in turn. The batch rows send the
+same orders to POST /order/batch in batches of the given size."""
+
+from api.benchmarks.common import PASSWORD, configure_environment, print_table
+
+configure_environment()
+
+import argparse  # noqa: E402
+import asyncio  # noqa: E402
+import random  # noqa: E402
+import time  # noqa: E402
+
+import httpx  # noqa: E402
+
+from api import security  # noqa: E402
+from api.database import (  # noqa: E402
+    category_table,
+    database,
+    product_table,
+    user_table,
+)
+from api.main import app  # noqa: E402
+
+EMAIL = "orders@example.com"
+
+
+async def seed(products: int) -> None:
+    await database.execute(
+        user_table.insert().values(
+            email=EMAIL,
+            password=security.get_password_hash(PASSWORD),
+            confirmed=True,
+            role="client",
+        )
+    )
+    category_id = await database.execute(category_table.insert().values(name="Bench"))
+    await database.execute(
+        product_table.insert().values(
+            [
+                {
+                    "name": f"Product {i}",
+                    "description": "Benchmark product",
+                    "price_cents": i % 100 * 100,
+                    "category_id": category_id,
+                }
+                for i in range(products)
+            ]
+        )
+    )
+
+
+def make_orders(args: argparse.Namespace, rng: random.Random) -> list[dict]:
+    return [
+        {
+            "delivery_address": f"{i} Main St",
+            "products": [
+                {
+                    "product_id": rng.randint(1, args.products),
+                    "quantity": rng.randint(1, 5),
+                }
+                for _ in range(args.items)
+            ],
+        }
+        for i in range(args.orders)
+    ]
+
+
+async def ingest(client: httpx.AsyncClient, orders: list[dict], batch: int) -> dict:
+    start = time.perf_counter()
+    if batch == 1:
+        for order in orders:
+            (await client.post("/order/", json=order)).raise_for_status()
+    else:
+        for first in range(0, len(orders), batch):
+            response = await client.post(
+                "/order/batch", json={"orders": orders[first : first + batch]}
+            )
+            response.raise_for_status()
+    elapsed = time.perf_counter() - start
+
+    return {"orders/s": len(orders) / elapsed, "requests": -(-len(orders) // batch)}
+
+
+async def main(args: argparse.Namespace) -> None:
+    orders = make_orders(args, random.Random(args.seed))
+
+    await database.connect()
+    try:
+        await seed(args.products)
+        async with httpx.AsyncClient(app=app, base_url="http://bench") as client:
+            response = await client.post(
+                "/user/token", json={"email": EMAIL, "password": PASSWORD}
+            )
+            token = response.json()["access_token"]
+            client.headers["Authorization"] = f"Bearer {token}"
+
+            results = {"single": await ingest(client, orders, 1)}
+            for batch in args.batch_sizes:
+                results[f"batch of {batch}"] = await ingest(client, orders, batch)
+    finally:
+        await database.disconnect()
+        security.password_executor.shutdown()
+
+    print_table(
+        f"{args.orders} orders of {args.items} items over {args.products} products",
+        results,
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--orders", type=int, default=2000)
+    parser.add_argument("--items", type=int, default=5)
+    parser.add_argument("--products", type=int, default=1000)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[100, 1000])
+    parser.add_argument("--seed", type=int, default=0)
+    asyncio.run(main(parser.parse_args()))
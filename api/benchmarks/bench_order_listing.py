@@ -0,0 +1,165 @@
+"""Order listing latency, items regrouped in Python against aggregated in SQLite.
+
+    python -m api.benchmarks.bench_order_listing --orders 2000 --widths 1 10 100
+
+For orders of every width, ``python`` runs the page query, fetches one row per
+line item and groups them in a dict as get_all_orders used to. ``json`` is
+the current listing, one row per order with ``order_products``."""
+
+from api.benchmarks.common import (
+    configure_environment,
+    elapsed_ms,
+    print_table,
+    summarize,
+)
+
+configure_environment()
+
+import argparse  # noqa: E402
+import asyncio  # noqa: E402
+import random  # noqa: E402
+import time  # noqa: E402
+from datetime import datetime  # noqa: E402
+
+from sqlalchemy.sql import select  # noqa: E402
+
+from api.database import (  # noqa: E402
+    category_table,
+    database,
+    order_item_table,
+    order_table,
+    product_table,
+    user_table,
+)
+from api.utils.order_helpers import (  # noqa: E402
+    insert_rows,
+    order_from_row,
+    order_products,
+)
+
+ORDER_COLUMNS = [
+    order_table.c.id,
+    order_table.c.delivery_address,
+    order_table.c.order_date,
+    order_table.c.payment_due_date,
+    order_table.c.total_cents,
+    order_table.c.customer_id,
+]
+
+
+async def seed(orders: int, width: int, products: int, rng: random.Random):
+    """Insert ``orders`` orders of ``width`` items, return their id range."""
+    order_ids = await insert_rows(
+        database,
+        order_table,
+        [
+            {
+                "delivery_address": f"{i} Main St",
+                "order_date": datetime.utcnow(),
+                "payment_due_date": datetime.utcnow(),
+                "total_cents": 1000,
+                "customer_id": 1,
+            }
+            for i in range(orders)
+        ],
+    )
+    await insert_rows(
+        database,
+        order_item_table,
+        [
+            {
+                "order_id": order_id,
+                "product_id": rng.randint(1, products),
+                "quantity": rng.randint(1, 5),
+            }
+            for order_id in order_ids
+            for _ in range(width)
+        ],
+    )
+    return order_ids[0], order_ids[-1]
+
+
+async def python_page(first: int, last: int, offset: int, per_page: int) -> list:
+    query = (
+        select(*ORDER_COLUMNS)
+        .where(order_table.c.id.between(first, last))
+        .limit(per_page)
+        .offset(offset)
+    )
+    orders = {
+        row.id: {**row._mapping, "products": []}
+        for row in await database.fetch_all(query)
+    }
+    items_query = select(
+        order_item_table.c.order_id,
+        order_item_table.c.product_id,
+        order_item_table.c.quantity,
+    ).where(order_item_table.c.order_id.in_(list(orders)))
+    for item in await database.fetch_all(items_query):
+        orders[item.order_id]["products"].append(
+            {"product_id": item.product_id, "quantity": item.quantity}
+        )
+    return list(orders.values())
+
+
+async def json_page(first: int, last: int, offset: int, per_page: int) -> list:
+    query = (
+        select(*ORDER_COLUMNS, order_products)
+        .where(order_table.c.id.between(first, last))
+        .limit(per_page)
+        .offset(offset)
+    )
+    return [order_from_row(row) for row in await database.fetch_all(query)]
+
+
+async def measure(page, first: int, last: int, args, rng) -> dict:
+    samples = []
+    for _ in range(args.repeat):
+        offset = rng.randrange(0, args.orders - args.per_page)
+        start = time.perf_counter()
+        await page(first, last, offset, args.per_page)
+        samples.append(elapsed_ms(start))
+    return summarize(samples)
+
+
+async def main(args: argparse.Namespace) -> None:
+    rng = random.Random(args.seed)
+    await database.connect()
+    try:
+        await database.execute(user_table.insert().values(email="bench@example.com"))
+        category_id = await database.execute(
+            category_table.insert().values(name="Bench")
+        )
+        await insert_rows(
+            database,
+            product_table,
+            [
+                {"name": f"Product {i}", "price_cents": 100, "category_id": category_id}
+                for i in range(args.products)
+            ],
+        )
+
+        results = {}
+        for width in args.widths:
+            first, last = await seed(args.orders, width, args.products, rng)
+            for name, page in (("python", python_page), ("json", json_page)):
+                results[f"{width} items {name}"] = await measure(
+                    page, first, last, args, rng
+                )
+    finally:
+        await database.disconnect()
+
+    print_table(
+        f"Latency (ms) of {args.repeat} pages of {args.per_page} orders", results
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--orders", type=int, default=2000)
+    parser.add_argument("--widths", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--per-page", type=int, default=50)
+    parser.add_argument("--products", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,180 @@
+"""Sales report latency from the rollups against aggregating the order history.
+
+    python -m api.benchmarks.bench_reports --histories 10000 100000
+
+The order history grows to every size in turn, spread over a year. ``scan``
+aggregates orders and order_items for the report, ``rollup`` reads the
+rollup tables kept up to date by update_rollups."""
+
+from api.benchmarks.common import (
+    configure_environment,
+    elapsed_ms,
+    print_table,
+    summarize,
+)
+
+configure_environment()
+
+import argparse  # noqa: E402
+import asyncio  # noqa: E402
+import random  # noqa: E402
+import time  # noqa: E402
+from datetime import datetime, timedelta  # noqa: E402
+
+from sqlalchemy import distinct, func  # noqa: E402
+from sqlalchemy.sql import select  # noqa: E402
+
+from api.database import (  # noqa: E402
+    category_table,
+    database,
+    order_item_table,
+    order_table,
+    product_table,
+    sales_by_day_table,
+    sales_by_product_table,
+    user_table,
+)
+from api.utils.order_helpers import insert_rows, line_total  # noqa: E402
+from api.utils.rollup_helpers import update_rollups  # noqa: E402
+
+ITEMS_PER_ORDER = 3
+
+
+def daily_scan(start: str):
+    day = func.date(order_table.c.order_date).label("day")
+    return (
+        select(
+            day,
+            func.count(distinct(order_table.c.id)),
+            func.sum(order_item_table.c.quantity),
+            func.sum(line_total),
+        )
+        .select_from(
+            order_table.join(
+                order_item_table, order_item_table.c.order_id == order_table.c.id
+            )
+        )
+        .where(order_table.c.order_date >= start)
+        .group_by(day)
+    )
+
+
+def top_products_scan():
+    revenue = func.sum(line_total).label("revenue")
+    return (
+        select(
+            order_item_table.c.product_id,
+            func.sum(order_item_table.c.quantity),
+            revenue,
+        )
+        .group_by(order_item_table.c.product_id)
+        .order_by(revenue.desc())
+        .limit(10)
+    )
+
+
+def daily_rollup(start: str):
+    return select(sales_by_day_table).where(sales_by_day_table.c.day >= start[:10])
+
+
+def top_products_rollup():
+    return (
+        select(sales_by_product_table)
+        .order_by(sales_by_product_table.c.revenue_cents.desc())
+        .limit(10)
+    )
+
+
+async def grow(start: int, size: int, products: int, rng: random.Random) -> None:
+    now = datetime.utcnow()
+    for first in range(start, size, 5000):
+        count = min(5000, size - first)
+        order_ids = await insert_rows(
+            database,
+            order_table,
+            [
+                {
+                    "delivery_address": "1 Main St",
+                    "order_date": now - timedelta(minutes=rng.randrange(525_600)),
+                    "total_cents": 0,
+                    "customer_id": 1,
+                }
+                for _ in range(count)
+            ],
+        )
+        await insert_rows(
+            database,
+            order_item_table,
+            [
+                {
+                    "order_id": order_id,
+                    "product_id": rng.randint(1, products),
+                    "quantity": rng.randint(1, 5),
+                    "unit_price_cents": rng.randint(100, 10_000),
+                }
+                for order_id in order_ids
+                for _ in range(ITEMS_PER_ORDER)
+            ],
+        )
+        await update_rollups(database, order_ids[0], order_ids[-1])
+
+
+async def measure(query, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await database.fetch_all(query)
+        samples.append(elapsed_ms(start))
+    return summarize(samples)["p50"]
+
+
+async def main(args: argparse.Namespace) -> None:
+    rng = random.Random(args.seed)
+    start = (datetime.utcnow() - timedelta(days=30)).isoformat(" ")
+
+    await database.connect()
+    try:
+        await database.execute(user_table.insert().values(email="bench@example.com"))
+        category_id = await database.execute(
+            category_table.insert().values(name="Bench")
+        )
+        await insert_rows(
+            database,
+            product_table,
+            [
+                {"name": f"Product {i}", "price_cents": 100, "category_id": category_id}
+                for i in range(args.products)
+            ],
+        )
+
+        results = {}
+        count = 0
+        for size in sorted(args.histories):
+            await grow(count, size, args.products, rng)
+            count = size
+            results[f"{size} scan"] = {
+                "daily 30d": await measure(daily_scan(start), args.repeat),
+                "top 10": await measure(top_products_scan(), args.repeat),
+            }
+            results[f"{size} rollup"] = {
+                "daily 30d": await measure(daily_rollup(start), args.repeat),
+                "top 10": await measure(top_products_rollup(), args.repeat),
+            }
+    finally:
+        await database.disconnect()
+
+    print_table(
+        f"p50 latency (ms) of {args.repeat} runs, {ITEMS_PER_ORDER} items per order",
+        results,
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--histories", type=int, nargs="+", default=[10_000, 100_000, 1_000_000]
+    )
+    parser.add_argument("--products", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,120 @@
+"""Thumbnail grid page views per second with plain and cache-aware static files.
+
+    python -m api.benchmarks.bench_static --grid 24 --pages 200
+
+Each page view loads every thumbnail of a catalog grid through a browser-like
+private cache. ``StaticFiles`` sends no Cache-Control, so every view
+revalidates every thumbnail. ``ImageFiles`` marks content-addressed names
+immutable and repeat views are served from the cache. ``cold`` fetches the
+whole grid without any cache."""
+
+from api.benchmarks.common import configure_environment, print_table
+
+configure_environment()
+
+import argparse  # noqa: E402
+import asyncio  # noqa: E402
+import hashlib  # noqa: E402
+import re  # noqa: E402
+import tempfile  # noqa: E402
+import time  # noqa: E402
+from io import BytesIO  # noqa: E402
+from pathlib import Path  # noqa: E402
+from typing import NamedTuple, Optional  # noqa: E402
+
+import httpx  # noqa: E402
+from PIL import Image  # noqa: E402
+from starlette.applications import Starlette  # noqa: E402
+from starlette.routing import Mount  # noqa: E402
+from starlette.staticfiles import StaticFiles  # noqa: E402
+
+from api.utils.static_helpers import ImageFiles  # noqa: E402
+
+MAX_AGE = re.compile(r"max-age=(\d+)")
+
+
+class CacheEntry(NamedTuple):
+    etag: Optional[str]
+    fresh_until: float
+
+
+class Browser:
+    """Private HTTP cache: fresh entries cost no request, stale ones are
+    revalidated with If-None-Match. Heuristic freshness is not modelled."""
+
+    def __init__(self, client: httpx.AsyncClient) -> None:
+        self.client = client
+        self.entries: dict[str, CacheEntry] = {}
+        self.requests = 0
+        self.bytes = 0
+
+    async def get(self, url: str) -> None:
+        entry = self.entries.get(url)
+        if entry and entry.fresh_until > time.monotonic():
+            return
+
+        headers = {"If-None-Match": entry.etag} if entry and entry.etag else {}
+        response = await self.client.get(url, headers=headers)
+        self.requests += 1
+        self.bytes += len(response.content)
+
+        max_age = MAX_AGE.search(response.headers.get("cache-control", ""))
+        fresh_for = int(max_age.group(1)) if max_age else 0
+        self.entries[url] = CacheEntry(
+            response.headers.get("etag"), time.monotonic() + fresh_for
+        )
+
+
+def make_thumbnails(directory: Path, count: int) -> list[str]:
+    urls = []
+    for _ in range(count):
+        buffer = BytesIO()
+        Image.effect_noise((128, 128), 64).convert("RGB").save(buffer, format="PNG")
+        digest = hashlib.sha256(buffer.getvalue()).hexdigest()
+
+        (directory / digest[:2]).mkdir(exist_ok=True)
+        (directory / digest[:2] / f"{digest}.png").write_bytes(buffer.getvalue())
+        urls.append(f"/thumbnails/{digest[:2]}/{digest}.png")
+    return urls
+
+
+async def page_views(app: Starlette, urls: list[str], args, cached: bool) -> dict:
+    async with httpx.AsyncClient(app=app, base_url="http://bench") as client:
+        browser = Browser(client)
+        start = time.perf_counter()
+        for _ in range(args.pages):
+            if not cached:
+                browser.entries.clear()
+            await asyncio.gather(*(browser.get(url) for url in urls))
+        elapsed = time.perf_counter() - start
+
+    return {
+        "pages/s": args.pages / elapsed,
+        "req/page": browser.requests / args.pages,
+        "KiB/page": browser.bytes / args.pages / 1024,
+    }
+
+
+async def main(args: argparse.Namespace) -> None:
+    directory = Path(tempfile.mkdtemp(prefix="quicknook-bench-thumbnails-"))
+    urls = make_thumbnails(directory, args.grid)
+
+    results = {}
+    for name, files in (
+        ("StaticFiles", StaticFiles(directory=directory)),
+        ("ImageFiles", ImageFiles(directory=directory)),
+    ):
+        app = Starlette(routes=[Mount("/thumbnails", files)])
+        results[f"{name} cold"] = await page_views(app, urls, args, cached=False)
+        results[f"{name} browser"] = await page_views(app, urls, args, cached=True)
+
+    print_table(
+        f"Grid of {args.grid} thumbnails, {args.pages} page views per row", results
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--grid", type=int, default=24)
+    parser.add_argument("--pages", type=int, default=200)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,416 @@
+"""Throughput and latency of every router over seeded catalogs, compared to a baseline.
+
+    python -m api.benchmarks.bench_suite --catalogs 1000 100000 --output now.json
+    python -m api.benchmarks.bench_suite --catalogs 1000 --baseline before.json
+
+The catalog grows to every size in turn, bulk loaded by seed_database with
+products and orders (one per ten products) on top of ``--users`` users. Every
+scenario then sends ``--requests`` requests through the ASGI app in-process
+at each ``--concurrency``. A run with any error (status 400 and up or a
+request past ``--timeout``) is invalid: its latencies do not measure the
+route, so invalid runs are listed, no ``--output`` file is written and the
+exit status is 1. Results are written as JSON with ``--output``. With
+``--baseline``, runs whose p95 grew or whose throughput fell by more than
+``--tolerance`` are listed and the exit status is 1.
+
+POST /user/register is left out because it hands an email to Mailgun. Image
+variants and static files are covered by bench_thumbnails and bench_static."""
+
+from api.benchmarks.common import (
+    PASSWORD,
+    configure_environment,
+    elapsed_ms,
+    print_table,
+    summarize,
+)
+
+configure_environment()
+
+import argparse  # noqa: E402
+import asyncio  # noqa: E402
+import json  # noqa: E402
+import logging  # noqa: E402
+import platform  # noqa: E402
+import random  # noqa: E402
+import sys  # noqa: E402
+import time  # noqa: E402
+from dataclasses import dataclass, field  # noqa: E402
+from datetime import datetime  # noqa: E402
+from typing import Callable, NamedTuple, Optional  # noqa: E402
+
+import httpx  # noqa: E402
+
+from api import security  # noqa: E402
+from api.database import database, user_table  # noqa: E402
+from api.main import app  # noqa: E402
+from api.utils.category_helpers import category_names  # noqa: E402
+from api.utils.order_helpers import insert_rows  # noqa: E402
+from api.utils.response_cache_helpers import response_cache  # noqa: E402
+from api.utils.seed_helpers import SeedPlan, seed_database  # noqa: E402
+
+WORDS = ["apple", "chair", "lamp", "table", "shirt", "phone", "bottle", "desk"]
+SORTS = [None, "price", "-price", "name", "-name"]
+CATEGORIES = 50
+ITEMS_PER_ORDER = 3
+CUSTOMER = "customer@example.com"
+SELLER = "seller@example.com"
+
+
+@dataclass
+class Context:
+    products: int = 0
+    orders: int = 0
+    headers: dict = field(default_factory=dict)
+    seller_headers: dict = field(default_factory=dict)
+    confirmation_token: str = ""
+    created_products: list = field(default_factory=list)
+
+
+class Scenario(NamedTuple):
+    method: str
+    path: str
+    build: Callable[[Context, random.Random], tuple[str, dict]]
+    collect: Optional[Callable[[Context, httpx.Response], None]] = None
+
+    @property
+    def name(self) -> str:
+        return f"{self.method} {self.path}"
+
+
+def product_form(rng: random.Random) -> dict:
+    return {
+        "name": f"{rng.choice(WORDS).title()} {rng.choice(WORDS)}",
+        "description": f"{rng.choice(WORDS)} {rng.choice(WORDS)}",
+        "price": str(rng.randint(100, 50_000) / 100),
+        "category_id": str(rng.randint(1, CATEGORIES)),
+    }
+
+
+def order_json(ctx: Context, rng: random.Random) -> dict:
+    return {
+        "delivery_address": "1 Main St",
+        "products": [
+            {"product_id": rng.randint(1, ctx.products), "quantity": rng.randint(1, 5)}
+            for _ in range(ITEMS_PER_ORDER)
+        ],
+    }
+
+
+def list_products(ctx: Context, rng: random.Random) -> tuple[str, dict]:
+    params = {"page": rng.choice([1, 2, 5, 50]), "per_page": 20}
+    if sort := rng.choice(SORTS):
+        params["sort"] = sort
+    if rng.random() < 0.5:
+        params["name"] = rng.choice(WORDS)
+    return "/product/product", {"params": params}
+
+
+def delete_product(ctx: Context, rng: random.Random) -> tuple[str, dict]:
+    # Only products created by POST /product/, so the catalog keeps its size.
+    # Once there are none left the request is a 404 and the run invalid, so
+    # the scenario needs POST /product/ to run before it.
+    product_id = ctx.created_products.pop() if ctx.created_products else 0
+    return f"/product/{product_id}", {"headers": ctx.headers}
+
+
+SCENARIOS = [
+    Scenario("GET", "/product/product", list_products),
+    Scenario(
+        "GET",
+        "/product/{product_id}",
+        lambda ctx, rng: (f"/product/{rng.randint(1, ctx.products)}", {}),
+    ),
+    Scenario(
+        "POST",
+        "/product/",
+        lambda ctx, rng: ("/product/", {"data": product_form(rng)}),
+        lambda ctx, response: ctx.created_products.append(response.json()["id"]),
+    ),
+    Scenario(
+        "PUT",
+        "/product/{product_id}",
+        lambda ctx, rng: (
+            f"/product/{rng.randint(1, ctx.products)}",
+            {"data": {"price": str(rng.randint(100, 50_000) / 100)}},
+        ),
+    ),
+    Scenario("DELETE", "/product/{product_id}", delete_product),
+    Scenario(
+        "GET",
+        "/category/category",
+        lambda ctx, rng: ("/category/category", {"params": {"page": 1}}),
+    ),
+    Scenario(
+        "POST",
+        "/category/",
+        lambda ctx, rng: (
+            "/category/",
+            {"json": {"name": rng.choice(WORDS)}, "headers": ctx.headers},
+        ),
+    ),
+    Scenario(
+        "POST",
+        "/order/",
+        lambda ctx, rng: (
+            "/order/",
+            {"json": order_json(ctx, rng), "headers": ctx.headers},
+        ),
+    ),
+    Scenario(
+        "POST",
+        "/order/batch",
+        lambda ctx, rng: (
+            "/order/batch",
+            {
+                "json": {"orders": [order_json(ctx, rng) for _ in range(10)]},
+                "headers": ctx.headers,
+            },
+        ),
+    ),
+    Scenario(
+        "GET",
+        "/order/orders",
+        lambda ctx, rng: (
+            "/order/orders",
+            {"params": {"page": rng.randint(1, max(1, ctx.orders // 10))}},
+        ),
+    ),
+    Scenario(
+        "POST",
+        "/user/token",
+        lambda ctx, rng: (
+            "/user/token",
+            {"json": {"email": CUSTOMER, "password": PASSWORD}},
+        ),
+    ),
+    Scenario(
+        "GET",
+        "/user/confirm/{token}",
+        lambda ctx, rng: (f"/user/confirm/{ctx.confirmation_token}", {}),
+    ),
+    *(
+        Scenario(
+            "GET",
+            f"/report/{report}",
+            lambda ctx, rng, report=report: (
+                f"/report/{report}",
+                {"headers": ctx.seller_headers},
+            ),
+        )
+        for report in ("daily", "products", "categories")
+    ),
+    Scenario("GET", "/cache/stats", lambda ctx, rng: ("/cache/stats", {})),
+    Scenario("GET", "/metrics", lambda ctx, rng: ("/metrics", {})),
+]
+
+
+async def seed_users(ctx: Context, users: int) -> None:
+    password = security.get_password_hash(PASSWORD)
+    await insert_rows(
+        database,
+        user_table,
+        [
+            {"email": email, "password": password, "confirmed": True, "role": role}
+            for email, role in ((CUSTOMER, "client"), (SELLER, "seller"))
+        ],
+    )
+    await seed_database(
+        database,
+        SeedPlan(
+            categories=CATEGORIES, products=0, users=users, orders=0, password=PASSWORD
+        ),
+    )
+    ctx.headers = {
+        "Authorization": f"Bearer {security.create_access_token(CUSTOMER, 'client')}"
+    }
+    ctx.seller_headers = {
+        "Authorization": f"Bearer {security.create_access_token(SELLER, 'seller')}"
+    }
+    ctx.confirmation_token = security.create_confirmation_token(CUSTOMER, "client")
+
+
+async def grow(ctx: Context, size: int, rng: random.Random) -> None:
+    """Add products up to ``size`` and orders up to one per ten products."""
+    await seed_database(
+        database,
+        SeedPlan(
+            categories=0,
+            products=size - ctx.products,
+            users=0,
+            orders=size // 10 - ctx.orders,
+            seed=rng.randrange(2**32),
+        ),
+    )
+    ctx.products, ctx.orders = size, size // 10
+    response_cache.clear()
+    category_names.clear()
+
+
+async def drive(
+    client: httpx.AsyncClient,
+    scenario: Scenario,
+    ctx: Context,
+    requests: int,
+    concurrency: int,
+    timeout: float,
+    rng: random.Random,
+) -> dict:
+    remaining = iter(range(requests))
+    samples = []
+    errors = 0
+
+    async def worker() -> None:
+        nonlocal errors
+        for _ in remaining:
+            url, kwargs = scenario.build(ctx, rng)
+            start = time.perf_counter()
+            try:
+                response = await asyncio.wait_for(
+                    client.request(scenario.method, url, **kwargs), timeout
+                )
+            except asyncio.TimeoutError:
+                errors += 1
+                continue
+            finally:
+                samples.append(elapsed_ms(start))
+            if response.status_code >= 400:
+                errors += 1
+            elif scenario.collect:
+                scenario.collect(ctx, response)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return {"req/s": requests / elapsed, **summarize(samples), "errors": errors}
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    regressions = []
+    for size, scenarios in results.items():
+        for name, runs in scenarios.items():
+            for concurrency, stats in runs.items():
+                before = baseline.get(size, {}).get(name, {}).get(concurrency)
+                if before is None:
+                    continue
+                run = f"{size} products, {name} x{concurrency}"
+                if stats["p95"] > before["p95"] * (1 + tolerance):
+                    regressions.append(
+                        f"{run}: p95 {before['p95']:.2f} -> {stats['p95']:.2f} ms"
+                    )
+                if stats["req/s"] < before["req/s"] * (1 - tolerance):
+                    regressions.append(
+                        f"{run}: {before['req/s']:.1f} -> {stats['req/s']:.1f} req/s"
+                    )
+    return regressions
+
+
+async def main(args: argparse.Namespace) -> int:
+    rng = random.Random(args.seed)
+    ctx = Context()
+    results: dict[str, dict] = {}
+    scenarios = [
+        scenario
+        for scenario in SCENARIOS
+        if not args.only or any(part in scenario.name for part in args.only)
+    ]
+
+    await database.connect()
+    try:
+        await seed_users(ctx, args.users)
+        # Errors such as a locked database become 500s counted in the results
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://bench"
+        ) as client:
+            for size in sorted(args.catalogs):
+                start = time.perf_counter()
+                await grow(ctx, size, rng)
+                print(f"Seeded {size} products in {elapsed_ms(start) / 1000:.1f} s")
+
+                runs = results[str(size)] = {}
+                for scenario in scenarios:
+                    runs[scenario.name] = {
+                        str(concurrency): await drive(
+                            client,
+                            scenario,
+                            ctx,
+                            args.requests,
+                            concurrency,
+                            args.timeout,
+                            rng,
+                        )
+                        for concurrency in args.concurrency
+                    }
+                print_table(
+                    f"{size} products, {args.requests} requests per run (ms)",
+                    {
+                        f"{name} x{concurrency}": stats
+                        for name, by_concurrency in runs.items()
+                        for concurrency, stats in by_concurrency.items()
+                    },
+                )
+    finally:
+        await database.disconnect()
+
+    invalid = [
+        f"{size} products, {name} x{concurrency}: {stats['errors']} errors"
+        for size, scenarios in results.items()
+        for name, runs in scenarios.items()
+        for concurrency, stats in runs.items()
+        if stats["errors"]
+    ]
+    if invalid:
+        for run in invalid:
+            print(f"INVALID {run}")
+        print(f"{len(invalid)} runs with errors, results not recorded")
+        return 1
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(
+                {
+                    "meta": {
+                        "date": datetime.utcnow().isoformat(),
+                        "python": platform.python_version(),
+                        "requests": args.requests,
+                        "seed": args.seed,
+                    },
+                    "results": results,
+                },
+                file,
+                indent=2,
+            )
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)["results"]
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        print(f"{len(regressions)} regressions beyond {args.tolerance:.0%}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--catalogs", type=int, nargs="+", default=[1_000, 100_000, 1_000_000]
+    )
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 16])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument(
+        "--only", nargs="+", help="Run only the scenarios containing these strings"
+    )
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--baseline", help="JSON results of an earlier run")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument(
+        "--timeout", type=float, default=30, help="Seconds before a request is an error"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    # Slow query warnings and HTTP errors would drown the report, errors are
+    # counted per run and logging has its own benchmark in bench_logging
+    logging.getLogger("api").setLevel(logging.CRITICAL)
+    sys.exit(asyncio.run(main(parser.parse_args())))
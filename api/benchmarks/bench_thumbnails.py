@@ -0,0 +1,166 @@
+"""Catalog read latency while large product images are being uploaded.
+
+    python -m api.benchmarks.bench_thumbnails --uploads 16 --readers 4
+
+``inline`` decodes and resizes on the event loop as create_thumbnail used to,
+``pool`` goes through the image worker processes."""
+
+from api.benchmarks.common import (
+    configure_environment,
+    elapsed_ms,
+    print_table,
+    summarize,
+)
+
+configure_environment()
+
+import argparse  # noqa: E402
+import asyncio  # noqa: E402
+import tempfile  # noqa: E402
+import time  # noqa: E402
+from io import BytesIO  # noqa: E402
+from pathlib import Path  # noqa: E402
+
+import httpx  # noqa: E402
+from PIL import Image  # noqa: E402
+
+from api.database import category_table, database, product_table  # noqa: E402
+from api.main import app  # noqa: E402
+from api.utils import product_helpers  # noqa: E402
+from api.utils.counter_helpers import get_row_count  # noqa: E402
+
+
+class InlineExecutor:
+    async def run(self, func, *args):
+        return func(*args)
+
+
+def make_jpeg(size: int) -> bytes:
+    image = Image.effect_noise((size, size), 64).convert("RGB")
+    buffer = BytesIO()
+    image.save(buffer, format="JPEG", quality=95)
+    return buffer.getvalue()
+
+
+async def seed(products: int) -> int:
+    category_id = await database.execute(category_table.insert().values(name="Bench"))
+    await database.execute(
+        product_table.insert().values(
+            [
+                {
+                    "name": f"Product {i}",
+                    "description": "Benchmark product",
+                    "price_cents": i % 100 * 100,
+                    "category_id": category_id,
+                }
+                for i in range(products)
+            ]
+        )
+    )
+    # Seed the maintained count before readers and writers race to do it
+    await get_row_count(database, product_table)
+    return category_id
+
+
+async def uploads(
+    client: httpx.AsyncClient, image: bytes, category_id: int, mode: str, args
+) -> list[float]:
+    semaphore = asyncio.Semaphore(args.concurrency)
+    samples = []
+
+    async def upload(i: int):
+        async with semaphore:
+            # Decoders ignore bytes after the end marker, the suffix only keeps
+            # the image store from deduplicating the uploads
+            content = image + f"{mode} {i}".encode()
+            start = time.perf_counter()
+            response = await client.post(
+                "/product/",
+                data={
+                    "name": f"Upload {i}",
+                    "description": "Uploaded",
+                    "price": "1.0",
+                    "category_id": str(category_id),
+                },
+                files={"file": (f"upload_{i}.jpg", content, "image/jpeg")},
+            )
+            response.raise_for_status()
+            samples.append(elapsed_ms(start))
+
+    await asyncio.gather(*(upload(i) for i in range(args.uploads)))
+    return samples
+
+
+async def catalog_reader(client: httpx.AsyncClient, stop: asyncio.Event):
+    samples = []
+    while not stop.is_set():
+        start = time.perf_counter()
+        await client.get("/product/product")
+        samples.append(elapsed_ms(start))
+    return samples
+
+
+async def run(mode: str, image: bytes, category_id: int, args) -> dict:
+    executor = product_helpers.image_executor
+    if mode == "inline":
+        product_helpers.image_executor = InlineExecutor()
+    try:
+        async with httpx.AsyncClient(app=app, base_url="http://bench") as client:
+            stop = asyncio.Event()
+            readers = [
+                asyncio.create_task(catalog_reader(client, stop))
+                for _ in range(args.readers)
+            ]
+            upload_samples = await uploads(client, image, category_id, mode, args)
+            stop.set()
+            read_samples = [sample for reader in readers for sample in await reader]
+    finally:
+        product_helpers.image_executor = executor
+
+    return {
+        f"{mode} reads": summarize(read_samples),
+        f"{mode} uploads": summarize(upload_samples),
+    }
+
+
+async def main(args: argparse.Namespace) -> None:
+    # Keep the uploaded files out of api/images and api/thumbnails
+    scratch = Path(tempfile.mkdtemp(prefix="quicknook-bench-images-"))
+    product_helpers.IMAGE_DIR = scratch / "images"
+    product_helpers.THUMBNAIL_DIR = scratch / "thumbnails"
+
+    image = make_jpeg(args.image_size)
+    await database.connect()
+    category_id = await seed(args.products)
+
+    # Start the worker processes before measuring
+    warm_up = scratch / "warm_up.jpg"
+    warm_up.write_bytes(image)
+    await product_helpers.image_executor.run(
+        product_helpers.render_thumbnail, warm_up, (128, 128)
+    )
+
+    results = {}
+    try:
+        for mode in ("inline", "pool"):
+            results.update(await run(mode, image, category_id, args))
+    finally:
+        await database.disconnect()
+        product_helpers.image_executor.shutdown()
+
+    print_table(
+        f"Latency (ms), {args.uploads} uploads of {len(image) // 1024} KiB, "
+        f"{args.concurrency} concurrent, {args.readers} catalog readers",
+        results,
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--uploads", type=int, default=16)
+    # Concurrent product inserts contend for the SQLite write lock
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--image-size", type=int, default=2000)
+    parser.add_argument("--products", type=int, default=1000)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,57 @@
+"""Helpers shared by the in-process benchmarks in this package.
+
+Every benchmark calls ``configure_environment`` before importing anything else
+from ``api`` so that it runs against a scratch SQLite file with the test
+settings instead of the configured database."""
+
+import os
+import tempfile
+import time
+from typing import Optional
+
+PASSWORD = "benchmark-password"
+
+
+def configure_environment(database_path: Optional[str] = None) -> str:
+    if database_path is None:
+        directory = tempfile.mkdtemp(prefix="quicknook-bench-")
+        database_path = os.path.join(directory, "bench.db")
+    os.environ["ENV_STATE"] = "test"
+    os.environ["TEST_DATABASE_URL"] = f"sqlite:///{database_path}"
+    os.environ["TEST_DB_FORCE_ROLL_BACK"] = "false"
+    return database_path
+
+
+def elapsed_ms(start: float) -> float:
+    return (time.perf_counter() - start) * 1000
+
+
+def summarize(samples: list[float]) -> dict[str, float]:
+    """Latency percentiles in milliseconds (nearest-rank)."""
+    if not samples:
+        return {"count": 0, "p50": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0}
+    ordered = sorted(samples)
+
+    def rank(fraction: float) -> float:
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+    return {
+        "count": len(ordered),
+        "p50": rank(0.50),
+        "p95": rank(0.95),
+        "p99": rank(0.99),
+        "max": ordered[-1],
+    }
+
+
+def print_table(title: str, rows: dict[str, dict[str, float]]) -> None:
+    columns = list(next(iter(rows.values())).keys())
+    width = max(24, *(len(name) + 2 for name in rows))
+    print(title)
+    print(f"{'':<{width}}" + "".join(f"{column:>12}" for column in columns))
+    for name, values in rows.items():
+        cells = "".join(
+            f"{value:>12.2f}" if isinstance(value, float) else f"{value:>12}"
+            for value in values.values()
+        )
+        print(f"{name:<{width}}{cells}")
@@ -14,6 +14,22 @@ class GlobalConfig(BaseConfig):
     DB_FORCE_ROLL_BACK: bool = False
     MAILGUN_DOMAIN: Optional[str] = None
     MAILGUN_API_KEY: Optional[str] = None
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_PENDING: int = 64
+    USER_CACHE_MAX_SIZE: int = 10_000
+    USER_CACHE_TTL_SECONDS: float = 60
+    TOKEN_CACHE_MAX_SIZE: int = 10_000
+    IMAGE_WORKERS: int = 2
+    IMAGE_MAX_PENDING: int = 16
+    IMAGE_VARIANT_CACHE_BYTES: int = 256 * 1024 * 1024
+    RESPONSE_CACHE_MAX_BYTES: int = 32 * 1024 * 1024
+    CATALOG_ENGINE: str = "sql"
+    LOG_QUEUE_SIZE: int = 10_000
+    LOG_LEVEL: Optional[str] = None
+    LOG_DEBUG_SAMPLE_RATE: float = 1.0
+    LOG_DEBUG_RATE_LIMIT: float = 0
+    SLOW_QUERY_MS: float = 100
+    REPEATED_QUERY_THRESHOLD: int = 10
 
 
 class DevConfig(GlobalConfig):
@@ -1,9 +1,10 @@
-import databases
 import sqlalchemy
 from sqlalchemy.sql import func
 
 from api.config import config
+from api.migrations import migrate
 from api.models.user import UserRole
+from api.utils.query_stats_helpers import InstrumentedDatabase
 
 metadata = sqlalchemy.MetaData()
 
@@ -20,7 +21,7 @@ product_table = sqlalchemy.Table(
     sqlalchemy.Column("id", sqlalchemy.Integer, primary_key=True),
     sqlalchemy.Column("name", sqlalchemy.String),
     sqlalchemy.Column("description", sqlalchemy.String),
-    sqlalchemy.Column("price", sqlalchemy.Float),
+    sqlalchemy.Column("price_cents", sqlalchemy.Integer),
     sqlalchemy.Column(
         "category_id", sqlalchemy.ForeignKey("categories.id"), nullable=False
     ),
@@ -28,6 +29,22 @@ product_table = sqlalchemy.Table(
     sqlalchemy.Column("thumbnail", sqlalchemy.String, nullable=True),
 )
 
+# Money is stored in integer cents, the API keeps exposing prices as floats.
+# ix_products_price indexes this exact expression, the divisor has to stay a
+# literal for SQLite to use it for sorting and seeking by price.
+product_price = (
+    product_table.c.price_cents / sqlalchemy.literal_column("100.0", sqlalchemy.Float)
+).label("price")
+
+# One row per stored image file, shared by every product uploading the same bytes
+image_table = sqlalchemy.Table(
+    "images",
+    metadata,
+    sqlalchemy.Column("hash", sqlalchemy.String, primary_key=True),
+    sqlalchemy.Column("extension", sqlalchemy.String, nullable=False),
+    sqlalchemy.Column("ref_count", sqlalchemy.Integer, nullable=False),
+)
+
 order_table = sqlalchemy.Table(
     "orders",
     metadata,
@@ -35,7 +52,7 @@ order_table = sqlalchemy.Table(
     sqlalchemy.Column("delivery_address", sqlalchemy.String),
     sqlalchemy.Column("order_date", sqlalchemy.DateTime, default=func.now()),
     sqlalchemy.Column("payment_due_date", sqlalchemy.DateTime),
-    sqlalchemy.Column("total_price", sqlalchemy.String),
+    sqlalchemy.Column("total_cents", sqlalchemy.Integer),
     sqlalchemy.Column("customer_id", sqlalchemy.ForeignKey("users.id"), nullable=False),
 )
 
@@ -48,6 +65,35 @@ order_item_table = sqlalchemy.Table(
         "product_id", sqlalchemy.ForeignKey("products.id"), nullable=False
     ),
     sqlalchemy.Column("quantity", sqlalchemy.Integer),
+    # Price of the product when the order was placed
+    sqlalchemy.Column("unit_price_cents", sqlalchemy.Integer),
+)
+
+# Sales rollups, updated in the transaction creating the orders by
+# api.utils.rollup_helpers and rebuilt from history with `python -m api.manage`
+sales_by_day_table = sqlalchemy.Table(
+    "sales_by_day",
+    metadata,
+    sqlalchemy.Column("day", sqlalchemy.String, primary_key=True),
+    sqlalchemy.Column("orders", sqlalchemy.Integer, nullable=False),
+    sqlalchemy.Column("units", sqlalchemy.Integer, nullable=False),
+    sqlalchemy.Column("revenue_cents", sqlalchemy.Integer, nullable=False),
+)
+
+sales_by_product_table = sqlalchemy.Table(
+    "sales_by_product",
+    metadata,
+    sqlalchemy.Column("product_id", sqlalchemy.Integer, primary_key=True),
+    sqlalchemy.Column("units", sqlalchemy.Integer, nullable=False),
+    sqlalchemy.Column("revenue_cents", sqlalchemy.Integer, nullable=False, index=True),
+)
+
+sales_by_category_table = sqlalchemy.Table(
+    "sales_by_category",
+    metadata,
+    sqlalchemy.Column("category_id", sqlalchemy.Integer, primary_key=True),
+    sqlalchemy.Column("units", sqlalchemy.Integer, nullable=False),
+    sqlalchemy.Column("revenue_cents", sqlalchemy.Integer, nullable=False),
 )
 
 user_table = sqlalchemy.Table(
@@ -60,11 +106,38 @@ user_table = sqlalchemy.Table(
     sqlalchemy.Column("role", sqlalchemy.String, default=UserRole.client.value),
 )
 
+row_count_table = sqlalchemy.Table(
+    "row_counts",
+    metadata,
+    sqlalchemy.Column("table_name", sqlalchemy.String, primary_key=True),
+    sqlalchemy.Column("row_count", sqlalchemy.Integer, nullable=False),
+)
+
+# Write stamp of every table whose reads are cached, bumped by triggers living in
+# api.migrations so that writes from any process or connection are counted
+table_version_table = sqlalchemy.Table(
+    "table_versions",
+    metadata,
+    sqlalchemy.Column("table_name", sqlalchemy.String, primary_key=True),
+    sqlalchemy.Column("version", sqlalchemy.Integer, nullable=False),
+)
+
+# FTS5 index over the searchable product text. It is not part of `metadata`,
+# the virtual table and the triggers keeping it in sync live in api.migrations.
+product_search_table = sqlalchemy.table(
+    "products_fts",
+    sqlalchemy.column("rowid"),
+    sqlalchemy.column("name"),
+    sqlalchemy.column("description"),
+    sqlalchemy.column("category_name"),
+)
+
 engine = sqlalchemy.create_engine(
     config.DATABASE_URL, connect_args={"check_same_thread": False}
 )
 
 metadata.create_all(engine)
-database = databases.Database(
+migrate(engine)
+database = InstrumentedDatabase(
     config.DATABASE_URL, force_rollback=config.DB_FORCE_ROLL_BACK
 )
@@ -1,8 +1,23 @@
+import atexit
 import logging
+import queue
+import threading
+import time
+import zlib
+from collections import Counter
 from logging.config import dictConfig
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Optional
+
+from pythonjsonlogger.jsonlogger import JsonFormatter
+from rich.logging import RichHandler
 
 from api.config import DevConfig, config
 
+DATE_FORMAT = "%Y-%m-%dT%H:%M:%S"
+CONSOLE_FORMAT = "(%(correlation_id)s) %(name)s:%(lineno)d - %(message)s"
+FILE_FORMAT = "%(asctime)s %(msecs)03dZ %(levelname)-8s %(correlation_id)s %(name)s %(lineno)d %(message)s"
+
 
 def obfuscated(email: str, obfuscated_length: int) -> str:
     characters = email[:obfuscated_length]
@@ -21,61 +36,193 @@ class EmailObfuscationFilter(logging.Filter):
         return True
 
 
+class DebugSamplingFilter(logging.Filter):
+    """Keep DEBUG records of a ``sample_rate`` share of requests and at most
+    ``rate_limit`` of them per second and logger.
+
+    Requests are picked by their correlation id, so a request that is sampled
+    keeps every one of its debug records. Records outside of a request are
+    only rate limited. A ``rate_limit`` of 0 disables the limit."""
+
+    def __init__(
+        self, name: str = "", sample_rate: float = 1.0, rate_limit: float = 0
+    ) -> None:
+        super().__init__(name)
+        self.sample_rate = sample_rate
+        self.rate_limit = rate_limit
+        self.suppressed: Counter[str] = Counter()
+        self._buckets: dict[str, tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    def sampled(self, correlation_id: str) -> bool:
+        if self.sample_rate >= 1 or correlation_id == "-":
+            return True
+        return zlib.crc32(correlation_id.encode()) < self.sample_rate * 2**32
+
+    def within_rate_limit(self, name: str) -> bool:
+        if not self.rate_limit:
+            return True
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(name, (self.rate_limit, now))
+            tokens = min(self.rate_limit, tokens + (now - updated) * self.rate_limit)
+            if tokens < 1:
+                self._buckets[name] = (tokens, now)
+                return False
+            self._buckets[name] = (tokens - 1, now)
+            return True
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG:
+            return True
+        if self.sampled(getattr(record, "correlation_id", "-")) and (
+            self.within_rate_limit(record.name)
+        ):
+            return True
+        with self._lock:
+            self.suppressed[record.name] += 1
+        return False
+
+
+class DroppingQueueHandler(QueueHandler):
+    """Hand records to the listener thread without ever blocking the caller.
+
+    Records are enqueued as they are: the message is only merged with its
+    args, formatted and written by the listener. When the queue is full the
+    record is dropped and counted per level, and the next record that fits
+    is followed by a warning saying how many were lost."""
+
+    def __init__(self, queue: queue.Queue) -> None:
+        super().__init__(queue)
+        self.dropped: Counter[str] = Counter()
+        self._unreported = 0
+        self._lock = threading.Lock()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._lock:
+                self.dropped[record.levelname] += 1
+                self._unreported += 1
+            return
+
+        if self._unreported:
+            with self._lock:
+                unreported, self._unreported = self._unreported, 0
+            self.report_dropped(record, unreported)
+
+    def report_dropped(self, record: logging.LogRecord, count: int) -> None:
+        warning = logging.makeLogRecord(
+            {
+                "name": __name__,
+                "levelno": logging.WARNING,
+                "levelname": "WARNING",
+                "msg": "Dropped %d log records, the log queue was full",
+                "args": (count,),
+                "correlation_id": getattr(record, "correlation_id", "-"),
+            }
+        )
+        try:
+            self.queue.put_nowait(warning)
+        except queue.Full:
+            with self._lock:
+                self._unreported += count
+
+
+log_queue: queue.Queue = queue.Queue(maxsize=config.LOG_QUEUE_SIZE)
+queue_handler: Optional[DroppingQueueHandler] = None
+debug_sampling: Optional[DebugSamplingFilter] = None
+listener: Optional[QueueListener] = None
+
+
+def sink_handlers() -> list[logging.Handler]:
+    """The handlers doing the actual work, run on the listener thread."""
+    email_obfuscation = EmailObfuscationFilter(
+        obfuscated_length=2 if isinstance(config, DevConfig) else 0
+    )
+
+    console = RichHandler(level=logging.DEBUG)
+    console.setFormatter(logging.Formatter(CONSOLE_FORMAT, datefmt=DATE_FORMAT))
+
+    rotating_file = RotatingFileHandler(
+        "api.log", maxBytes=1024 * 1024, backupCount=2, encoding="utf8"
+    )
+    rotating_file.setLevel(logging.DEBUG)
+    rotating_file.setFormatter(JsonFormatter(FILE_FORMAT, datefmt=DATE_FORMAT))
+
+    for handler in (console, rotating_file):
+        handler.addFilter(email_obfuscation)
+    return [console, rotating_file]
+
+
+def stop_logging() -> None:
+    """Stop the listener once it has written every queued record."""
+    global listener
+    if listener is not None:
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
+        listener = None
+
+
+def log_queue_stats() -> dict:
+    return {
+        "queued": log_queue.qsize(),
+        "capacity": log_queue.maxsize,
+        "dropped": dict(queue_handler.dropped) if queue_handler else {},
+        "suppressed": dict(debug_sampling.suppressed) if debug_sampling else {},
+    }
+
+
 def configure_logging() -> None:
+    global queue_handler, debug_sampling, listener
+    stop_logging()
+    queue_handler = DroppingQueueHandler(log_queue)
+    debug_sampling = DebugSamplingFilter(
+        sample_rate=config.LOG_DEBUG_SAMPLE_RATE,
+        rate_limit=config.LOG_DEBUG_RATE_LIMIT,
+    )
+
     dictConfig(
         {
             "version": 1,
             "disable_existing_loggers": False,
             "filters": {
+                # The correlation id lives in a contextvar of the request, so
+                # it is read before the record leaves for the listener thread.
                 "correlation_id": {
                     "()": "asgi_correlation_id.CorrelationIdFilter",
                     "uuid_length": 8 if isinstance(config, DevConfig) else 32,
                     "default_value": "-",
                 },
-                "email_obfuscation": {
-                    "()": EmailObfuscationFilter,
-                    "obfuscated_length": 2 if isinstance(config, DevConfig) else 0,
-                },
-            },
-            "formatters": {
-                "console": {
-                    "class": "logging.Formatter",
-                    "datefmt": "%Y-%m-%dT%H:%M:%S",
-                    "format": "(%(correlation_id)s) %(name)s:%(lineno)d - %(message)s",
-                },
-                "file": {
-                    "class": "pythonjsonlogger.jsonlogger.JsonFormatter",
-                    "datefmt": "%Y-%m-%dT%H:%M:%S",
-                    "format": "%(asctime)s %(msecs)03dZ %(levelname)-8s %(correlation_id)s %(name)s %(lineno)d %(message)s",
-                },
+                "debug_sampling": {"()": lambda: debug_sampling},
             },
             "handlers": {
-                "default": {
-                    "class": "rich.logging.RichHandler",
-                    "level": "DEBUG",
-                    "formatter": "console",
-                    "filters": ["correlation_id", "email_obfuscation"],
-                },
-                "rotating_file": {
-                    "class": "logging.handlers.RotatingFileHandler",
-                    "level": "DEBUG",
-                    "formatter": "file",
-                    "filename": "api.log",
-                    "maxBytes": 1024 * 1024,
-                    "backupCount": 2,
-                    "encoding": "utf8",
-                    "filters": ["correlation_id", "email_obfuscation"],
+                "queue": {
+                    "()": lambda: queue_handler,
+                    "filters": ["correlation_id", "debug_sampling"],
                 },
             },
             "loggers": {
-                "uvicorn": {"handlers": ["default", "rotating_file"], "level": "INFO"},
+                "uvicorn": {"handlers": ["queue"], "level": "INFO"},
                 "api": {
-                    "handlers": ["default", "rotating_file"],
-                    "level": "DEBUG" if isinstance(config, DevConfig) else "INFO",
+                    "handlers": ["queue"],
+                    "level": config.LOG_LEVEL
+                    or ("DEBUG" if isinstance(config, DevConfig) else "INFO"),
                     "propagate": False,
                 },
-                "databases": {"handlers": ["default"], "level": "WARNING"},
-                "aiosqlite": {"handlers": ["default"], "level": "WARNING"},
+                "databases": {"handlers": ["queue"], "level": "WARNING"},
+                "aiosqlite": {"handlers": ["queue"], "level": "WARNING"},
             },
         }
     )
+
+    listener = QueueListener(log_queue, *sink_handlers(), respect_handler_level=True)
+    listener.start()
+
+
+atexit.register(stop_logging)
@@ -6,14 +6,23 @@ from asgi_correlation_id import CorrelationIdMiddleware
 from fastapi import FastAPI, HTTPException
 from fastapi.exception_handlers import http_exception_handler
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 
+from api.config import DevConfig, config
 from api.database import database
 from api.logging_conf import configure_logging
+from api.routers.cache import router as cache_router
 from api.routers.category import router as category_router
+from api.routers.image import router as image_router
+from api.routers.metrics import router as metrics_router
 from api.routers.order import router as order_router
 from api.routers.product import router as product_router
+from api.routers.report import router as report_router
 from api.routers.user import router as user_router
+from api.security import password_executor
+from api.utils.metrics_helpers import MetricsMiddleware
+from api.utils.product_helpers import image_executor
+from api.utils.query_stats_helpers import QueryStatsMiddleware
+from api.utils.static_helpers import ImageFiles
 
 logger = logging.getLogger(__name__)
 
@@ -27,12 +36,16 @@ async def lifespan(app: FastAPI):
     await database.connect()
     yield
     await database.disconnect()
+    password_executor.shutdown()
+    image_executor.shutdown()
 
 
 app = FastAPI(
     lifespan=lifespan, swagger_ui_parameters={"syntaxHighlight.theme": "tomorrow-night"}
 )
 
+# Inside CorrelationIdMiddleware, so its warnings carry the correlation id
+app.add_middleware(QueryStatsMiddleware, headers=isinstance(config, DevConfig))
 app.add_middleware(CorrelationIdMiddleware)
 
 app.add_middleware(
@@ -42,16 +55,24 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+
+# Outermost, so the time spent in the other middleware is measured too
+app.add_middleware(MetricsMiddleware)
+
 images_path = os.path.join(os.path.dirname(__file__), 'images')
 thumbnails_path = os.path.join(os.path.dirname(__file__), 'thumbnails')
 
-app.mount("/images", StaticFiles(directory=images_path), name="images")
-app.mount("/thumbnails", StaticFiles(directory=thumbnails_path), name="thumbnails")
+app.mount("/images", ImageFiles(directory=images_path), name="images")
+app.mount("/thumbnails", ImageFiles(directory=thumbnails_path), name="thumbnails")
 
 app.include_router(category_router, prefix="/category")
 app.include_router(product_router, prefix="/product")
 app.include_router(order_router, prefix="/order")
 app.include_router(user_router, prefix="/user")
+app.include_router(image_router, prefix="/image")
+app.include_router(cache_router, prefix="/cache")
+app.include_router(report_router, prefix="/report")
+app.include_router(metrics_router, prefix="/metrics")
 
 
 @app.exception_handler(HTTPException)
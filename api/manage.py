@@ -0,0 +1,87 @@
+"""Maintenance commands run against the configured database.
+
+    python -m api.manage rebuild-rollups
+    python -m api.manage seed --products 1000000 --orders 1000000"""
+
+import argparse
+import asyncio
+import dataclasses
+import time
+
+from api.database import database
+from api.logging_conf import configure_logging
+from api.utils.rollup_helpers import rebuild_rollups
+from api.utils.seed_helpers import SeedPlan, seed_database
+
+
+async def rebuild_rollups_command(args: argparse.Namespace) -> None:
+    orders = await rebuild_rollups(database)
+    print(f"Rebuilt the sales rollups from {orders} orders")
+
+
+def seed_arguments(parser: argparse.ArgumentParser) -> None:
+    for plan_field in dataclasses.fields(SeedPlan):
+        parser.add_argument(
+            f"--{plan_field.name.replace('_', '-')}",
+            type=type(plan_field.default),
+            default=plan_field.default,
+        )
+
+
+async def seed_command(args: argparse.Namespace) -> None:
+    plan = SeedPlan(
+        **{
+            plan_field.name: getattr(args, plan_field.name)
+            for plan_field in dataclasses.fields(SeedPlan)
+        }
+    )
+    start = time.perf_counter()
+    counts = await seed_database(database, plan)
+    elapsed = time.perf_counter() - start
+
+    rows = sum(counts.values())
+    for table, count in counts.items():
+        print(f"{table:<12}{count:>12}")
+    print(
+        f"Loaded {rows} rows in {elapsed:.1f} s, {rows / elapsed * 60:,.0f} per minute"
+    )
+
+
+COMMANDS = {
+    "rebuild-rollups": (
+        rebuild_rollups_command,
+        "Recompute the sales rollups from the full order history",
+        None,
+    ),
+    "seed": (
+        seed_command,
+        "Add generated categories, products, users and orders in bulk",
+        seed_arguments,
+    ),
+}
+
+
+async def run(args: argparse.Namespace) -> None:
+    await database.connect()
+    try:
+        await args.handler(args)
+    finally:
+        await database.disconnect()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(required=True, metavar="command")
+    for name, (handler, description, arguments) in COMMANDS.items():
+        command = commands.add_parser(name, help=description, description=description)
+        command.set_defaults(handler=handler)
+        if arguments:
+            arguments(command)
+
+    args = parser.parse_args()
+    configure_logging()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
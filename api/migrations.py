@@ -0,0 +1,210 @@
+import logging
+from typing import Callable, NamedTuple
+
+from sqlalchemy.engine import Connection, Engine
+
+logger = logging.getLogger(__name__)
+
+
+class Migration(NamedTuple):
+    version: int
+    description: str
+    upgrade: Callable[[Connection], None]
+
+
+def execute_all(connection: Connection, statements: list[str]) -> None:
+    for statement in statements:
+        connection.exec_driver_sql(statement)
+
+
+def table_exists(connection: Connection, name: str) -> bool:
+    query = "SELECT 1 FROM sqlite_master WHERE name = ?"
+    return connection.exec_driver_sql(query, (name,)).first() is not None
+
+
+def column_exists(connection: Connection, table: str, column: str) -> bool:
+    rows = connection.exec_driver_sql(f"PRAGMA table_info({table})")
+    return any(row.name == column for row in rows)
+
+
+def create_product_search(connection: Connection) -> None:
+    backfill = not table_exists(connection, "products_fts")
+    execute_all(
+        connection,
+        [
+            """
+            CREATE VIRTUAL TABLE IF NOT EXISTS products_fts
+            USING fts5(name, description, category_name, tokenize = 'unicode61')
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS products_fts_insert AFTER INSERT ON products
+            BEGIN
+                INSERT INTO products_fts (rowid, name, description, category_name)
+                SELECT new.id, new.name, new.description, categories.name
+                FROM categories WHERE categories.id = new.category_id;
+            END
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS products_fts_delete AFTER DELETE ON products
+            BEGIN
+                DELETE FROM products_fts WHERE rowid = old.id;
+            END
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS products_fts_update
+            AFTER UPDATE OF name, description, category_id ON products
+            BEGIN
+                DELETE FROM products_fts WHERE rowid = old.id;
+                INSERT INTO products_fts (rowid, name, description, category_name)
+                SELECT new.id, new.name, new.description, categories.name
+                FROM categories WHERE categories.id = new.category_id;
+            END
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS categories_fts_update
+            AFTER UPDATE OF name ON categories
+            BEGIN
+                UPDATE products_fts SET category_name = new.name
+                WHERE rowid IN (SELECT id FROM products WHERE category_id = new.id);
+            END
+            """,
+        ],
+    )
+    if backfill:
+        connection.exec_driver_sql(
+            """
+            INSERT INTO products_fts (rowid, name, description, category_name)
+            SELECT products.id, products.name, products.description, categories.name
+            FROM products JOIN categories ON products.category_id = categories.id
+            """
+        )
+
+
+def create_lookup_indexes(connection: Connection) -> None:
+    # Secondary indexes carry the rowid, so (price) also serves ORDER BY price, id
+    execute_all(
+        connection,
+        [
+            "CREATE INDEX IF NOT EXISTS ix_products_category_id ON products (category_id)",
+            "CREATE INDEX IF NOT EXISTS ix_products_name ON products (name)",
+            "CREATE INDEX IF NOT EXISTS ix_order_items_order_id ON order_items (order_id)",
+            "CREATE INDEX IF NOT EXISTS ix_order_items_product_id ON order_items (product_id)",
+            "CREATE INDEX IF NOT EXISTS ix_orders_customer_id ON orders (customer_id)",
+        ],
+    )
+    # Tables created since migration 3 have no float price column to index
+    if column_exists(connection, "products", "price"):
+        connection.exec_driver_sql(
+            "CREATE INDEX IF NOT EXISTS ix_products_price ON products (price)"
+        )
+
+
+def convert_money_to_cents(connection: Connection) -> None:
+    """Move products.price and orders.total_price to integer cents and give
+    every order item the unit price it was sold at.
+
+    Items of existing orders get the current product price, the only price
+    on record. Order totals keep the amount that was charged."""
+    if not column_exists(connection, "products", "price_cents"):
+        execute_all(
+            connection,
+            [
+                "ALTER TABLE products ADD COLUMN price_cents INTEGER",
+                "UPDATE products SET price_cents = CAST(round(price * 100) AS INTEGER)",
+                "DROP INDEX IF EXISTS ix_products_price",
+                "ALTER TABLE products DROP COLUMN price",
+            ],
+        )
+    if not column_exists(connection, "orders", "total_cents"):
+        execute_all(
+            connection,
+            [
+                "ALTER TABLE orders ADD COLUMN total_cents INTEGER",
+                """
+                UPDATE orders
+                SET total_cents = CAST(round(CAST(total_price AS REAL) * 100) AS INTEGER)
+                """,
+                "ALTER TABLE orders DROP COLUMN total_price",
+            ],
+        )
+    if not column_exists(connection, "order_items", "unit_price_cents"):
+        execute_all(
+            connection,
+            [
+                "ALTER TABLE order_items ADD COLUMN unit_price_cents INTEGER",
+                """
+                UPDATE order_items SET unit_price_cents = (
+                    SELECT price_cents FROM products
+                    WHERE products.id = order_items.product_id
+                )
+                """,
+            ],
+        )
+
+    # Matches database.product_price, so ORDER BY price uses the index
+    execute_all(
+        connection,
+        [
+            "DROP INDEX IF EXISTS ix_products_price",
+            "CREATE INDEX ix_products_price ON products (price_cents / 100.0)",
+        ],
+    )
+
+
+# Tables whose list responses are cached, see api.utils.response_cache_helpers
+VERSIONED_TABLES = ["products", "categories"]
+
+
+def create_table_version_triggers(connection: Connection) -> None:
+    """Bump the table_versions row of a cached table on every write to it, so
+    the response cache of every process sees writes made by any other."""
+    for table in VERSIONED_TABLES:
+        for event in ("INSERT", "UPDATE", "DELETE"):
+            connection.exec_driver_sql(
+                f"""
+                CREATE TRIGGER IF NOT EXISTS {table}_version_{event.lower()}
+                AFTER {event} ON {table}
+                BEGIN
+                    INSERT INTO table_versions (table_name, version)
+                    VALUES ('{table}', 1)
+                    ON CONFLICT (table_name) DO UPDATE SET version = version + 1;
+                END
+                """
+            )
+
+
+# Append only. Every upgrade must also work against tables that were just
+# created from the current `metadata`, which is how a fresh database starts.
+MIGRATIONS = [
+    Migration(1, "Full-text search index over products", create_product_search),
+    Migration(
+        2, "Indexes for foreign keys and sortable columns", create_lookup_indexes
+    ),
+    Migration(3, "Money in integer cents", convert_money_to_cents),
+    Migration(
+        4, "Table versions for the response cache", create_table_version_triggers
+    ),
+]
+
+
+def get_schema_version(connection: Connection) -> int:
+    return connection.exec_driver_sql("PRAGMA user_version").scalar()
+
+
+def migrate(engine: Engine) -> int:
+    """Apply every migration newer than the version stored in the database
+    (``PRAGMA user_version``) and return the resulting version."""
+    with engine.connect() as connection:
+        version = get_schema_version(connection)
+
+    for migration in MIGRATIONS:
+        if migration.version <= version:
+            continue
+
+        logger.info(f"Applying migration {migration.version}: {migration.description}")
+        with engine.begin() as connection:
+            migration.upgrade(connection)
+            connection.exec_driver_sql(f"PRAGMA user_version = {migration.version}")
+        version = migration.version
+
+    return version
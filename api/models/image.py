@@ -0,0 +1,7 @@
+from enum import Enum
+
+
+class ImageFormat(str, Enum):
+    jpeg = "jpeg"
+    png = "png"
+    webp = "webp"
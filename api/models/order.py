@@ -1,7 +1,7 @@
 from datetime import datetime
-from typing import List
+from typing import List, Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class ProductQuantity(BaseModel):
@@ -26,6 +26,21 @@ class Orders(BaseModel):
     orders: List[Order]
 
 
+class OrderBatchIn(BaseModel):
+    orders: List[OrderIn] = Field(min_length=1, max_length=1000)
+
+
+class OrderResult(BaseModel):
+    index: int = Field(description="Position of the order in the request")
+    status_code: int = Field(description="201 if the order was created")
+    order: Optional[Order] = None
+    detail: Optional[str] = None
+
+
+class OrderBatch(BaseModel):
+    results: List[OrderResult]
+
+
 class OrderItemIn(BaseModel):
     order_id: int
     product_id: int
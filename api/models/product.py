@@ -22,7 +22,7 @@ class ProductWithCategoryName(BaseModel):
     name: str
     description: str
     price: float
-    category_name: str
+    category_name: Optional[str] = None
     image: Optional[str] = None
     id: int
     thumbnail: Optional[str] = None
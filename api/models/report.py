@@ -0,0 +1,22 @@
+from datetime import date
+
+from pydantic import BaseModel, Field
+
+
+class SalesTotals(BaseModel):
+    units: int = Field(description="Number of items sold")
+    revenue: str = Field(description="Revenue in the format of total_price")
+
+
+class DailySales(SalesTotals):
+    day: date
+    orders: int
+
+
+class ProductSales(SalesTotals):
+    product_id: int
+
+
+class CategorySales(SalesTotals):
+    category_id: int
+    category_name: str
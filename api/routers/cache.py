@@ -0,0 +1,23 @@
+import logging
+
+from fastapi import APIRouter
+
+from api.security import token_cache, user_cache
+from api.utils.image_helpers import variant_cache
+from api.utils.response_cache_helpers import response_cache
+
+router = APIRouter()
+
+logger = logging.getLogger(__name__)
+
+
+@router.get("/stats")
+async def get_cache_stats():
+    logger.info("Getting cache statistics")
+
+    return {
+        "responses": response_cache.stats(),
+        "users": user_cache.stats(),
+        "tokens": token_cache.stats(),
+        "image_variants": variant_cache.stats(),
+    }
@@ -10,8 +10,16 @@ from api.models.pagination import PaginatedResponse
 from api.models.sorting import CategorySortOptions
 from api.models.user import User
 from api.security import get_current_user
+from api.utils.counter_helpers import (
+    ESTIMATE_DESCRIPTION,
+    estimate_row_count,
+    get_row_count,
+    increment_row_count,
+)
 from api.utils.filtering_helpers import apply_filters
-from api.utils.pagination_helpers import paginate
+from api.utils.logging_helpers import log_sql
+from api.utils.pagination_helpers import CURSOR_DESCRIPTION, paginate
+from api.utils.response_cache_helpers import cached_response
 from api.utils.sorting_helpers import apply_sorting
 
 router = APIRouter()
@@ -28,9 +36,12 @@ async def create_category(
     data = category.model_dump()
     query = category_table.insert().values(data)
 
-    logger.debug(query)
+    log_sql(logger, query)
+
+    async with database.transaction():
+        last_record_id = await database.execute(query)
+        await increment_row_count(database, category_table)
 
-    last_record_id = await database.execute(query)
     return {**data, "id": last_record_id}
 
 
@@ -41,24 +52,54 @@ async def get_all_category(
     per_page: int = Query(10, gt=0),
     sort: Optional[CategorySortOptions] = Query(None),
     filters: CategoryFilter = Depends(),
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    estimate: bool = Query(False, description=ESTIMATE_DESCRIPTION),
 ):
-    path = "category/category"
     filters_dict = {k: v for k, v in filters.dict().items() if v is not None}
-    query_with_filters, filters_kv_pairs = apply_filters(filters_dict, category_table)
-
-    if sort:
-        query_with_filters = apply_sorting(sort, query_with_filters)
-
-    return await paginate(
-        request,
+    key = (
+        "category",
+        str(request.base_url),
         page,
         per_page,
-        category_table,
-        database,
-        path,
-        query_with_filters,
-        filters_kv_pairs,
         sort.value if sort else None,
+        tuple(sorted(filters_dict.items())),
+        cursor,
+        estimate,
+    )
+
+    async def build() -> PaginatedResponse:
+        path = "category/category"
+        query_with_filters, filters_kv_pairs = apply_filters(
+            filters_dict, category_table
+        )
+
+        if sort:
+            query_with_filters = apply_sorting(sort, query_with_filters)
+
+        total = None
+        if not filters_dict:
+            total = await get_row_count(database, category_table)
+        elif estimate:
+            total = await estimate_row_count(
+                database, category_table, query_with_filters
+            )
+
+        return await paginate(
+            request,
+            page,
+            per_page,
+            category_table,
+            database,
+            path,
+            query_with_filters,
+            filters_kv_pairs,
+            sort.value if sort else None,
+            total,
+            cursor=cursor,
+        )
+
+    return await cached_response(
+        database, key, (category_table,), PaginatedResponse[Category], build
     )
 
 
@@ -67,6 +108,6 @@ async def find_category(category_id: int):
 
     query = category_table.select().where(category_table.c.id == category_id)
 
-    logger.debug(query)
+    log_sql(logger, query)
 
     return await database.fetch_one(query)
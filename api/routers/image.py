@@ -0,0 +1,32 @@
+import logging
+from typing import Optional
+
+from fastapi import APIRouter, Query
+from fastapi.responses import FileResponse
+
+from api.models.image import ImageFormat
+from api.utils.image_helpers import MEDIA_TYPES, VARIANT_SIZES, get_image_variant
+from api.utils.static_helpers import cache_control
+
+router = APIRouter()
+
+logger = logging.getLogger(__name__)
+
+
+@router.get("/{name}", response_class=FileResponse)
+async def get_image(
+    name: str,
+    w: Optional[int] = Query(None, description=f"Width, one of {VARIANT_SIZES}"),
+    h: Optional[int] = Query(None, description=f"Height, one of {VARIANT_SIZES}"),
+    fmt: Optional[ImageFormat] = Query(
+        None, description="Output format, defaults to the format of the upload"
+    ),
+):
+    logger.info(f"Getting image variant of {name}")
+
+    path, fmt = await get_image_variant(name, w, h, fmt)
+    return FileResponse(
+        path,
+        media_type=MEDIA_TYPES[fmt],
+        headers={"cache-control": cache_control(name)},
+    )
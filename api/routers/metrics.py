@@ -0,0 +1,114 @@
+import logging
+from typing import Iterable
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from api.logging_conf import log_queue_stats
+from api.security import password_executor, token_cache, user_cache
+from api.tasks import email_outcomes
+from api.utils.image_helpers import variant_cache
+from api.utils.metrics_helpers import request_metrics
+from api.utils.product_helpers import image_executor
+from api.utils.response_cache_helpers import response_cache
+
+router = APIRouter()
+
+logger = logging.getLogger(__name__)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def family(name: str, kind: str, samples: dict[str, float]) -> Iterable[str]:
+    """One metric family whose samples are keyed by their label set."""
+    yield f"# TYPE {name} {kind}"
+    for labels, value in samples.items():
+        yield f"{name}{{{labels}}} {value}" if labels else f"{name} {value}"
+
+
+def cache_metrics() -> Iterable[str]:
+    caches = {
+        "responses": response_cache.stats(),
+        "users": user_cache.stats(),
+        "tokens": token_cache.stats(),
+        "image_variants": variant_cache.stats(),
+    }
+    for stat in ("hits", "misses"):
+        yield from family(
+            f"cache_{stat}_total",
+            "counter",
+            {f'cache="{name}"': stats[stat] for name, stats in caches.items()},
+        )
+    yield from family(
+        "cache_evictions_total",
+        "counter",
+        {
+            f'cache="{name}"': stats["evictions"]
+            for name, stats in caches.items()
+            if "evictions" in stats
+        },
+    )
+    yield from family(
+        "cache_entries",
+        "gauge",
+        {
+            f'cache="{name}"': stats.get("size", stats.get("files"))
+            for name, stats in caches.items()
+        },
+    )
+    yield from family(
+        "cache_bytes",
+        "gauge",
+        {
+            f'cache="{name}"': stats["bytes"]
+            for name, stats in caches.items()
+            if "bytes" in stats
+        },
+    )
+
+
+def pool_metrics() -> Iterable[str]:
+    pools = {pool.name: pool.stats() for pool in (password_executor, image_executor)}
+    yield from family(
+        "pool_pending_jobs",
+        "gauge",
+        {f'pool="{name}"': stats["pending"] for name, stats in pools.items()},
+    )
+    for stat in ("completed", "rejected"):
+        yield from family(
+            f"pool_{stat}_jobs_total",
+            "counter",
+            {f'pool="{name}"': stats[stat] for name, stats in pools.items()},
+        )
+
+
+def task_metrics() -> Iterable[str]:
+    yield from family(
+        "background_emails_total",
+        "counter",
+        {
+            f'outcome="{outcome}"': email_outcomes[outcome]
+            for outcome in ("sent", "failed")
+        },
+    )
+    logs = log_queue_stats()
+    yield from family("log_queue_records", "gauge", {"": logs["queued"]})
+    yield from family(
+        "log_records_dropped_total",
+        "counter",
+        {f'level="{level}"': count for level, count in logs["dropped"].items()},
+    )
+
+
+@router.get("", response_class=PlainTextResponse)
+async def get_metrics():
+    logger.debug("Rendering metrics")
+    lines = [
+        *request_metrics.render(),
+        *cache_metrics(),
+        *pool_metrics(),
+        *task_metrics(),
+    ]
+    return PlainTextResponse(
+        "\n".join(lines) + "\n", media_type=PROMETHEUS_CONTENT_TYPE
+    )
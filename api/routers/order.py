@@ -1,20 +1,30 @@
 import logging
 from datetime import datetime as dt
 from datetime import timedelta
-from decimal import Decimal
-from typing import Annotated
+from typing import Annotated, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Query, Request
-from sqlalchemy import func, join
 from sqlalchemy.exc import DBAPIError, IntegrityError, SQLAlchemyError
 from sqlalchemy.sql import select
 
-from api.database import database, order_item_table, order_table, product_table
-from api.models.order import Order, OrderIn
+from api.database import database, order_table
+from api.models.order import Order, OrderBatch, OrderBatchIn, OrderIn
 from api.models.pagination import PaginatedResponse
 from api.models.user import User
 from api.security import get_current_user
-from api.utils.pagination_helpers import paginate
+from api.utils.counter_helpers import get_row_count, increment_row_count
+from api.utils.money_helpers import format_cents
+from api.utils.order_helpers import (
+    fetch_prices,
+    find_missing_products,
+    insert_orders,
+    order_from_row,
+    order_products,
+    order_total,
+)
+from api.utils.pagination_helpers import CURSOR_DESCRIPTION, paginate
+from api.utils.rollup_helpers import update_rollups
+from api.utils.transaction_helpers import write_transaction
 
 router = APIRouter()
 
@@ -26,29 +36,13 @@ async def create_order(
     order_in: OrderIn, current_user: Annotated[User, Depends(get_current_user)]
 ):
     try:
-        async with database.transaction():
+        async with write_transaction(database):
             logger.info("Creating order")
 
-            product_ids = [product.product_id for product in order_in.products]
-            # logger.debug(product_ids)
-
-            products_query = select(product_table.c.id, product_table.c.price).where(
-                product_table.c.id.in_(product_ids)
+            prices = await fetch_prices(
+                database, (product.product_id for product in order_in.products)
             )
-            logger.debug(products_query)
-
-            products = await database.fetch_all(products_query)
-            # logger.debug(products)
-
-            existing_product_ids = {product.id for product in products}
-            # logger.debug(existing_product_ids)
-
-            missing_products = [
-                missing_products_id
-                for missing_products_id in product_ids
-                if missing_products_id not in existing_product_ids
-            ]
-            # logger.debug(missing_products)
+            missing_products = find_missing_products(order_in.products, prices)
 
             if missing_products:
                 missing_products_str = ", ".join(
@@ -62,58 +56,28 @@ async def create_order(
 
             current_time = dt.utcnow()
             payment_due_date = current_time + timedelta(days=5)
+            total_cents = order_total(order_in.products, prices)
 
             order_values = {
                 "delivery_address": order_in.delivery_address,
                 "order_date": current_time,
                 "payment_due_date": payment_due_date,
+                "total_cents": total_cents,
                 "customer_id": current_user.id,
             }
             # logger.debug(order_values)
 
-            new_order_id = await database.execute(
-                order_table.insert().values(order_values)
-            )
-            # logger.debug(new_order_id)
-
-            total_price = Decimal("0.00")
-            # logger.debug(order_in.products)
-            order_items_data = []
-
-            for product in order_in.products:
-                product_id = product.product_id
-                quantity = product.quantity
-
-                product_price_str = next(
-                    (p.price for p in products if p.id == product_id), "0.00"
-                )
-                product_price = Decimal(product_price_str)
-                total_price += product_price * quantity
-
-                order_items_data.append(
-                    {
-                        "order_id": new_order_id,
-                        "product_id": product_id,
-                        "quantity": quantity,
-                    }
-                )
-
-            await database.execute_many(order_item_table.insert(), order_items_data)
-
-            await database.execute(
-                order_table.update()
-                .where(order_table.c.id == new_order_id)
-                .values(total_price=str(total_price))
+            (new_order_id,) = await insert_orders(
+                database, [order_values], [order_in.products], prices
             )
+            await increment_row_count(database, order_table)
+            await update_rollups(database, new_order_id, new_order_id)
 
             order_response = {
+                **order_values,
                 "id": new_order_id,
-                "order_date": current_time,
-                "payment_due_date": payment_due_date,
-                "total_price": str(total_price),
-                "customer_id": current_user.id,
+                "total_price": format_cents(total_cents),
                 "products": [product.model_dump() for product in order_in.products],
-                "delivery_address": order_in.delivery_address,
             }
 
             # logger.debug(order_response)
@@ -136,91 +100,131 @@ async def create_order(
         raise HTTPException(status_code=500, detail="An unexpected error occurred")
 
 
+@router.post("/batch", response_model=OrderBatch, status_code=200)
+async def create_orders(
+    batch_in: OrderBatchIn, current_user: Annotated[User, Depends(get_current_user)]
+):
+    """Create many orders in one transaction.
+
+    Every order is validated on its own: orders referring to missing products
+    are reported with a 404 result and the others are still created."""
+    try:
+        async with write_transaction(database):
+            logger.info(f"Creating a batch of {len(batch_in.orders)} orders")
+
+            prices = await fetch_prices(
+                database,
+                (
+                    product.product_id
+                    for order_in in batch_in.orders
+                    for product in order_in.products
+                ),
+            )
+
+            current_time = dt.utcnow()
+            payment_due_date = current_time + timedelta(days=5)
+
+            results = [None] * len(batch_in.orders)
+            accepted, orders_values = [], []
+            for index, order_in in enumerate(batch_in.orders):
+                if missing_products := find_missing_products(order_in.products, prices):
+                    results[index] = {
+                        "index": index,
+                        "status_code": 404,
+                        "detail": "Products not found: "
+                        + ", ".join(str(product_id) for product_id in missing_products),
+                    }
+                    continue
+
+                accepted.append(index)
+                orders_values.append(
+                    {
+                        "delivery_address": order_in.delivery_address,
+                        "order_date": current_time,
+                        "payment_due_date": payment_due_date,
+                        "total_cents": order_total(order_in.products, prices),
+                        "customer_id": current_user.id,
+                    }
+                )
+
+            order_ids = await insert_orders(
+                database,
+                orders_values,
+                [batch_in.orders[index].products for index in accepted],
+                prices,
+            )
+            if order_ids:
+                await increment_row_count(database, order_table, len(order_ids))
+                await update_rollups(database, order_ids[0], order_ids[-1])
+
+            for index, order_id, order_values in zip(
+                accepted, order_ids, orders_values
+            ):
+                products = batch_in.orders[index].products
+                results[index] = {
+                    "index": index,
+                    "status_code": 201,
+                    "order": {
+                        **order_values,
+                        "id": order_id,
+                        "total_price": format_cents(order_values["total_cents"]),
+                        "products": [product.model_dump() for product in products],
+                    },
+                }
+
+            logger.info(f"Created {len(order_ids)} of {len(results)} orders")
+            return {"results": results}
+
+    except IntegrityError as e:
+        logger.error(f"Integrity error: {e}")
+        raise HTTPException(
+            status_code=400,
+            detail="Data integrity error. Make sure the data is correct.",
+        )
+
+    except DBAPIError as e:
+        logger.error(f"Database API error: {e}")
+        raise HTTPException(status_code=500, detail="Database operation failed.")
+
+
 @router.get("/orders", response_model=PaginatedResponse[Order])
 async def get_all_orders(
     request: Request,
     page: int = Query(1, gt=0),
     per_page: int = Query(10, gt=0),
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
 ):
     try:
-        offset = (page - 1) * per_page
-
-        # Creating a subquery for `order_table` with a limit
-        limited_order_subquery = (
-            select(
-                order_table.c.id,
-                order_table.c.delivery_address,
-                order_table.c.order_date,
-                order_table.c.payment_due_date,
-                order_table.c.total_price,
-                order_table.c.customer_id,
-            )
-            .limit(per_page)
-            .offset(offset)
-            .subquery()
-        )
-
-        orders_items_join = join(
-            limited_order_subquery,
-            order_item_table,
-            limited_order_subquery.c.id == order_item_table.c.order_id,
+        orders_query = select(
+            order_table.c.id,
+            order_table.c.delivery_address,
+            order_table.c.order_date,
+            order_table.c.payment_due_date,
+            order_table.c.total_cents,
+            order_table.c.customer_id,
+            order_products,
         )
-
-        query = select(
-            limited_order_subquery.c.id,
-            limited_order_subquery.c.delivery_address,
-            limited_order_subquery.c.order_date,
-            limited_order_subquery.c.payment_due_date,
-            limited_order_subquery.c.total_price,
-            limited_order_subquery.c.customer_id,
-            order_item_table.c.product_id,
-            order_item_table.c.quantity,
-        ).select_from(orders_items_join)
-        # logger.debug(query)
+        # logger.debug(orders_query)
 
         path = "order/orders"
 
-        count_query = select(func.count()).select_from(order_table)
-        total = await database.fetch_one(count_query)
+        total = await get_row_count(database, order_table)
 
         paginated_results = await paginate(
             request,
             page,
             per_page,
-            orders_items_join,
+            order_table,
             database,
             path,
-            query,
+            orders_query,
             total=total,
+            cursor=cursor,
         )
-
-        orders_with_products = {}
-        for result in paginated_results.results:
-            order_id = result.id
-            if order_id not in orders_with_products:
-                orders_with_products[order_id] = {
-                    "id": order_id,
-                    "delivery_address": result.delivery_address,
-                    "order_date": result.order_date,
-                    "payment_due_date": result.payment_due_date,
-                    "total_price": str(result.total_price),
-                    "customer_id": result.customer_id,
-                    "products": [],
-                }
-
-            orders_with_products[order_id]["products"].append(
-                {"product_id": result.product_id, "quantity": result.quantity}
-            )
-        # logger.debug(list(orders_with_products.values()))
-
-        return PaginatedResponse(
-            page=paginated_results.page,
-            per_page=paginated_results.per_page,
-            totalItems=total[0],
-            nextPageUrl=paginated_results.nextPageUrl,
-            prevPageUrl=paginated_results.prevPageUrl,
-            results=list(orders_with_products.values()),
-        )
+        paginated_results.results = [
+            order_from_row(row) for row in paginated_results.results
+        ]
+        return paginated_results
 
     except SQLAlchemyError as e:
         logger.error(f"Database error: {e}")
@@ -1,5 +1,4 @@
 import logging
-from pathlib import Path
 from typing import Annotated, Optional
 
 from fastapi import (
@@ -15,39 +14,52 @@ from fastapi import (
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.sql import select
 
-from api.database import category_table, database, product_table
+from api.database import category_table, database, product_price, product_table
 from api.models.filtering import ProductFilter
 from api.models.pagination import PaginatedResponse
 from api.models.product import Product, ProductWithCategoryName
 from api.models.sorting import ProductSortOptions
 from api.models.user import User
 from api.security import get_current_user
+from api.utils.category_helpers import with_category_names
+from api.utils.columnar_helpers import (
+    catalog_versions,
+    paginate_catalog,
+    refresh_catalog,
+    use_columnar_catalog,
+)
+from api.utils.counter_helpers import (
+    ESTIMATE_DESCRIPTION,
+    estimate_row_count,
+    get_row_count,
+    increment_row_count,
+)
 from api.utils.filtering_helpers import apply_filters
-from api.utils.pagination_helpers import paginate
-from api.utils.product_helpers import save_product_image
+from api.utils.logging_helpers import log_sql
+from api.utils.money_helpers import MAX_AMOUNT, to_cents
+from api.utils.pagination_helpers import CURSOR_DESCRIPTION, paginate
+from api.utils.product_helpers import (
+    acquire_image,
+    discard_image,
+    publish_image,
+    release_image,
+    save_product_image,
+)
+from api.utils.response_cache_helpers import cached_response
+from api.utils.search_helpers import SEARCH_DESCRIPTION, apply_search
 from api.utils.sorting_helpers import apply_sorting
+from api.utils.transaction_helpers import write_transaction
 
 router = APIRouter()
 
 logger = logging.getLogger(__name__)
 
-CHUNK_SIZE = 1024 * 1024
-MAX_IMAGE_SIZE = 5 * 1024 * 1024
-ALLOWED_IMAGE_TYPES = ["image/jpeg", "image/png"]
-ALLOWED_IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png"}
-
-THUMBNAIL_SIZE = (128, 128)
-
-BASE_DIR = Path(__file__).resolve().parent.parent
-IMAGE_DIR = BASE_DIR / "images"
-THUMBNAIL_DIR = BASE_DIR / "thumbnails"
-
 
 @router.post("/", response_model=Product, status_code=201)
 async def create_product(
     name: str = Form(...),
     description: str = Form(...),
-    price: float = Form(...),
+    price: float = Form(..., ge=-MAX_AMOUNT, le=MAX_AMOUNT),
     category_id: int = Form(...),
     file: Optional[UploadFile] = File(None),
 ):
@@ -57,24 +69,45 @@ async def create_product(
         data = {
             "name": name,
             "description": description,
-            "price": price,
+            "price_cents": to_cents(price),
             "category_id": category_id,
             "image": None,
         }
 
-        logger.debug(f"DATA: {data}")
+        logger.debug("DATA: %s", dict(data))
+        image = None
         if file:
-            file_location, thumbnail_path = await save_product_image(file)
+            image = await save_product_image(file)
 
-            data["image"] = str(file_location)
-            data["thumbnail"] = str(thumbnail_path)
+            data["image"] = str(image.image_path)
+            data["thumbnail"] = str(image.thumbnail_path)
 
         query = product_table.insert().values(data)
 
-        logger.debug(query)
+        log_sql(logger, query)
+
+        try:
+            async with write_transaction(database):
+                before = await catalog_versions(database)
+                last_record_id = await database.execute(query)
+                await increment_row_count(database, product_table)
+                if image:
+                    await acquire_image(database, image)
+                after = await catalog_versions(database)
+        except BaseException:
+            if image:
+                discard_image(image)
+            raise
 
-        last_record_id = await database.execute(query)
-        return {**data, "id": last_record_id}
+        if image:
+            await publish_image(image)
+
+        await refresh_catalog(database, [last_record_id], before, after)
+        return {**data, "price": data["price_cents"] / 100, "id": last_record_id}
+
+    except HTTPException:
+        # Rejected uploads (400) and a saturated image pool (503) reach the client
+        raise
 
     except SQLAlchemyError as e:
         logger.error(f"Database error: {e}")
@@ -96,64 +129,117 @@ async def get_all_product(
     per_page: int = Query(10, gt=0),
     sort: Optional[ProductSortOptions] = Query(None),
     filters: ProductFilter = Depends(),
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    estimate: bool = Query(False, description=ESTIMATE_DESCRIPTION),
+    q: Optional[str] = Query(None, description=SEARCH_DESCRIPTION),
 ):
-    path = "product/product"
-    product_with_category_query = select(
-        product_table.c.name,
-        product_table.c.description,
-        product_table.c.price,
-        category_table.c.name.label("category_name"),
-        product_table.c.image,
-        product_table.c.id,
-        product_table.c.thumbnail,
-    ).join(category_table, product_table.c.category_id == category_table.c.id)
-
     filters_dict = {k: v for k, v in filters.dict().items() if v is not None}
-    query_with_filters, filters_kv_pairs = apply_filters(
-        filters_dict, product_with_category_query
-    )
-
-    if sort:
-        query_with_filters = apply_sorting(sort, query_with_filters)
-
-    return await paginate(
-        request,
+    key = (
+        "product",
+        str(request.base_url),
         page,
         per_page,
-        product_table,
-        database,
-        path,
-        query_with_filters,
-        filters_kv_pairs,
         sort.value if sort else None,
+        tuple(sorted(filters_dict.items())),
+        q,
+        cursor,
+        estimate,
     )
 
+    async def build() -> PaginatedResponse:
+        path = "product/product"
+        if use_columnar_catalog(cursor, q):
+            return await paginate_catalog(
+                request,
+                page,
+                per_page,
+                database,
+                path,
+                filters_dict,
+                sort.value if sort else None,
+            )
 
-@router.get("/{product_id}", response_model=ProductWithCategoryName)
-async def find_product(product_id: int):
-    logger.info(f"Finding product with id {product_id}")
+        product_with_category_query = select(
+            product_table.c.name,
+            product_table.c.description,
+            product_price,
+            product_table.c.category_id,
+            product_table.c.image,
+            product_table.c.id,
+            product_table.c.thumbnail,
+        )
+
+        if q is not None:
+            product_with_category_query = apply_search(q, product_with_category_query)
 
-    query = (
-        select(
-            [
-                product_table.c.name,
-                product_table.c.description,
-                product_table.c.price,
-                category_table.c.name.label("category_name"),
-                product_table.c.image,
-                product_table.c.id,
-                product_table.c.thumbnail,
-            ]
+        query_with_filters, filters_kv_pairs = apply_filters(
+            filters_dict, product_with_category_query
         )
-        .select_from(
-            product_table.join(
-                category_table, product_table.c.category_id == category_table.c.id
+
+        if q is not None:
+            filters_kv_pairs["q"] = q
+
+        default_sort = None
+        if sort:
+            query_with_filters = apply_sorting(sort, query_with_filters)
+        elif q is not None:
+            default_sort = "rank"
+            query_with_filters = apply_sorting(default_sort, query_with_filters)
+
+        total = None
+        if not filters_dict and q is None:
+            total = await get_row_count(database, product_table)
+        elif estimate:
+            total = await estimate_row_count(
+                database, product_table, query_with_filters
             )
+
+        response = await paginate(
+            request,
+            page,
+            per_page,
+            product_table,
+            database,
+            path,
+            query_with_filters,
+            filters_kv_pairs,
+            sort.value if sort else None,
+            total,
+            cursor=cursor,
+            default_sort=default_sort,
         )
-        .where(product_table.c.id == product_id)
+        response.results = await with_category_names(database, response.results)
+        return response
+
+    return await cached_response(
+        database,
+        key,
+        (product_table, category_table),
+        PaginatedResponse[ProductWithCategoryName],
+        build,
     )
 
-    return await database.fetch_one(query)
+
+@router.get("/{product_id}", response_model=ProductWithCategoryName)
+async def find_product(product_id: int):
+    logger.info(f"Finding product with id {product_id}")
+
+    query = select(
+        product_table.c.name,
+        product_table.c.description,
+        product_price,
+        product_table.c.category_id,
+        product_table.c.image,
+        product_table.c.id,
+        product_table.c.thumbnail,
+    ).where(product_table.c.id == product_id)
+
+    product = await database.fetch_one(query)
+    if product is None:
+        return None
+
+    (product,) = await with_category_names(database, [product])
+    return product
 
 
 @router.delete("/{product_id}", status_code=204)
@@ -162,7 +248,8 @@ async def delete_product(
 ):
     logger.info(f"Deleting product with id {product_id}")
 
-    async with database.transaction():
+    async with write_transaction(database):
+        before = await catalog_versions(database)
         select_query = product_table.select().where(product_table.c.id == product_id)
         product = await database.fetch_one(select_query)
 
@@ -171,7 +258,11 @@ async def delete_product(
 
         delete_query = product_table.delete().where(product_table.c.id == product_id)
         await database.execute(delete_query)
+        await increment_row_count(database, product_table, -1)
+        await release_image(database, product.image, product.thumbnail)
+        after = await catalog_versions(database)
 
+    await refresh_catalog(database, [product_id], before, after)
     return {"message": "Product deleted successfully."}
 
 
@@ -180,7 +271,7 @@ async def update_product(
     product_id: int,
     name: Optional[str] = Form(None),
     description: Optional[str] = Form(None),
-    price: Optional[float] = Form(None),
+    price: Optional[float] = Form(None, ge=-MAX_AMOUNT, le=MAX_AMOUNT),
     category_id: Optional[int] = Form(None),
     file: Optional[UploadFile] = File(None),
 ):
@@ -189,7 +280,7 @@ async def update_product(
     data = {
         "name": name,
         "description": description,
-        "price": price,
+        "price_cents": None if price is None else to_cents(price),
         "category_id": category_id,
         "image": None,
     }
@@ -197,25 +288,45 @@ async def update_product(
     # Remove None values from data
     data = {k: v for k, v in data.items() if v is not None}
 
+    image = None
     if file:
-        file_location, thumbnail_path = await save_product_image(file)
+        image = await save_product_image(file)
 
-        data["image"] = str(file_location)
-        data["thumbnail"] = str(thumbnail_path)
+        data["image"] = str(image.image_path)
+        data["thumbnail"] = str(image.thumbnail_path)
 
-    async with database.transaction():
-        update_query = (
-            product_table.update()
-            .where(product_table.c.id == product_id)
-            .values(**data)
-        )
+    select_query = select(product_table, product_price).where(
+        product_table.c.id == product_id
+    )
 
-        await database.execute(update_query)
+    try:
+        async with write_transaction(database):
+            before = await catalog_versions(database)
+            previous = await database.fetch_one(select_query)
+            if not previous:
+                raise HTTPException(status_code=404, detail="Product not found")
+
+            update_query = (
+                product_table.update()
+                .where(product_table.c.id == product_id)
+                .values(**data)
+            )
 
-        select_query = product_table.select().where(product_table.c.id == product_id)
-        product = await database.fetch_one(select_query)
+            await database.execute(update_query)
+
+            if image:
+                await acquire_image(database, image)
+                await release_image(database, previous.image, previous.thumbnail)
+
+            product = await database.fetch_one(select_query)
+            after = await catalog_versions(database)
+    except BaseException:
+        if image:
+            discard_image(image)
+        raise
 
-    if not product:
-        raise HTTPException(status_code=404, detail="Product not found")
+    if image:
+        await publish_image(image)
 
+    await refresh_catalog(database, [product_id], before, after)
     return product
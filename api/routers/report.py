@@ -0,0 +1,98 @@
+import logging
+from datetime import date, timedelta
+from typing import Annotated, List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.sql import select
+
+from api.database import (
+    database,
+    sales_by_category_table,
+    sales_by_day_table,
+    sales_by_product_table,
+)
+from api.models.report import CategorySales, DailySales, ProductSales
+from api.models.user import User, UserRole
+from api.security import get_current_user
+from api.utils.category_helpers import category_names
+from api.utils.money_helpers import format_cents
+
+router = APIRouter()
+
+logger = logging.getLogger(__name__)
+
+# Every report reads only the rollup tables, never the order history
+
+
+async def get_current_seller(
+    current_user: Annotated[User, Depends(get_current_user)]
+) -> User:
+    if current_user.role != UserRole.seller:
+        raise HTTPException(status_code=403, detail="Reports are only for sellers")
+    return current_user
+
+
+@router.get("/daily", response_model=List[DailySales])
+async def get_daily_sales(
+    current_user: Annotated[User, Depends(get_current_seller)],
+    start: Optional[date] = Query(
+        None, description="First day, 30 days ago by default"
+    ),
+    end: Optional[date] = Query(None, description="Last day, today by default"),
+):
+    end = end or date.today()
+    start = start or end - timedelta(days=30)
+    logger.info(f"Getting daily sales from {start} to {end}")
+
+    query = (
+        select(sales_by_day_table)
+        .where(sales_by_day_table.c.day.between(start.isoformat(), end.isoformat()))
+        .order_by(sales_by_day_table.c.day)
+    )
+    return [
+        {**row._mapping, "revenue": format_cents(row.revenue_cents)}
+        for row in await database.fetch_all(query)
+    ]
+
+
+@router.get("/products", response_model=List[ProductSales])
+async def get_top_products(
+    current_user: Annotated[User, Depends(get_current_seller)],
+    limit: int = Query(10, gt=0, le=100),
+):
+    logger.info(f"Getting the {limit} products with the most revenue")
+
+    query = (
+        select(sales_by_product_table)
+        .order_by(
+            sales_by_product_table.c.revenue_cents.desc(),
+            sales_by_product_table.c.product_id,
+        )
+        .limit(limit)
+    )
+    return [
+        {**row._mapping, "revenue": format_cents(row.revenue_cents)}
+        for row in await database.fetch_all(query)
+    ]
+
+
+@router.get("/categories", response_model=List[CategorySales])
+async def get_category_sales(
+    current_user: Annotated[User, Depends(get_current_seller)],
+):
+    logger.info("Getting sales per category")
+
+    rows = await database.fetch_all(
+        select(sales_by_category_table).order_by(
+            sales_by_category_table.c.revenue_cents.desc()
+        )
+    )
+    names = await category_names.get(database)
+    return [
+        {
+            **row._mapping,
+            "category_name": names.get(row.category_id, ""),
+            "revenue": format_cents(row.revenue_cents),
+        }
+        for row in rows
+    ]
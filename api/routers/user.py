@@ -9,10 +9,12 @@ from api.security import (
     authenticate_user,
     create_access_token,
     create_confirmation_token,
-    get_password_hash,
     get_subject_for_token_type,
     get_user,
+    hash_password,
+    invalidate_user,
 )
+from api.utils.logging_helpers import log_sql
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -26,12 +28,12 @@ async def register(user: UserIn, background_tasks: BackgroundTasks, request: Req
             detail="User with that email already exists",
         )
 
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await hash_password(user.password)
     query = user_table.insert().values(
         email=user.email, password=hashed_password, role=user.role
     )
 
-    logger.debug(query)
+    log_sql(logger, query)
 
     await database.execute(query)
     background_tasks.add_task(
@@ -63,7 +65,8 @@ async def confirm_email(token: str):
         user_table.update().where(user_table.c.email == email).values(confirmed=True)
     )
 
-    logger.debug(query)
+    log_sql(logger, query)
 
     await database.execute(query)
+    invalidate_user(email)
     return {"detail": "User confirmed"}
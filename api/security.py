@@ -1,12 +1,19 @@
 import datetime
+import hashlib
 import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Annotated, Literal
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import ExpiredSignatureError, JWTError, jwt
 import bcrypt
+from api.config import config
 from api.database import database, user_table
+from api.utils.cache_helpers import TTLCache
+from api.utils.executor_helpers import BoundedExecutor
+from api.utils.logging_helpers import log_sql
 
 logger = logging.getLogger(__name__)
 
@@ -14,6 +21,26 @@ SECRET_KEY = "FsCyRyw001vCurt7d5qzQxZrxux3qXYU"
 ALGORITHM = "HS256"
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/user/token")
 
+# bcrypt releases the GIL while hashing, so threads are enough to keep the
+# ~250 ms of work per call off the event loop
+password_executor = BoundedExecutor(
+    "password",
+    lambda: ThreadPoolExecutor(
+        max_workers=config.PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt"
+    ),
+    max_pending=config.PASSWORD_HASH_MAX_PENDING,
+)
+
+# Users resolved by get_current_user, keyed by email. Anything that updates a
+# user row has to call invalidate_user so the change is seen before the TTL.
+user_cache = TTLCache(
+    max_size=config.USER_CACHE_MAX_SIZE, ttl=config.USER_CACHE_TTL_SECONDS
+)
+
+# Verified JWT claims keyed by the SHA-256 of the token. Entries expire at the
+# token's own `exp` on the wall clock, failed verifications are never stored.
+token_cache = TTLCache(max_size=config.TOKEN_CACHE_MAX_SIZE, ttl=0, clock=time.time)
+
 
 def create_credentials_exception(detail: str) -> HTTPException:
     return HTTPException(
@@ -51,11 +78,25 @@ def create_confirmation_token(email: str, role: str):
     return encoded_jwt
 
 
+def decode_token(token: str) -> dict:
+    key = hashlib.sha256(token.encode("utf-8")).digest()
+    payload = token_cache.get(key)
+    if payload is not None:
+        return payload
+
+    payload = jwt.decode(token, key=SECRET_KEY, algorithms=[ALGORITHM])
+
+    expire = payload.get("exp")
+    if isinstance(expire, (int, float)):
+        token_cache.set(key, payload, ttl=expire - time.time())
+    return payload
+
+
 def get_subject_for_token_type(
     token: str, type: Literal["access", "confirmation"]
 ) -> str:
     try:
-        payload = jwt.decode(token, key=SECRET_KEY, algorithms=[ALGORITHM])
+        payload = decode_token(token)
     except ExpiredSignatureError as e:
         raise create_credentials_exception("Token has expired") from e
     except JWTError as e:
@@ -85,12 +126,21 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     password_byte_enc = plain_password.encode('utf-8')
     return bcrypt.checkpw(password = password_byte_enc , hashed_password = hashed_password)
 
+
+async def hash_password(password: str) -> str:
+    return await password_executor.run(get_password_hash, password)
+
+
+async def check_password(plain_password: str, hashed_password: str) -> bool:
+    return await password_executor.run(verify_password, plain_password, hashed_password)
+
+
 async def get_user(email: str):
     logger.debug("Fetching user from the database", extra={"email": email})
 
     query = user_table.select().where(user_table.c.email == email)
 
-    logger.debug(f"Query: {query}")
+    log_sql(logger, query)
 
     result = await database.fetch_one(query)
     if result:
@@ -102,7 +152,7 @@ async def authenticate_user(email: str, password: str):
     user = await get_user(email)
     if not user:
         raise create_credentials_exception("Invalid email or password")
-    if not verify_password(password, user.password):
+    if not await check_password(password, user.password):
         raise create_credentials_exception("Invalid email or password")
     if not user.confirmed:
         raise create_credentials_exception("User has not confirmed email")
@@ -110,11 +160,11 @@ async def authenticate_user(email: str, password: str):
 
 
 async def authenticate_user_with_role(email: str, password: str, role: str):
-    logger.debug(f"Authenticating user with role {role}", extra={"email": email})
+    logger.debug("Authenticating user with role %s", role, extra={"email": email})
     user = await get_user(email)
     if not user:
         raise create_credentials_exception("Invalid email or password")
-    if not verify_password(password, user.password):
+    if not await check_password(password, user.password):
         raise create_credentials_exception("Invalid email or password")
     if not user.confirmed:
         raise create_credentials_exception("User has not confirmed email")
@@ -123,10 +173,20 @@ async def authenticate_user_with_role(email: str, password: str, role: str):
     return user
 
 
+def invalidate_user(email: str) -> None:
+    logger.debug("Invalidating cached user", extra={"email": email})
+    user_cache.pop(email)
+
+
 async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)]):
     email = get_subject_for_token_type(token, "access")
+    user = user_cache.get(email)
+    if user is not None:
+        return user
+
     user = await get_user(email=email)
 
     if user is None:
         raise create_credentials_exception("Could not find user for this token")
+    user_cache.set(email, user)
     return user
@@ -1,4 +1,5 @@
 import logging
+from collections import Counter
 
 import httpx
 
@@ -6,6 +7,9 @@ from api.config import config
 
 logger = logging.getLogger(__name__)
 
+# Outcomes of the emails sent by background tasks, exported on /metrics
+email_outcomes: Counter[str] = Counter()
+
 
 class APIResponseError(Exception):
     pass
@@ -29,8 +33,10 @@ async def send_simple_email(to: str, subject: str, body: str):
 
             logger.debug(response.content)
 
+            email_outcomes["sent"] += 1
             return response
         except httpx.HTTPStatusError as err:
+            email_outcomes["failed"] += 1
             raise APIResponseError(
                 f"API request failed with status code {err.response.status_code}"
             ) from err
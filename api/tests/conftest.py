@@ -3,12 +3,19 @@ from typing import AsyncGenerator, Generator
 from unittest.mock import AsyncMock, Mock
 
 import pytest
+import sqlalchemy
 from fastapi.testclient import TestClient
 from httpx import AsyncClient, Request, Response
 
 os.environ["ENV_STATE"] = "test"
-from api.database import database, user_table  # noqa: E402
+from api import security  # noqa: E402
+from api.database import database, metadata, user_table  # noqa: E402
 from api.main import app  # noqa: E402
+from api.migrations import migrate  # noqa: E402
+from api.utils.category_helpers import category_names  # noqa: E402
+from api.utils.columnar_helpers import columnar_catalog  # noqa: E402
+from api.utils.query_stats_helpers import InstrumentedDatabase  # noqa: E402
+from api.utils.response_cache_helpers import response_cache  # noqa: E402
 
 
 @pytest.fixture(scope="session")
@@ -28,6 +35,37 @@ async def db() -> AsyncGenerator:
     await database.disconnect()
 
 
+@pytest.fixture()
+async def file_database(tmp_path, mocker) -> AsyncGenerator:
+    """A database committing to its own file, with a connection per request,
+    standing in for the one of the routers. The test database rolls back every
+    test on a single shared connection, so its writers never wait for a lock."""
+    url = f"sqlite:///{tmp_path / 'file.db'}"
+    engine = sqlalchemy.create_engine(url)
+    metadata.create_all(engine)
+    migrate(engine)
+    engine.dispose()
+
+    file_db = InstrumentedDatabase(url)
+    for module in ("api.routers.product", "api.routers.order"):
+        mocker.patch(f"{module}.database", file_db)
+    await file_db.connect()
+    yield file_db
+    await file_db.disconnect()
+
+
+@pytest.fixture(autouse=True)
+def clear_caches() -> Generator:
+    # The database is rolled back after every test, cached rows must go too
+    yield
+    security.user_cache.clear()
+    security.token_cache.clear()
+    response_cache.clear()
+    category_names.clear()
+    if columnar_catalog is not None:
+        columnar_catalog.clear()
+
+
 @pytest.fixture()
 async def async_client(client) -> AsyncGenerator:
     async with AsyncClient(app=app, base_url=client.base_url) as ac:
@@ -55,6 +93,19 @@ async def confirmed_user(registered_user: dict) -> dict:
     return registered_user
 
 
+@pytest.fixture()
+async def seller_token(async_client: AsyncClient) -> str:
+    user_details = {"email": "seller@example.com", "password": "123456"}
+    await async_client.post("/user/register", json={**user_details, "role": "seller"})
+    await database.execute(
+        user_table.update()
+        .where(user_table.c.email == user_details["email"])
+        .values(confirmed=True)
+    )
+    response = await async_client.post("/user/token", json=user_details)
+    return response.json()["access_token"]
+
+
 @pytest.fixture()
 async def logged_in_token(async_client: AsyncClient, confirmed_user: dict) -> str:
     response = await async_client.post("/user/token", json=confirmed_user)
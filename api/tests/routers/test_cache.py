@@ -0,0 +1,15 @@
+import pytest
+from httpx import AsyncClient
+
+
+@pytest.mark.anyio
+async def test_get_cache_stats(async_client: AsyncClient):
+    await async_client.get("/category/category")
+    await async_client.get("/category/category")
+
+    response = await async_client.get("/cache/stats")
+
+    assert response.status_code == 200
+    assert response.json()["responses"]["hits"] >= 1
+    assert response.json()["responses"]["bytes"] > 0
+    assert {"users", "tokens", "image_variants"} <= response.json().keys()
@@ -4,6 +4,7 @@ import pytest
 from httpx import AsyncClient
 
 from api import security
+from api.tests.conftest import create_category
 
 # async def create_category(
 #     name: str, async_client: AsyncClient, logged_in_token: str
@@ -74,6 +75,21 @@ async def test_get_all_categories(async_client: AsyncClient, created_category: d
     assert response.json()["results"] == [created_category]
 
 
+@pytest.mark.anyio
+async def test_get_all_categories_is_cached_until_a_write(
+    async_client: AsyncClient, created_category: dict, logged_in_token: str
+):
+    await async_client.get("/category/category")
+    response = await async_client.get("/category/category")
+    assert response.headers["x-cache"] == "HIT"
+
+    await create_category("Another", async_client, logged_in_token)
+    response = await async_client.get("/category/category")
+
+    assert response.headers["x-cache"] == "MISS"
+    assert response.json()["totalItems"] == 2
+
+
 @pytest.mark.anyio
 async def test_get_all_categories_with_pagination_first_page(
     async_client: AsyncClient, created_multiple_category: list
@@ -244,3 +260,23 @@ async def test_not_existing_sort_field_categories(
     )
 
     assert response.status_code == 422
+
+
+@pytest.mark.anyio
+async def test_get_all_categories_with_cursor_pagination(
+    async_client: AsyncClient, created_multiple_category: list
+):
+    per_page = 4
+    response = await async_client.get(
+        f"/category/category?per_page={per_page}&sort=-name&cursor="
+    )
+    first_page = response.json()
+
+    response = await async_client.get(first_page["nextPageUrl"])
+    second_page = response.json()
+
+    expected = sorted(created_multiple_category, key=lambda x: x["name"], reverse=True)
+    assert first_page["results"] == expected[:per_page]
+    assert second_page["results"] == expected[per_page:]
+    assert second_page["page"] == 2
+    assert second_page["nextPageUrl"] is None
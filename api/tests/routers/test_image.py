@@ -0,0 +1,71 @@
+from io import BytesIO
+
+import pytest
+from httpx import AsyncClient
+from PIL import Image
+
+from api.utils import image_helpers
+from api.utils.image_helpers import DiskCache
+
+
+@pytest.fixture()
+def variant_cache(mocker, tmp_path) -> DiskCache:
+    image_dir = tmp_path / "images"
+    image_dir.mkdir()
+    Image.new("RGB", (800, 600), "blue").save(image_dir / "photo.jpg", format="JPEG")
+
+    cache = DiskCache(tmp_path / "variants", max_bytes=1024 * 1024)
+    mocker.patch.object(image_helpers, "IMAGE_DIR", image_dir)
+    mocker.patch.object(image_helpers, "variant_cache", cache)
+    yield cache
+    image_helpers.image_executor.shutdown()
+
+
+@pytest.mark.anyio
+async def test_get_image_variant(async_client: AsyncClient, variant_cache: DiskCache):
+    response = await async_client.get("/image/photo.jpg?w=256&fmt=webp")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "image/webp"
+    with Image.open(BytesIO(response.content)) as variant:
+        assert variant.format == "WEBP"
+        assert variant.size == (256, 192)
+
+    response = await async_client.get("/image/photo.jpg?w=256&fmt=webp")
+
+    assert response.status_code == 200
+    assert variant_cache.stats()["hits"] == 1
+    assert variant_cache.stats()["files"] == 1
+
+
+@pytest.mark.anyio
+async def test_get_image_variant_defaults_to_source_format(
+    async_client: AsyncClient, variant_cache: DiskCache, mocker
+):
+    mocker.patch.object(
+        image_helpers.image_executor, "run", new=mocker.AsyncMock(return_value=b"jpeg")
+    )
+
+    response = await async_client.get("/image/photo.jpg?h=64")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "image/jpeg"
+    assert (variant_cache.directory / "photo.jpg.0x64.jpeg").exists()
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize(
+    "url, status_code",
+    [
+        ("/image/photo.jpg", 400),
+        ("/image/photo.jpg?w=300", 400),
+        ("/image/missing.jpg?w=64", 404),
+        ("/image/photo.jpg?w=64&fmt=gif", 422),
+    ],
+)
+async def test_get_image_variant_invalid(
+    async_client: AsyncClient, variant_cache: DiskCache, url: str, status_code: int
+):
+    response = await async_client.get(url)
+
+    assert response.status_code == status_code
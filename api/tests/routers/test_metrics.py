@@ -0,0 +1,42 @@
+import pytest
+from httpx import AsyncClient
+
+from api.utils.metrics_helpers import request_metrics
+
+
+def sample(body: str, prefix: str) -> float:
+    return next(
+        float(line.rsplit(" ", 1)[1])
+        for line in body.splitlines()
+        if line.startswith(prefix)
+    )
+
+
+@pytest.mark.anyio
+async def test_get_metrics(async_client: AsyncClient, created_product: dict):
+    request_metrics.clear()
+    await async_client.get(f"/product/{created_product['id']}")
+    await async_client.get("/product/abc")
+
+    response = await async_client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    body = response.text
+    route = 'method="GET",route="/product/{product_id}"'
+    assert sample(body, f'http_requests_total{{{route},status="200"}}') == 1
+    assert sample(body, f'http_requests_total{{{route},status="422"}}') == 1
+    assert sample(body, f"http_request_duration_seconds_count{{{route}}}") == 2
+    assert sample(body, f'http_response_size_bytes_bucket{{{route},le="+Inf"}}') == 2
+    assert sample(body, "http_requests_in_flight") == 1
+    assert 'cache_hits_total{cache="responses"}' in body
+    assert 'pool_rejected_jobs_total{pool="password"}' in body
+
+
+@pytest.mark.anyio
+async def test_unmatched_paths_share_a_label(async_client: AsyncClient):
+    request_metrics.clear()
+    await async_client.get("/no/such/path")
+    await async_client.get("/another/missing/path")
+
+    assert request_metrics.requests == {("GET", "unmatched", 404): 2}
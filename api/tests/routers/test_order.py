@@ -1,10 +1,23 @@
+import asyncio
 from typing import List
 from urllib.parse import urljoin
 
 import pytest
-from httpx import AsyncClient
+from databases import Database
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import func, select
 
 from api import security
+from api.database import (
+    category_table,
+    database,
+    order_item_table,
+    order_table,
+    product_table,
+)
+from api.main import app
+from api.tests.conftest import create_product
+from api.utils.order_helpers import line_total
 
 
 async def create_order(
@@ -198,3 +211,189 @@ async def test_get_all_orders_with_pagination_last_page(
         response.json()["prevPageUrl"]
         == f"{base_url}order/orders?page={page - 1}&per_page={per_page}"
     )
+
+
+@pytest.mark.anyio
+async def test_get_all_orders_with_cursor_pagination(
+    async_client: AsyncClient, created_multiple_order: list
+):
+    per_page = 4
+    response = await async_client.get(f"/order/orders?per_page={per_page}&cursor=")
+    first_page = response.json()
+
+    response = await async_client.get(first_page["nextPageUrl"])
+    second_page = response.json()
+
+    assert first_page["results"] == created_multiple_order[:per_page]
+    assert second_page["results"] == created_multiple_order[per_page:]
+    assert second_page["totalItems"] == 6
+    assert second_page["nextPageUrl"] is None
+
+
+@pytest.mark.anyio
+async def test_create_order_batch(
+    async_client: AsyncClient,
+    created_multiple_product: list,
+    logged_in_token: str,
+    mocker,
+):
+    # Several chunks, each with several orders
+    mocker.patch("api.utils.order_helpers.INSERT_CHUNK_SIZE", 2)
+    orders = [
+        {
+            "delivery_address": f"{i} Main St",
+            "products": [
+                {"product_id": created_multiple_product[i]["id"], "quantity": i + 1},
+                {"product_id": created_multiple_product[0]["id"], "quantity": 1},
+            ],
+        }
+        for i in range(5)
+    ]
+
+    response = await async_client.post(
+        "/order/batch",
+        json={"orders": orders},
+        headers={"Authorization": f"Bearer {logged_in_token}"},
+    )
+
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [result["status_code"] for result in results] == [201] * 5
+    assert [result["order"]["products"] for result in results] == [
+        order["products"] for order in orders
+    ]
+    assert [result["order"]["total_price"] for result in results] == [
+        f"{4 * (i + 2)}.00" for i in range(5)
+    ]
+
+    response = await async_client.get("/order/orders")
+
+    assert response.json()["totalItems"] == 5
+    assert response.json()["results"] == [result["order"] for result in results]
+
+
+@pytest.mark.anyio
+async def test_create_orders_concurrently(
+    file_database: Database, logged_in_token: str
+):
+    category_id = await file_database.execute(
+        category_table.insert().values(name="Test Category")
+    )
+    product_id = await file_database.execute(
+        product_table.insert().values(
+            name="Test Product",
+            description="Test Description",
+            price_cents=400,
+            category_id=category_id,
+        )
+    )
+    order = {
+        "delivery_address": "1 Main St",
+        "products": [{"product_id": product_id, "quantity": 1}],
+    }
+    headers = {"Authorization": f"Bearer {logged_in_token}"}
+
+    # A failed request must not end the test while the others still write
+    transport = ASGITransport(app=app, raise_app_exceptions=False)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        responses = await asyncio.gather(
+            *(client.post("/order/", json=order, headers=headers) for _ in range(8)),
+            *(
+                client.post(
+                    "/order/batch", json={"orders": [order] * 2}, headers=headers
+                )
+                for _ in range(8)
+            ),
+        )
+
+    assert [response.status_code for response in responses] == [201] * 8 + [200] * 8
+    count = select(func.count()).select_from(order_table)
+    assert await file_database.fetch_val(count) == 24
+
+
+@pytest.mark.anyio
+async def test_create_order_batch_reports_missing_products(
+    async_client: AsyncClient, created_product: dict, logged_in_token: str
+):
+    product = {"product_id": created_product["id"], "quantity": 1}
+    orders = [
+        {"delivery_address": "1 Main St", "products": [product]},
+        {
+            "delivery_address": "2 Main St",
+            "products": [{"product_id": 999, "quantity": 1}],
+        },
+        {"delivery_address": "3 Main St", "products": [product]},
+    ]
+
+    response = await async_client.post(
+        "/order/batch",
+        json={"orders": orders},
+        headers={"Authorization": f"Bearer {logged_in_token}"},
+    )
+
+    results = response.json()["results"]
+    assert [result["status_code"] for result in results] == [201, 404, 201]
+    assert results[1] == {
+        "index": 1,
+        "status_code": 404,
+        "order": None,
+        "detail": "Products not found: 999",
+    }
+
+    response = await async_client.get("/order/orders")
+
+    assert response.json()["results"] == [results[0]["order"], results[2]["order"]]
+
+
+@pytest.mark.anyio
+async def test_create_order_batch_empty(
+    async_client: AsyncClient, logged_in_token: str
+):
+    response = await async_client.post(
+        "/order/batch",
+        json={"orders": []},
+        headers={"Authorization": f"Bearer {logged_in_token}"},
+    )
+
+    assert response.status_code == 422
+
+
+@pytest.mark.anyio
+async def test_get_all_orders_nests_products(
+    async_client: AsyncClient, created_multiple_product: list, logged_in_token: str
+):
+    products = [
+        {"product_id": product["id"], "quantity": i + 1}
+        for i, product in enumerate(reversed(created_multiple_product))
+    ]
+    created = [
+        await create_order("1 Main St", products, async_client, logged_in_token),
+        await create_order("2 Main St", [], async_client, logged_in_token),
+    ]
+
+    response = await async_client.get("/order/orders")
+
+    assert response.json()["results"] == created
+    assert response.json()["results"][0]["products"] == products
+
+
+@pytest.mark.anyio
+async def test_order_totals_are_exact_cents(
+    async_client: AsyncClient, created_category: dict, logged_in_token: str
+):
+    product = await create_product(
+        "Cheap", "Cheap", 0.1, created_category["id"], async_client
+    )
+
+    order = await create_order(
+        "1 Main St",
+        [{"product_id": product["id"], "quantity": 3}],
+        async_client,
+        logged_in_token,
+    )
+
+    assert order["total_price"] == "0.30"
+    query = select(func.sum(line_total)).where(
+        order_item_table.c.order_id == order["id"]
+    )
+    assert await database.fetch_val(query) == 30
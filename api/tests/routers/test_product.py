@@ -1,15 +1,21 @@
+import asyncio
 import contextlib
+import hashlib
 import pathlib
 from io import BytesIO
 from unittest.mock import AsyncMock
 from urllib.parse import urljoin
 
 import pytest
+from databases import Database
 from httpx import AsyncClient
+from sqlalchemy import func, select
+from sqlalchemy.exc import SQLAlchemyError
 
 from api import security
-from api.routers import product
-from api.utils import product_helpers
+from api.database import category_table, database, product_search_table, product_table
+from api.tests.conftest import create_product
+from api.utils import pagination_helpers, product_helpers
 
 
 async def create_product_with_image(
@@ -54,7 +60,7 @@ def sample_image(fs) -> pathlib.Path:
     path = (
         pathlib.Path(__file__).parent.parent.parent / "images" / "test_image.png"
     ).resolve()
-    fs.create_file(path)
+    fs.create_file(path, contents=b"\x89PNG\r\n\x1a\n")
     return path
 
 
@@ -76,11 +82,32 @@ def aiofiles_mock_open(mocker):
 
 @pytest.fixture
 def mock_create_thumbnail(mocker):
-    mock = AsyncMock(return_value=product.THUMBNAIL_DIR / "thumbnail_test_image.png")
+    async def create_thumbnail(image_path, thumbnail_size, thumbnail_path):
+        thumbnail_path.parent.mkdir(parents=True, exist_ok=True)
+        thumbnail_path.write_bytes(b"thumbnail")
+        return thumbnail_path
+
+    mock = AsyncMock(side_effect=create_thumbnail)
     mocker.patch.object(product_helpers, "create_thumbnail", new=mock)
     return mock
 
 
+async def upload_product_image(
+    async_client: AsyncClient, category_id: int, image: pathlib.Path
+) -> dict:
+    form_data = {
+        "name": (None, "Test Product"),
+        "description": (None, "Test Description"),
+        "price": (None, "4.0"),
+        "category_id": (None, str(category_id)),
+    }
+    response = await async_client.post(
+        "/product/", data=form_data, files={"file": open(image, "rb")}
+    )
+    assert response.status_code == 201
+    return response.json()
+
+
 @pytest.mark.anyio
 async def test_create_product_with_image(
     async_client: AsyncClient,
@@ -111,8 +138,149 @@ async def test_create_product_with_image(
         "price": price,
         "category_id": category_id,
     }.items() <= response.json().items()
-    assert "test_image.png" in response.json()["image"]
-    assert "thumbnail_test_image.png" in response.json()["thumbnail"]
+    digest = hashlib.sha256(sample_image.read_bytes()).hexdigest()
+    image_path, thumbnail_path = product_helpers.image_paths(digest, ".png")
+    assert response.json()["image"] == str(image_path)
+    assert response.json()["thumbnail"] == str(thumbnail_path)
+    assert image_path.read_bytes() == sample_image.read_bytes()
+    assert thumbnail_path.read_bytes() == b"thumbnail"
+    assert list(product_helpers.THUMBNAIL_DIR.glob(".*.part")) == []
+
+
+@pytest.mark.anyio
+async def test_create_product_with_image_failed_transaction_leaves_no_files(
+    async_client: AsyncClient,
+    created_category: dict,
+    sample_image: pathlib.Path,
+    mock_create_thumbnail: AsyncMock,
+    mocker,
+):
+    mocker.patch(
+        "api.routers.product.acquire_image", side_effect=SQLAlchemyError("failed")
+    )
+    form_data = {
+        "name": (None, "Test Product"),
+        "description": (None, "Test Description"),
+        "price": (None, "4.0"),
+        "category_id": (None, str(created_category["id"])),
+    }
+
+    response = await async_client.post(
+        "/product/", data=form_data, files={"file": open(sample_image, "rb")}
+    )
+
+    assert response.status_code == 500
+    mock_create_thumbnail.assert_awaited_once()
+    assert list(product_helpers.IMAGE_DIR.glob(".*.part")) == []
+    assert [
+        path for path in product_helpers.THUMBNAIL_DIR.rglob("*") if path.is_file()
+    ] == []
+
+
+@pytest.mark.anyio
+async def test_create_product_with_same_image_stores_it_once(
+    async_client: AsyncClient,
+    created_category: dict,
+    sample_image: pathlib.Path,
+    mock_create_thumbnail: AsyncMock,
+):
+    first = await upload_product_image(
+        async_client, created_category["id"], sample_image
+    )
+    second = await upload_product_image(
+        async_client, created_category["id"], sample_image
+    )
+
+    assert first["image"] == second["image"]
+    assert first["thumbnail"] == second["thumbnail"]
+    assert mock_create_thumbnail.await_count == 1
+    assert [path.name for path in pathlib.Path(first["image"]).parent.iterdir()] == [
+        pathlib.Path(first["image"]).name
+    ]
+    assert [path.name for path in product_helpers.IMAGE_DIR.glob(".*.part")] == []
+
+
+@pytest.mark.anyio
+async def test_delete_product_releases_image(
+    async_client: AsyncClient,
+    created_category: dict,
+    logged_in_token: str,
+    sample_image: pathlib.Path,
+    mock_create_thumbnail: AsyncMock,
+):
+    products = [
+        await upload_product_image(async_client, created_category["id"], sample_image)
+        for _ in range(2)
+    ]
+    image_path = pathlib.Path(products[0]["image"])
+    thumbnail_path = pathlib.Path(products[0]["thumbnail"])
+
+    for product, still_referenced in zip(products, [True, False]):
+        response = await async_client.delete(
+            f"/product/{product['id']}",
+            headers={"Authorization": f"Bearer {logged_in_token}"},
+        )
+
+        assert response.status_code == 204
+        assert image_path.exists() is still_referenced
+        assert thumbnail_path.exists() is still_referenced
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize(
+    "content",
+    [b"GIF89a", b"", b"\x89PNG\r\n\x1a\n" + b"0" * product_helpers.MAX_IMAGE_SIZE],
+    ids=["wrong_magic_bytes", "empty", "too_large"],
+)
+async def test_create_product_with_rejected_image(
+    async_client: AsyncClient, created_category: dict, content: bytes, fs
+):
+    fs.create_dir(product_helpers.IMAGE_DIR)
+    form_data = {
+        "name": (None, "Test Product"),
+        "description": (None, "Test Description"),
+        "price": (None, "4.0"),
+        "category_id": (None, str(created_category["id"])),
+    }
+    response = await async_client.post(
+        "/product/",
+        data=form_data,
+        files={"file": ("test_image.png", content, "image/png")},
+    )
+
+    assert response.status_code == 400
+    assert [path.name for path in product_helpers.IMAGE_DIR.glob(".*.part")] == []
+
+    response = await async_client.get("/product/product")
+    assert response.json()["totalItems"] == 0
+
+
+@pytest.mark.anyio
+async def test_upload_product_image_when_image_pool_is_saturated(
+    async_client: AsyncClient,
+    created_product: dict,
+    sample_image: pathlib.Path,
+    mocker,
+):
+    mocker.patch.object(product_helpers.image_executor, "max_pending", 0)
+    form_data = {
+        "name": (None, "Test Product"),
+        "description": (None, "Test Description"),
+        "price": (None, "4.0"),
+        "category_id": (None, str(created_product["category_id"])),
+    }
+
+    for method, url in [
+        ("POST", "/product/"),
+        ("PUT", f"/product/{created_product['id']}"),
+    ]:
+        response = await async_client.request(
+            method, url, data=form_data, files={"file": open(sample_image, "rb")}
+        )
+
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "1"
+    assert [path.name for path in product_helpers.IMAGE_DIR.glob(".*.part")] == []
 
 
 @pytest.mark.anyio
@@ -140,6 +308,30 @@ async def test_create_product(async_client: AsyncClient, created_category: dict)
     }.items() <= response.json().items()
 
 
+@pytest.mark.anyio
+async def test_create_products_concurrently(
+    async_client: AsyncClient, file_database: Database
+):
+    category_id = await file_database.execute(
+        category_table.insert().values(name="Test Category")
+    )
+
+    async def post(index: int):
+        form_data = {
+            "name": (None, f"Test Product {index}"),
+            "description": (None, "Test Description"),
+            "price": (None, "4.0"),
+            "category_id": (None, str(category_id)),
+        }
+        return await async_client.post("/product/", data=form_data)
+
+    responses = await asyncio.gather(*(post(index) for index in range(16)))
+
+    assert [response.status_code for response in responses] == [201] * 16
+    count = select(func.count()).select_from(product_search_table)
+    assert await file_database.fetch_val(count) == 16
+
+
 @pytest.mark.anyio
 async def test_delete_existing_product(
     async_client: AsyncClient, created_product: dict, logged_in_token: str
@@ -210,6 +402,42 @@ async def test_get_all_products(
     assert response.json()["results"] == [created_product]
 
 
+@pytest.mark.anyio
+async def test_get_all_products_is_cached_until_a_write(
+    async_client: AsyncClient, created_product: dict, created_category: dict
+):
+    first = await async_client.get("/product/product?per_page=5")
+    second = await async_client.get("/product/product?per_page=5")
+
+    assert first.headers["x-cache"] == "MISS"
+    assert second.headers["x-cache"] == "HIT"
+    assert second.json() == first.json()
+
+    await create_product("New", "New", 1.0, created_category["id"], async_client)
+    response = await async_client.get("/product/product?per_page=5")
+
+    assert response.headers["x-cache"] == "MISS"
+    assert response.json()["totalItems"] == 2
+
+
+@pytest.mark.anyio
+async def test_get_all_products_sees_writes_from_other_processes(
+    async_client: AsyncClient, created_product: dict, created_category: dict
+):
+    await async_client.get("/product/product?per_page=5")
+
+    # Written straight to the database, as another worker or the seed command would
+    await database.execute(
+        product_table.update()
+        .where(product_table.c.id == created_product["id"])
+        .values(name="Renamed")
+    )
+    response = await async_client.get("/product/product?per_page=5")
+
+    assert response.headers["x-cache"] == "MISS"
+    assert response.json()["results"][0]["name"] == "Renamed"
+
+
 @pytest.mark.anyio
 async def test_get_all_products_with_pagination_first_page(
     async_client: AsyncClient,
@@ -495,3 +723,80 @@ async def test_not_existing_sort_field_products(
     )
 
     assert response.status_code == 422
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("sort_value", ["price", "-price", "name", "-name", None])
+async def test_cursor_pagination_products(
+    async_client: AsyncClient, created_multiple_product: list, sort_value
+):
+    per_page = 4
+    url = f"/product/product?per_page={per_page}&cursor="
+    if sort_value:
+        url += f"&sort={sort_value}"
+
+    pages = []
+    while url:
+        response = await async_client.get(url)
+        assert response.status_code == 200
+        pages.append(response.json())
+        url = response.json()["nextPageUrl"]
+
+    key = (sort_value or "id").lstrip("-")
+    expected = sorted(
+        created_multiple_product,
+        key=lambda x: (x[key], x["id"]),
+        reverse=bool(sort_value and sort_value.startswith("-")),
+    )
+    assert [page["page"] for page in pages] == [1, 2]
+    assert [item["id"] for page in pages for item in page["results"]] == [
+        product["id"] for product in expected
+    ]
+    assert pages[0]["prevPageUrl"] is None
+    assert pages[-1]["totalItems"] == 6
+
+    response = await async_client.get(pages[-1]["prevPageUrl"])
+    assert response.json()["page"] == 1
+    assert response.json()["results"] == pages[0]["results"]
+    assert response.json()["prevPageUrl"] is None
+
+
+@pytest.mark.anyio
+async def test_cursor_pagination_invalid_cursor(async_client: AsyncClient):
+    response = await async_client.get("/product/product?cursor=not-a-cursor")
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize(
+    "position",
+    [
+        {"p": 2, "s": "name", "id": 1, "d": "next"},
+        {"p": 2, "s": "name", "v": {"a": 1}, "id": 1, "d": "next"},
+        {"p": 2, "s": "name", "v": "Test Product", "id": [1], "d": "next"},
+    ],
+    ids=["missing_value", "value_not_scalar", "id_not_int"],
+)
+async def test_cursor_pagination_malformed_cursor(
+    async_client: AsyncClient, position: dict
+):
+    cursor = pagination_helpers.encode_cursor(position)
+
+    response = await async_client.get(f"/product/product?sort=name&cursor={cursor}")
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
+
+
+@pytest.mark.anyio
+async def test_cursor_pagination_sort_mismatch(
+    async_client: AsyncClient, created_multiple_product: list
+):
+    response = await async_client.get("/product/product?per_page=2&sort=name&cursor=")
+    next_page_url = response.json()["nextPageUrl"].replace("sort=name", "sort=price")
+
+    response = await async_client.get(next_page_url)
+
+    assert response.status_code == 400
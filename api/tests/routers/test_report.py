@@ -0,0 +1,106 @@
+from datetime import datetime
+
+import pytest
+from httpx import AsyncClient
+
+from api.database import database
+from api.tests.conftest import create_category, create_product
+from api.utils.rollup_helpers import rebuild_rollups
+
+
+@pytest.fixture()
+async def sales(async_client: AsyncClient, logged_in_token: str) -> list:
+    fruit = await create_category("Fruit", async_client, logged_in_token)
+    tools = await create_category("Tools", async_client, logged_in_token)
+    apple = await create_product("Apple", "Red", 0.5, fruit["id"], async_client)
+    pear = await create_product("Pear", "Green", 0.75, fruit["id"], async_client)
+    hammer = await create_product("Hammer", "Steel", 12.0, tools["id"], async_client)
+
+    orders = [
+        [(apple, 4), (hammer, 1)],
+        [(pear, 2)],
+        [(apple, 1), (pear, 1)],
+    ]
+    headers = {"Authorization": f"Bearer {logged_in_token}"}
+    await async_client.post(
+        "/order/",
+        json={
+            "delivery_address": "1 Main St",
+            "products": [
+                {"product_id": product["id"], "quantity": quantity}
+                for product, quantity in orders[0]
+            ],
+        },
+        headers=headers,
+    )
+    await async_client.post(
+        "/order/batch",
+        json={
+            "orders": [
+                {
+                    "delivery_address": "2 Main St",
+                    "products": [
+                        {"product_id": product["id"], "quantity": quantity}
+                        for product, quantity in order
+                    ],
+                }
+                for order in orders[1:]
+            ]
+        },
+        headers=headers,
+    )
+    return [apple, pear, hammer]
+
+
+async def get_reports(async_client: AsyncClient, seller_token: str) -> dict:
+    headers = {"Authorization": f"Bearer {seller_token}"}
+    return {
+        name: (await async_client.get(f"/report/{name}", headers=headers)).json()
+        for name in ("daily", "products", "categories")
+    }
+
+
+@pytest.mark.anyio
+async def test_reports_follow_new_orders(
+    async_client: AsyncClient, sales: list, seller_token: str
+):
+    apple, pear, hammer = sales
+
+    reports = await get_reports(async_client, seller_token)
+
+    assert reports["daily"] == [
+        {
+            "day": datetime.utcnow().date().isoformat(),
+            "orders": 3,
+            "units": 9,
+            "revenue": "16.75",
+        }
+    ]
+    assert reports["products"] == [
+        {"product_id": hammer["id"], "units": 1, "revenue": "12.00"},
+        {"product_id": apple["id"], "units": 5, "revenue": "2.50"},
+        {"product_id": pear["id"], "units": 3, "revenue": "2.25"},
+    ]
+    assert [
+        (category["category_name"], category["units"], category["revenue"])
+        for category in reports["categories"]
+    ] == [("Tools", 1, "12.00"), ("Fruit", 8, "4.75")]
+
+
+@pytest.mark.anyio
+async def test_rebuild_matches_incremental_rollups(
+    async_client: AsyncClient, sales: list, seller_token: str
+):
+    incremental = await get_reports(async_client, seller_token)
+
+    assert await rebuild_rollups(database) == 3
+    assert await get_reports(async_client, seller_token) == incremental
+
+
+@pytest.mark.anyio
+async def test_reports_are_for_sellers(async_client: AsyncClient, logged_in_token: str):
+    response = await async_client.get(
+        "/report/daily", headers={"Authorization": f"Bearer {logged_in_token}"}
+    )
+
+    assert response.status_code == 403
@@ -2,6 +2,8 @@ import pytest
 from fastapi import BackgroundTasks
 from httpx import AsyncClient
 
+from api import security
+
 
 async def register_user(async_client: AsyncClient, email: str, password: str):
     return await async_client.post(
@@ -92,3 +94,15 @@ async def test_login_user(async_client: AsyncClient, confirmed_user: dict):
     )
 
     assert response.status_code == 200
+
+
+@pytest.mark.anyio
+async def test_confirm_user_invalidates_cached_user(async_client: AsyncClient, mocker):
+    spy = mocker.spy(BackgroundTasks, "add_task")
+    await register_user(async_client, "test@example.com", "123456")
+    security.user_cache.set("test@example.com", object())
+    confirmation_url = str(spy.call_args[1]["confirmation_url"])
+
+    await async_client.get(confirmation_url)
+
+    assert security.user_cache.get("test@example.com") is None
@@ -0,0 +1,101 @@
+import logging
+import queue
+from logging.handlers import QueueListener
+
+from api.logging_conf import (
+    DebugSamplingFilter,
+    DroppingQueueHandler,
+    EmailObfuscationFilter,
+)
+
+
+class ListHandler(logging.Handler):
+    def __init__(self) -> None:
+        super().__init__()
+        self.records: list[logging.LogRecord] = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.records.append(record)
+
+
+def make_logger(handler: logging.Handler) -> logging.Logger:
+    logger = logging.getLogger("api.tests.queue")
+    logger.handlers = [handler]
+    logger.setLevel(logging.DEBUG)
+    logger.propagate = False
+    return logger
+
+
+def test_records_are_formatted_by_the_listener():
+    records = queue.Queue(maxsize=10)
+    sink = ListHandler()
+    sink.addFilter(EmailObfuscationFilter(obfuscated_length=2))
+    listener = QueueListener(records, sink)
+    logger = make_logger(DroppingQueueHandler(records))
+
+    listener.start()
+    logger.info("Order %d created", 7, extra={"email": "test@example.com"})
+    listener.stop()
+
+    assert [record.getMessage() for record in sink.records] == ["Order 7 created"]
+    assert sink.records[0].email == "te**@example.com"
+
+
+def test_overflow_is_dropped_and_counted_per_level():
+    records = queue.Queue(maxsize=2)
+    handler = DroppingQueueHandler(records)
+    logger = make_logger(handler)
+
+    for _ in range(3):
+        logger.debug("debug")
+    logger.error("error")
+
+    assert records.qsize() == 2
+    assert handler.dropped == {"DEBUG": 1, "ERROR": 1}
+
+
+def test_drops_are_reported_once_there_is_room():
+    records = queue.Queue(maxsize=1)
+    handler = DroppingQueueHandler(records)
+    logger = make_logger(handler)
+
+    logger.info("kept")
+    logger.info("dropped")
+    records.get_nowait()
+    records.maxsize = 2
+    logger.info("after")
+
+    messages = [records.get_nowait().getMessage() for _ in range(records.qsize())]
+    assert messages == ["after", "Dropped 1 log records, the log queue was full"]
+
+
+def debug_record(name: str = "api.tests", correlation_id: str = "-"):
+    return logging.makeLogRecord(
+        {"name": name, "levelno": logging.DEBUG, "correlation_id": correlation_id}
+    )
+
+
+def test_sampling_keeps_or_drops_whole_requests():
+    sampling = DebugSamplingFilter(sample_rate=0.5)
+    correlation_ids = [f"{i:032x}" for i in range(200)]
+
+    kept = {
+        cid
+        for cid in correlation_ids
+        if sampling.filter(debug_record(correlation_id=cid))
+    }
+
+    assert 50 < len(kept) < 150
+    for cid in correlation_ids:
+        assert sampling.filter(debug_record(correlation_id=cid)) == (cid in kept)
+    assert sampling.filter(logging.makeLogRecord({"levelno": logging.INFO}))
+
+
+def test_rate_limit_is_per_logger():
+    sampling = DebugSamplingFilter(rate_limit=2)
+
+    kept = [sampling.filter(debug_record("api.a")) for _ in range(5)]
+
+    assert kept == [True, True, False, False, False]
+    assert sampling.filter(debug_record("api.b"))
+    assert sampling.suppressed == {"api.a": 3}
@@ -0,0 +1,139 @@
+import pytest
+import sqlalchemy
+from sqlalchemy import select
+
+from api.database import category_table, metadata, product_table, table_version_table
+from api.migrations import (
+    MIGRATIONS,
+    column_exists,
+    execute_all,
+    get_schema_version,
+    migrate,
+)
+
+
+@pytest.fixture()
+def engine(tmp_path):
+    engine = sqlalchemy.create_engine(f"sqlite:///{tmp_path / 'migrations.db'}")
+    metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+def index_names(engine) -> set:
+    with engine.connect() as connection:
+        rows = connection.exec_driver_sql(
+            "SELECT name FROM sqlite_master WHERE type = 'index'"
+        )
+        return {row.name for row in rows}
+
+
+def test_migrate_fresh_database(engine):
+    assert migrate(engine) == MIGRATIONS[-1].version
+
+    with engine.connect() as connection:
+        assert get_schema_version(connection) == MIGRATIONS[-1].version
+    assert {
+        "ix_products_category_id",
+        "ix_products_price",
+        "ix_products_name",
+        "ix_order_items_order_id",
+        "ix_order_items_product_id",
+        "ix_orders_customer_id",
+    } <= index_names(engine)
+
+
+def test_migrate_is_idempotent(engine):
+    migrate(engine)
+
+    assert migrate(engine) == MIGRATIONS[-1].version
+
+
+def test_migrate_backfills_search_index(engine):
+    with engine.begin() as connection:
+        connection.execute(category_table.insert().values(id=1, name="Shoes"))
+        connection.execute(
+            product_table.insert().values(
+                id=1, name="Runner", description="Trail", price_cents=100, category_id=1
+            )
+        )
+
+    migrate(engine)
+
+    with engine.connect() as connection:
+        rows = connection.exec_driver_sql(
+            "SELECT rowid FROM products_fts WHERE products_fts MATCH 'shoes'"
+        ).all()
+    assert [row.rowid for row in rows] == [1]
+
+
+def test_writes_bump_table_versions(engine):
+    migrate(engine)
+
+    with engine.begin() as connection:
+        connection.execute(category_table.insert().values(id=1, name="Shoes"))
+        connection.execute(
+            product_table.insert().values(
+                id=1, name="Runner", description="Trail", price_cents=100, category_id=1
+            )
+        )
+        connection.execute(product_table.update().values(name="Walker"))
+        connection.execute(product_table.delete())
+
+    with engine.connect() as connection:
+        rows = connection.execute(select(table_version_table)).all()
+    assert dict(rows) == {"categories": 1, "products": 3}
+
+
+def test_migrate_converts_money_to_cents(tmp_path):
+    engine = sqlalchemy.create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as connection:
+        execute_all(
+            connection,
+            [
+                "CREATE TABLE categories (id INTEGER PRIMARY KEY, name VARCHAR)",
+                """
+                CREATE TABLE products (
+                    id INTEGER PRIMARY KEY, name VARCHAR, description VARCHAR,
+                    price FLOAT, category_id INTEGER NOT NULL,
+                    image VARCHAR, thumbnail VARCHAR
+                )
+                """,
+                "CREATE INDEX ix_products_price ON products (price)",
+                """
+                CREATE TABLE orders (
+                    id INTEGER PRIMARY KEY, delivery_address VARCHAR,
+                    order_date DATETIME, payment_due_date DATETIME,
+                    total_price VARCHAR, customer_id INTEGER NOT NULL
+                )
+                """,
+                """
+                CREATE TABLE order_items (
+                    id INTEGER PRIMARY KEY, order_id INTEGER NOT NULL,
+                    product_id INTEGER NOT NULL, quantity INTEGER
+                )
+                """,
+                "INSERT INTO products (id, name, price, category_id) VALUES (1, 'A', 0.29, 1)",
+                "INSERT INTO orders (id, total_price, customer_id) VALUES (1, '0.87', 1)",
+                "INSERT INTO order_items (order_id, product_id, quantity) VALUES (1, 1, 3)",
+                "PRAGMA user_version = 2",
+            ],
+        )
+    metadata.create_all(engine)
+
+    migrate(engine)
+
+    with engine.connect() as connection:
+        assert connection.exec_driver_sql("SELECT price_cents FROM products").all() == [
+            (29,)
+        ]
+        assert connection.exec_driver_sql("SELECT total_cents FROM orders").all() == [
+            (87,)
+        ]
+        assert connection.exec_driver_sql(
+            "SELECT unit_price_cents FROM order_items"
+        ).all() == [(29,)]
+        assert not column_exists(connection, "products", "price")
+        assert not column_exists(connection, "orders", "total_price")
+    assert "ix_products_price" in index_names(engine)
+    engine.dispose()
@@ -0,0 +1,140 @@
+import re
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.sql import Select, Subquery
+
+from api.database import database
+
+# Tables growing with the catalog, the order history or the customers
+LARGE_TABLES = {
+    "products",
+    "orders",
+    "order_items",
+    "users",
+    "sales_by_day",
+    "sales_by_product",
+}
+
+# Substring filters (name=, description=, price=) are left out on purpose:
+# a leading-wildcard LIKE cannot use an index, q= is the indexed search path.
+ROUTER_REQUESTS = [
+    ("GET", "/product/product"),
+    ("GET", "/product/product?page=3&per_page=2"),
+    ("GET", "/product/product?sort=price"),
+    ("GET", "/product/product?sort=-price"),
+    ("GET", "/product/product?sort=name"),
+    ("GET", "/product/product?sort=-name"),
+    ("GET", "/product/product?per_page=2&sort=-price&cursor="),
+    ("GET", "/product/product?q=test"),
+    ("GET", "/product/product?per_page=2&sort=name&cursor="),
+    ("GET", "/product/product?per_page=2&cursor="),
+    ("GET", "/product/product?q=test&sort=name&per_page=2&cursor="),
+    ("GET", "/product/product?q=test&per_page=2&cursor="),
+    ("GET", "/product/{product_id}"),
+    ("GET", "/category/category"),
+    ("GET", "/category/category?sort=name"),
+    ("GET", "/category/category?per_page=2&sort=-name&cursor="),
+    ("GET", "/order/orders"),
+    ("GET", "/order/orders?per_page=2&cursor="),
+    ("POST", "/order/batch"),
+    ("GET", "/report/daily"),
+    ("GET", "/report/products"),
+    ("GET", "/report/categories"),
+    ("DELETE", "/product/{product_id}"),
+]
+
+
+def compile_query(query: Select) -> str:
+    return str(
+        query.compile(
+            dialect=sqlite.dialect(),
+            compile_kwargs={"literal_binds": True, "render_postcompile": True},
+        )
+    )
+
+
+def filtered(query: Select) -> bool:
+    """Whether ``query`` or a subquery it selects from has a WHERE clause."""
+    if query.whereclause is not None:
+        return True
+    return any(
+        filtered(from_.element)
+        for from_ in query.get_final_froms()
+        if isinstance(from_, Subquery) and isinstance(from_.element, Select)
+    )
+
+
+def full_scans(query: Select, plan: list[tuple[int, str]]) -> list[str]:
+    """Return the plan steps that read a large table from start to end.
+
+    A scan is tolerated only as the sort/limit scan of an index: at the top of
+    the plan, walking the rowid or an index in the order the query returns
+    rows until its LIMIT is reached. Any WHERE clause would have it skip rows
+    and read on past the LIMIT, and a temporary B-tree for the ORDER BY means
+    the rows are sorted only after all of them were read. A B-tree for the
+    right part of the ORDER BY only sorts ties of the index order."""
+    sort_limit_scan = (
+        query._limit_clause is not None
+        and not filtered(query)
+        and not any(
+            parent == 0 and "USE TEMP B-TREE FOR ORDER BY" in step
+            for parent, step in plan
+        )
+    )
+    scans = []
+    for parent, step in plan:
+        match = re.match(r"SCAN (\w+)", step)
+        if match and match.group(1) in LARGE_TABLES:
+            if not (sort_limit_scan and parent == 0):
+                scans.append(step)
+    return scans
+
+
+@pytest.mark.anyio
+async def test_router_queries_do_not_scan_large_tables(
+    async_client: AsyncClient,
+    created_multiple_product: list,
+    seller_token: str,
+    mocker,
+):
+    headers = {"Authorization": f"Bearer {seller_token}"}
+    order = {
+        "delivery_address": "1232 Main St",
+        "products": [{"product_id": created_multiple_product[0]["id"], "quantity": 1}],
+    }
+    await async_client.post("/order/", json=order, headers=headers)
+    bodies = {"/order/batch": {"orders": [order, order]}}
+
+    spies = [
+        mocker.spy(database, "fetch_all"),
+        mocker.spy(database, "fetch_one"),
+        mocker.spy(database, "execute"),
+    ]
+    for method, url in ROUTER_REQUESTS:
+        url = url.format(product_id=created_multiple_product[1]["id"])
+        response = await async_client.request(
+            method, url, json=bodies.get(url), headers=headers
+        )
+        assert response.status_code < 300, url
+        if method == "GET" and isinstance(response.json(), dict):
+            if next_page_url := response.json().get("nextPageUrl"):
+                await async_client.get(next_page_url)
+
+    queries = {
+        compile_query(call.args[0]): call.args[0]
+        for spy in spies
+        for call in spy.call_args_list
+        if isinstance(call.args[0], Select)
+    }
+    for spy in spies:
+        mocker.stop(spy)
+
+    assert queries
+    problems = {}
+    for sql, query in queries.items():
+        rows = await database.fetch_all(f"EXPLAIN QUERY PLAN {sql}")
+        if scans := full_scans(query, [(row[1], row[3]) for row in rows]):
+            problems[sql] = scans
+    assert problems == {}
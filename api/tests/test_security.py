@@ -90,6 +90,25 @@ def test_password_hashes():
     assert security.verify_password(password, security.get_password_hash(password))
 
 
+@pytest.mark.anyio
+async def test_password_hashes_in_executor():
+    password = "password"
+    hashed_password = await security.hash_password(password)
+
+    assert await security.check_password(password, hashed_password)
+    assert not await security.check_password("wrong", hashed_password)
+
+
+@pytest.mark.anyio
+async def test_password_executor_rejects_when_saturated(mocker):
+    mocker.patch.object(security.password_executor, "max_pending", 0)
+
+    with pytest.raises(security.HTTPException) as exc_info:
+        await security.hash_password("password")
+    assert exc_info.value.status_code == 503
+    assert exc_info.value.headers == {"Retry-After": "1"}
+
+
 @pytest.mark.anyio
 async def test_get_user(registered_user: dict):
     user = await security.get_user(registered_user["email"])
@@ -166,3 +185,66 @@ async def test_current_user_wrong_type_token(registered_user: dict):
 
     with pytest.raises(security.HTTPException):
         await security.get_current_user(token)
+
+
+@pytest.mark.anyio
+async def test_get_current_user_is_cached(registered_user: dict, mocker):
+    token = security.create_access_token(
+        registered_user["email"], registered_user["role"]
+    )
+    spy = mocker.spy(security, "get_user")
+
+    await security.get_current_user(token)
+    user = await security.get_current_user(token)
+
+    assert user.email == registered_user["email"]
+    assert spy.call_count == 1
+    assert security.user_cache.stats()["hits"] >= 1
+
+
+@pytest.mark.anyio
+async def test_invalidate_user(registered_user: dict, mocker):
+    token = security.create_access_token(
+        registered_user["email"], registered_user["role"]
+    )
+    await security.get_current_user(token)
+    spy = mocker.spy(security, "get_user")
+
+    security.invalidate_user(registered_user["email"])
+    await security.get_current_user(token)
+
+    assert spy.call_count == 1
+
+
+def test_decode_token_is_cached(mocker):
+    token = security.create_access_token("test@example.com", "client")
+    spy = mocker.spy(security.jwt, "decode")
+
+    security.get_subject_for_token_type(token, "access")
+    security.get_subject_for_token_type(token, "access")
+
+    assert spy.call_count == 1
+
+
+def test_decode_token_cache_honours_expiry(mocker):
+    token = security.create_access_token("test@example.com", "client")
+    security.get_subject_for_token_type(token, "access")
+    expire = jwt.get_unverified_claims(token)["exp"]
+
+    mocker.patch.object(security.token_cache, "clock", return_value=expire + 1)
+    mocker.patch("jose.jwt.timegm", return_value=expire + 1)
+
+    with pytest.raises(security.HTTPException) as exc_info:
+        security.get_subject_for_token_type(token, "access")
+    assert "Token has expired" == exc_info.value.detail
+
+
+def test_decode_token_does_not_cache_failures(mocker):
+    spy = mocker.spy(security.jwt, "decode")
+
+    for _ in range(2):
+        with pytest.raises(security.HTTPException):
+            security.get_subject_for_token_type("Invalid token", "access")
+
+    assert spy.call_count == 2
+    assert len(security.token_cache) == 0
@@ -0,0 +1,69 @@
+import pytest
+from httpx import AsyncClient
+
+from api.database import category_table, database, product_table
+from api.utils.category_helpers import category_names, with_category_names
+
+
+@pytest.mark.anyio
+async def test_names_are_cached_until_categories_change(
+    async_client: AsyncClient, created_product: dict, logged_in_token: str, mocker
+):
+    response = await async_client.get(f"/product/{created_product['id']}")
+    assert response.json()["category_name"] == "Test Category"
+
+    load = mocker.spy(category_names, "load")
+    await async_client.get(f"/product/{created_product['id']}")
+    assert load.call_count == 0
+
+    await async_client.post(
+        "/category/",
+        json={"name": "Other"},
+        headers={"Authorization": f"Bearer {logged_in_token}"},
+    )
+    await async_client.get(f"/product/{created_product['id']}")
+    assert load.call_count == 1
+
+
+@pytest.mark.anyio
+async def test_unknown_category_reloads_names(created_product: dict):
+    rows = await database.fetch_all(product_table.select())
+    await with_category_names(database, rows)
+
+    # Written by another process, only the database trigger bumps the version
+    category_id = await database.execute(category_table.insert().values(name="New"))
+    product_id = await database.execute(
+        product_table.insert().values(
+            name="New", description="New", price_cents=100, category_id=category_id
+        )
+    )
+
+    rows = await database.fetch_all(product_table.select())
+    products = await with_category_names(database, rows)
+
+    assert {product["id"]: product["category_name"] for product in products} == {
+        created_product["id"]: "Test Category",
+        product_id: "New",
+    }
+
+
+@pytest.mark.anyio
+async def test_missing_category_keeps_product(
+    async_client: AsyncClient, created_product: dict
+):
+    orphan_id = await database.execute(
+        product_table.insert().values(
+            name="Orphan", description="Orphan", price_cents=100, category_id=999
+        )
+    )
+
+    rows = await database.fetch_all(product_table.select())
+    products = await with_category_names(database, rows)
+
+    assert {product["id"]: product["category_name"] for product in products} == {
+        created_product["id"]: "Test Category",
+        orphan_id: None,
+    }
+
+    response = await async_client.get(f"/product/{orphan_id}")
+    assert response.json()["category_name"] is None
@@ -0,0 +1,193 @@
+import itertools
+
+import pytest
+from httpx import AsyncClient
+
+from api.config import config
+from api.database import category_table, database, product_table
+from api.tests.conftest import create_category, create_product
+from api.utils.response_cache_helpers import response_cache
+
+pytest.importorskip("numpy")
+
+from api.utils.columnar_helpers import (  # noqa: E402
+    columnar_catalog,
+    like_pattern,
+    sqlite_real_text,
+)
+
+PRODUCTS = [
+    ("Apple", "Red fruit", 4.0),
+    ("apple pie", "Baked", 4.5),
+    ("APPLE", "Green fruit", 14.0),
+    ("Äpfel", "German apple", 0.99),
+    ("äpfel", "lower umlaut", 100.0),
+    ("50% off", "Sale_item", 4.0),
+    ("snake_case", "under_score", 1e15),
+    ("Zebra", "Stripes", 10.0),
+    ("Apple", "Duplicate name", 4.0),
+]
+
+FILTERS = [
+    {},
+    {"name": "apple"},
+    {"name": "APPLE"},
+    {"name": "äpfel"},
+    {"name": "%"},
+    {"name": "_"},
+    {"name": ""},
+    {"description": "fruit"},
+    {"description": "_s"},
+    {"name": "apple", "description": "fruit"},
+    {"price": 4},
+    {"price": 0.99},
+    {"price": 1e15},
+]
+
+SORTS = [None, "price", "-price", "name", "-name"]
+
+
+@pytest.fixture()
+async def catalog_products(async_client: AsyncClient, logged_in_token: str):
+    fruit = await create_category("Fruit", async_client, logged_in_token)
+    other = await create_category("Other", async_client, logged_in_token)
+    return [
+        await create_product(
+            name, description, price, (fruit, other)[i % 2]["id"], async_client
+        )
+        for i, (name, description, price) in enumerate(PRODUCTS)
+    ]
+
+
+async def get_products(
+    async_client: AsyncClient, monkeypatch, engine: str, params: dict
+) -> dict:
+    monkeypatch.setattr(config, "CATALOG_ENGINE", engine)
+    response_cache.clear()
+    response = await async_client.get("/product/product", params=params)
+    assert response.status_code == 200
+    return response.json()
+
+
+async def assert_same_results(async_client: AsyncClient, monkeypatch):
+    for filters, sort, page in itertools.product(FILTERS, SORTS, range(1, 5)):
+        params = {**filters, "page": page, "per_page": 3}
+        if sort:
+            params["sort"] = sort
+
+        expected = await get_products(async_client, monkeypatch, "sql", params)
+        actual = await get_products(async_client, monkeypatch, "columnar", params)
+
+        assert actual == expected, params
+
+
+@pytest.mark.parametrize(
+    "pattern, value, matches",
+    [
+        ("%apple%", "Green APPLE", True),
+        ("%äpfel%", "Äpfel", False),
+        ("%a_c%", "abc", True),
+        ("%a_c%", "ac", False),
+        ("%.%", "4.0", True),
+        ("%.%", "40", False),
+    ],
+)
+def test_like_pattern(pattern, value, matches):
+    assert (like_pattern(pattern).fullmatch(value) is not None) is matches
+
+
+@pytest.mark.parametrize(
+    "value, text",
+    [(4.0, "4.0"), (4.5, "4.5"), (0.1, "0.1"), (1e20, "1.0e+20"), (-3.0, "-3.0")],
+)
+def test_sqlite_real_text(value, text):
+    assert sqlite_real_text(value) == text
+
+
+@pytest.mark.anyio
+async def test_columnar_catalog_matches_sql(
+    async_client: AsyncClient, catalog_products: list, monkeypatch
+):
+    await assert_same_results(async_client, monkeypatch)
+
+    assert columnar_catalog.loaded
+    assert columnar_catalog.size == len(PRODUCTS)
+
+
+@pytest.mark.anyio
+async def test_columnar_catalog_keeps_products_of_missing_categories(
+    async_client: AsyncClient, catalog_products: list, monkeypatch
+):
+    await database.execute(
+        product_table.insert().values(
+            name="Apple orphan",
+            description="Missing category",
+            price_cents=400,
+            category_id=999,
+        )
+    )
+
+    await assert_same_results(async_client, monkeypatch)
+
+    assert columnar_catalog.size == len(PRODUCTS) + 1
+
+
+@pytest.mark.anyio
+async def test_columnar_catalog_refreshes_after_writes(
+    async_client: AsyncClient,
+    catalog_products: list,
+    logged_in_token: str,
+    monkeypatch,
+    mocker,
+):
+    pastry = await create_category("Pastry", async_client, logged_in_token)
+    await get_products(async_client, monkeypatch, "columnar", {})
+    assert columnar_catalog.loaded
+    reset = mocker.spy(columnar_catalog, "_reset")
+
+    await async_client.put(
+        f"/product/{catalog_products[0]['id']}",
+        files={"name": (None, "Zucchini"), "price": (None, "2.5")},
+    )
+    await async_client.delete(
+        f"/product/{catalog_products[1]['id']}",
+        headers={"Authorization": f"Bearer {logged_in_token}"},
+    )
+    await create_product("apple strudel", "Fresh", 4.25, pastry["id"], async_client)
+
+    await assert_same_results(async_client, monkeypatch)
+
+    # Applied row by row, without reading the whole catalog again
+    reset.assert_not_called()
+
+
+@pytest.mark.anyio
+async def test_columnar_catalog_reloads_after_writes_from_other_processes(
+    async_client: AsyncClient, catalog_products: list, monkeypatch
+):
+    await get_products(async_client, monkeypatch, "columnar", {})
+    assert columnar_catalog.loaded
+
+    # Written without refresh_catalog, as another worker or api.manage would
+    await database.execute(
+        product_table.update()
+        .where(product_table.c.id == catalog_products[0]["id"])
+        .values(name="Zucchini", price_cents=250)
+    )
+    await database.execute(
+        category_table.update()
+        .where(category_table.c.id == catalog_products[1]["category_id"])
+        .values(name="Renamed")
+    )
+    await database.execute(
+        product_table.insert().values(
+            name="apple strudel",
+            description="Fresh",
+            price_cents=425,
+            category_id=catalog_products[0]["category_id"],
+        )
+    )
+
+    await assert_same_results(async_client, monkeypatch)
+
+    assert columnar_catalog.size == len(PRODUCTS) + 1
@@ -0,0 +1,40 @@
+import pytest
+from httpx import AsyncClient
+
+from api.database import database, product_table, row_count_table
+from api.utils import counter_helpers
+
+
+@pytest.mark.anyio
+async def test_get_row_count_seeds_from_table(created_multiple_product: list):
+    await database.execute(row_count_table.delete())
+
+    assert await counter_helpers.get_row_count(database, product_table) == (6,)
+
+
+@pytest.mark.anyio
+async def test_row_count_follows_create_and_delete(
+    async_client: AsyncClient, created_multiple_product: list, logged_in_token: str
+):
+    await async_client.delete(
+        f"/product/{created_multiple_product[0]['id']}",
+        headers={"Authorization": f"Bearer {logged_in_token}"},
+    )
+
+    assert await counter_helpers.get_row_count(database, product_table) == (5,)
+    response = await async_client.get("/product/product")
+    assert response.json()["totalItems"] == 5
+
+
+@pytest.mark.anyio
+async def test_estimate_row_count_scales_sample(
+    async_client: AsyncClient, created_multiple_product: list, mocker
+):
+    mocker.patch.object(counter_helpers, "ESTIMATE_SAMPLE_SIZE", 2)
+    name = created_multiple_product[-1]["name"]
+
+    response = await async_client.get(f"/product/product?name={name}&estimate=true")
+
+    # One match among the two newest products, scaled to six products
+    assert response.json()["totalItems"] == 3
+    assert response.json()["results"][0]["name"] == name
@@ -0,0 +1,39 @@
+import os
+
+import pytest
+
+from api.utils.image_helpers import DiskCache
+
+
+@pytest.mark.anyio
+async def test_disk_cache_evicts_least_recently_used(tmp_path):
+    cache = DiskCache(tmp_path, max_bytes=10)
+    await cache.put("a", b"1234")
+    await cache.put("b", b"1234")
+    assert cache.get("a") == tmp_path / "a"
+
+    await cache.put("c", b"1234")
+
+    assert cache.get("b") is None
+    assert not (tmp_path / "b").exists()
+    assert cache.stats() == {
+        "files": 2,
+        "bytes": 8,
+        "hits": 1,
+        "misses": 1,
+        "evictions": 1,
+    }
+
+
+def test_disk_cache_rebuilds_index_from_disk(tmp_path):
+    for age, name in enumerate(["new", "old"]):
+        path = tmp_path / name
+        path.write_bytes(b"1234")
+        os.utime(path, (1000 - age, 1000 - age))
+    (tmp_path / ".gitkeep").touch()
+
+    cache = DiskCache(tmp_path, max_bytes=4)
+
+    assert cache.get("new") == tmp_path / "new"
+    assert cache.get("old") is None
+    assert (tmp_path / ".gitkeep").exists()
@@ -0,0 +1,41 @@
+import logging
+
+from api.database import user_table
+from api.utils.logging_helpers import LazySQL, log_sql
+
+
+class CountingStatement:
+    def __init__(self) -> None:
+        self.renders = 0
+
+    def __str__(self) -> str:
+        self.renders += 1
+        return "SELECT 1"
+
+
+def test_lazy_sql_renders_once():
+    statement = CountingStatement()
+    lazy = LazySQL(statement)
+
+    assert statement.renders == 0
+    assert str(lazy) == str(lazy) == "SELECT 1"
+    assert statement.renders == 1
+
+
+def test_log_sql_skips_rendering_when_debug_is_off(caplog):
+    statement = CountingStatement()
+
+    with caplog.at_level(logging.INFO, logger="api.tests"):
+        log_sql(logging.getLogger("api.tests"), statement)
+
+    assert statement.renders == 0
+    assert caplog.records == []
+
+
+def test_log_sql(caplog):
+    query = user_table.select().where(user_table.c.email == "test@example.com")
+
+    with caplog.at_level(logging.DEBUG, logger="api.tests"):
+        log_sql(logging.getLogger("api.tests"), query)
+
+    assert caplog.records[0].getMessage().startswith("Query: SELECT users.id")
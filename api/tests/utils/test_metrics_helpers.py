@@ -0,0 +1,24 @@
+from api.utils.metrics_helpers import Histogram, route_label
+
+
+def test_histogram_samples_are_cumulative():
+    histogram = Histogram((0.1, 1))
+    for value in (0.05, 0.1, 0.5, 2):
+        histogram.observe(value)
+
+    assert list(histogram.samples("latency", 'route="/"')) == [
+        'latency_bucket{route="/",le="0.1"} 2',
+        'latency_bucket{route="/",le="1"} 3',
+        'latency_bucket{route="/",le="+Inf"} 4',
+        'latency_sum{route="/"} 2.65',
+        'latency_count{route="/"} 4',
+    ]
+
+
+def test_route_label():
+    class Route:
+        path = "/product/{product_id}"
+
+    assert route_label({"route": Route()}) == "/product/{product_id}"
+    assert route_label({"root_path": "/images"}) == "/images"
+    assert route_label({"root_path": ""}) == "unmatched"
@@ -0,0 +1,18 @@
+import pytest
+
+from api.utils.money_helpers import format_cents, to_cents
+
+
+@pytest.mark.parametrize(
+    "amount, cents",
+    [(4.0, 400), (0.29, 29), (19.99, 1999), (4.005, 401), (-1.5, -150), (0, 0)],
+)
+def test_to_cents(amount, cents):
+    assert to_cents(amount) == cents
+
+
+@pytest.mark.parametrize(
+    "cents, text", [(800, "8.00"), (5, "0.05"), (1999, "19.99"), (-1234, "-12.34")]
+)
+def test_format_cents(cents, text):
+    assert format_cents(cents) == text
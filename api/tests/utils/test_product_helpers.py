@@ -0,0 +1,64 @@
+import hashlib
+from io import BytesIO
+
+import pytest
+from fastapi import HTTPException, UploadFile
+from PIL import Image
+
+from api.utils import product_helpers
+
+
+@pytest.fixture()
+def image_path(tmp_path):
+    path = tmp_path / "photo.jpg"
+    Image.new("RGB", (640, 480), "red").save(path, format="JPEG")
+    yield path
+    product_helpers.image_executor.shutdown()
+
+
+def test_render_thumbnail(image_path):
+    thumbnail_bytes = product_helpers.render_thumbnail(image_path, (128, 128))
+
+    with Image.open(BytesIO(thumbnail_bytes)) as thumbnail:
+        assert thumbnail.format == "PNG"
+        assert thumbnail.size == (128, 96)
+
+
+@pytest.mark.anyio
+async def test_create_thumbnail_in_worker_process(image_path, tmp_path):
+    thumbnail_path = await product_helpers.create_thumbnail(
+        image_path, (64, 64), tmp_path / "ab" / "thumbnail.png"
+    )
+
+    assert thumbnail_path == tmp_path / "ab" / "thumbnail.png"
+    with Image.open(thumbnail_path) as thumbnail:
+        assert thumbnail.size == (64, 48)
+
+
+@pytest.mark.anyio
+async def test_ingest_upload(image_path, tmp_path):
+    content = image_path.read_bytes()
+
+    upload = await product_helpers.ingest_upload(
+        UploadFile(BytesIO(content), filename="photo.jpg"), tmp_path
+    )
+
+    assert upload.digest == hashlib.sha256(content).hexdigest()
+    assert upload.content_type == "image/jpeg"
+    assert upload.path.parent == tmp_path
+    assert upload.path.read_bytes() == content
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize(
+    "content",
+    [b"GIF89a", b"", b"\x89PNG\r\n\x1a\n" + b"0" * product_helpers.MAX_IMAGE_SIZE],
+)
+async def test_ingest_upload_rejects_invalid_image(tmp_path, content):
+    with pytest.raises(HTTPException) as exc_info:
+        await product_helpers.ingest_upload(
+            UploadFile(BytesIO(content), filename="photo.png"), tmp_path
+        )
+
+    assert exc_info.value.status_code == 400
+    assert list(tmp_path.iterdir()) == []
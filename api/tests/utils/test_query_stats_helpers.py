@@ -0,0 +1,84 @@
+import logging
+
+import pytest
+from sqlalchemy.sql import select
+
+from api.config import config
+from api.database import database, user_table
+from api.utils.query_stats_helpers import (
+    QueryStats,
+    QueryStatsMiddleware,
+    request_queries,
+    statement_key,
+)
+
+
+def by_email(email: str):
+    return select(user_table).where(user_table.c.email == email)
+
+
+def test_statement_key_ignores_values():
+    assert statement_key(by_email("a@example.com")) == statement_key(
+        by_email("b@example.com")
+    )
+    assert statement_key(by_email("a@example.com")) != statement_key(
+        select(user_table.c.id)
+    )
+    assert statement_key("SELECT  1\n") == statement_key("SELECT 1")
+
+
+def test_repeated_statements():
+    stats = QueryStats()
+    for i in range(3):
+        stats.record(by_email(f"{i}@example.com"), 0.001)
+    stats.record(select(user_table.c.id), 0.001)
+
+    [(query, count)] = stats.repeated(3)
+
+    assert count == 3
+    assert stats.count == 4
+    assert stats.seconds == pytest.approx(0.004)
+
+
+async def run(middleware: QueryStatsMiddleware) -> list:
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        messages.append(message)
+
+    await middleware({"type": "http", "headers": []}, receive, send)
+    return messages
+
+
+@pytest.mark.anyio
+async def test_middleware_counts_queries_and_flags_repeats(monkeypatch, caplog):
+    monkeypatch.setattr(config, "REPEATED_QUERY_THRESHOLD", 3)
+
+    async def app(scope, receive, send):
+        for i in range(3):
+            await database.fetch_one(by_email(f"{i}@example.com"))
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    with caplog.at_level(logging.WARNING, logger="api"):
+        messages = await run(QueryStatsMiddleware(app, headers=True))
+
+    headers = dict(messages[0]["headers"])
+    assert headers[b"x-query-count"] == b"3"
+    assert float(headers[b"x-query-time"]) > 0
+    assert "Statement ran 3 times in one request" in caplog.text
+    assert request_queries.get() is None
+
+
+@pytest.mark.anyio
+async def test_slow_queries_are_logged(monkeypatch, caplog):
+    monkeypatch.setattr(config, "SLOW_QUERY_MS", 0)
+
+    with caplog.at_level(logging.WARNING, logger="api"):
+        await database.fetch_all(by_email("test@example.com"))
+
+    assert "Slow query took" in caplog.text
+    assert "FROM users" in caplog.text
@@ -0,0 +1,77 @@
+import pytest
+from httpx import AsyncClient
+
+from api.tests.conftest import create_product
+from api.utils.search_helpers import build_match_expression
+
+
+def test_build_match_expression():
+    assert build_match_expression('red "shoe" OR') == '"red"* "shoe"* "OR"*'
+
+
+def test_build_match_expression_without_words():
+    assert build_match_expression("!!") is None
+
+
+@pytest.mark.anyio
+async def test_search_products(
+    async_client: AsyncClient, created_category: dict, logged_in_token: str
+):
+    for name, description in [
+        ("Running shoe", "Light trail shoe"),
+        ("Rain jacket", "Keeps you dry while running"),
+        ("Coffee mug", "Ceramic"),
+    ]:
+        await create_product(
+            name, description, 10.0, created_category["id"], async_client
+        )
+
+    response = await async_client.get("/product/product?q=runn")
+
+    assert response.status_code == 200
+    assert response.json()["totalItems"] == 2
+    assert [p["name"] for p in response.json()["results"]] == [
+        "Running shoe",
+        "Rain jacket",
+    ]
+
+
+@pytest.mark.anyio
+async def test_search_products_by_category_name(
+    async_client: AsyncClient, created_product: dict, created_category: dict
+):
+    response = await async_client.get("/product/product?q=category")
+
+    assert [p["id"] for p in response.json()["results"]] == [created_product["id"]]
+
+
+@pytest.mark.anyio
+async def test_search_follows_update_and_delete(
+    async_client: AsyncClient, created_product: dict, logged_in_token: str
+):
+    await async_client.put(
+        f"/product/{created_product['id']}", data={"name": "Renamed"}
+    )
+    response = await async_client.get("/product/product?q=renamed")
+    assert response.json()["totalItems"] == 1
+
+    await async_client.delete(
+        f"/product/{created_product['id']}",
+        headers={"Authorization": f"Bearer {logged_in_token}"},
+    )
+    response = await async_client.get("/product/product?q=renamed")
+    assert response.json()["totalItems"] == 0
+
+
+@pytest.mark.anyio
+async def test_search_with_cursor_pagination(
+    async_client: AsyncClient, created_multiple_product: list
+):
+    response = await async_client.get("/product/product?q=test&per_page=4&cursor=")
+    first_page = response.json()
+    response = await async_client.get(first_page["nextPageUrl"])
+    second_page = response.json()
+
+    ids = [p["id"] for p in first_page["results"] + second_page["results"]]
+    assert sorted(ids) == [p["id"] for p in created_multiple_product]
+    assert second_page["nextPageUrl"] is None
@@ -0,0 +1,62 @@
+import random
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import func, select
+
+from api.database import (
+    database,
+    order_item_table,
+    order_table,
+    product_search_table,
+    sales_by_day_table,
+)
+from api.tests.conftest import create_product
+from api.utils.seed_helpers import SeedPlan, order_rows, product_rows, seed_database
+
+PLAN = SeedPlan(categories=3, products=50, users=5, orders=40, seed=1)
+
+
+async def count(table) -> int:
+    return await database.fetch_val(select(func.count()).select_from(table))
+
+
+@pytest.mark.anyio
+async def test_seed_database():
+    counts = await seed_database(database, PLAN)
+
+    assert counts["categories"] == 3
+    assert counts["products"] == await count(product_search_table) == 50
+    assert counts["orders"] == await count(order_table) == 40
+    assert counts["order_items"] == await count(order_item_table)
+
+    total = await database.fetch_val(select(func.sum(order_table.c.total_cents)))
+    revenue = await database.fetch_val(
+        select(func.sum(sales_by_day_table.c.revenue_cents))
+    )
+    assert revenue == total
+
+
+@pytest.mark.anyio
+async def test_new_products_are_still_indexed_after_seeding(
+    async_client: AsyncClient, created_category: dict
+):
+    await seed_database(database, SeedPlan(categories=0, products=5, users=0, orders=0))
+    await create_product(
+        "Zeppelin", "Airship", 10, created_category["id"], async_client
+    )
+
+    response = await async_client.get("/product/product", params={"q": "zeppelin"})
+
+    assert [product["name"] for product in response.json()["results"]] == ["Zeppelin"]
+    assert await count(product_search_table) == 6
+
+
+def test_generated_rows_are_deterministic():
+    def generate() -> tuple[list, list]:
+        rng = random.Random(PLAN.seed)
+        products = list(product_rows(rng, 1, 20, [1, 2]))
+        prices = {row[0]: row[3] for row in products}
+        return products, list(order_rows(rng, PLAN, 1, [1, 2, 3], prices))
+
+    assert generate() == generate()
@@ -0,0 +1,125 @@
+import hashlib
+
+import pytest
+from httpx import AsyncClient
+from starlette.applications import Starlette
+from starlette.routing import Mount
+
+from api.utils.static_helpers import (
+    IMMUTABLE_CACHE_CONTROL,
+    REVALIDATE_CACHE_CONTROL,
+    ImageFiles,
+    RangeFileResponse,
+    parse_byte_range,
+)
+
+CONTENT = bytes(range(256)) * 4
+DIGEST = hashlib.sha256(CONTENT).hexdigest()
+
+
+@pytest.fixture()
+async def static_client(tmp_path):
+    (tmp_path / "ab").mkdir()
+    (tmp_path / "ab" / f"{DIGEST}.png").write_bytes(CONTENT)
+    (tmp_path / "legacy.png").write_bytes(CONTENT)
+
+    app = Starlette(routes=[Mount("/images", ImageFiles(directory=tmp_path))])
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        yield client
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        ("bytes=0-9", (0, 9)),
+        ("bytes=1000-", (1000, 1023)),
+        ("bytes=-24", (1000, 1023)),
+        ("bytes=-5000", (0, 1023)),
+        ("bytes=1000-5000", (1000, 1023)),
+        ("bytes=2000-2010", (2000, 1023)),
+        ("bytes=2000-", (2000, 1023)),
+        ("bytes=0-1,5-9", None),
+        ("bytes=9-0", None),
+        ("bytes=abc", None),
+        ("items=0-9", None),
+    ],
+)
+def test_parse_byte_range(value, expected):
+    assert parse_byte_range(value, 1024) == expected
+
+
+@pytest.mark.anyio
+async def test_content_addressed_image_is_immutable(static_client: AsyncClient):
+    url = f"/images/ab/{DIGEST}.png"
+    response = await static_client.get(url)
+
+    assert response.status_code == 200
+    assert response.content == CONTENT
+    assert response.headers["cache-control"] == IMMUTABLE_CACHE_CONTROL
+    assert response.headers["etag"] == f'"{DIGEST}"'
+    assert response.headers["accept-ranges"] == "bytes"
+
+    response = await static_client.get(
+        url, headers={"If-None-Match": f'"other", W/"{DIGEST}"'}
+    )
+
+    assert response.status_code == 304
+    assert response.content == b""
+
+
+@pytest.mark.anyio
+async def test_legacy_image_is_revalidated(static_client: AsyncClient):
+    response = await static_client.get("/images/legacy.png")
+
+    assert response.headers["cache-control"] == REVALIDATE_CACHE_CONTROL
+
+    response = await static_client.get(
+        "/images/legacy.png", headers={"If-None-Match": response.headers["etag"]}
+    )
+
+    assert response.status_code == 304
+
+
+@pytest.mark.anyio
+async def test_range_request(static_client: AsyncClient):
+    url = f"/images/ab/{DIGEST}.png"
+    response = await static_client.get(url, headers={"Range": "bytes=100-199"})
+
+    assert response.status_code == 206
+    assert response.content == CONTENT[100:200]
+    assert response.headers["content-range"] == "bytes 100-199/1024"
+    assert response.headers["content-length"] == "100"
+
+    response = await static_client.get(url, headers={"Range": "bytes=4096-"})
+
+    assert response.status_code == 416
+    assert response.headers["content-range"] == "bytes */1024"
+
+    response = await static_client.get(
+        url, headers={"Range": "bytes=100-199", "If-Range": '"other"'}
+    )
+
+    assert response.status_code == 200
+    assert response.content == CONTENT
+
+
+@pytest.mark.anyio
+async def test_range_response_uses_zero_copy_send(tmp_path):
+    path = tmp_path / "image.png"
+    path.write_bytes(CONTENT)
+    messages = []
+
+    async def send(message):
+        messages.append({**message, "file": message.get("file") is not None})
+
+    response = RangeFileResponse(str(path), path.stat(), 10, 19, 206)
+    scope = {"type": "http", "extensions": {"http.response.zerocopysend": {}}}
+    await response(scope, None, send)
+
+    assert messages[1] == {
+        "type": "http.response.zerocopysend",
+        "file": True,
+        "offset": 10,
+        "count": 10,
+        "more_body": False,
+    }
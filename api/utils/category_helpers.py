@@ -0,0 +1,67 @@
+import asyncio
+import logging
+from typing import Any, Iterable, Optional
+
+from databases import Database
+from sqlalchemy import select
+
+from api.database import category_table
+from api.utils.response_cache_helpers import table_versions
+
+logger = logging.getLogger(__name__)
+
+
+class CategoryNames:
+    """Read model of every category name by id, so product reads can fill in
+    ``category_name`` without joining ``categories``.
+
+    The map is reloaded whenever the ``categories`` version stored in the
+    database has moved on, whichever process wrote to the table."""
+
+    def __init__(self) -> None:
+        self._names: Optional[dict[int, str]] = None
+        self._version: Optional[tuple[int, ...]] = None
+        self._lock = asyncio.Lock()
+
+    async def load(self, db: Database) -> dict[int, str]:
+        async with self._lock:
+            version = await table_versions(db, [category_table])
+            rows = await db.fetch_all(
+                select(category_table.c.id, category_table.c.name)
+            )
+            self._names = {row.id: row.name for row in rows}
+            self._version = version
+
+        logger.debug("Loaded %d category names", len(self._names))
+        return self._names
+
+    async def get(self, db: Database) -> dict[int, str]:
+        names = self._names
+        if names is None or self._version != await table_versions(db, [category_table]):
+            names = await self.load(db)
+        return names
+
+    def clear(self) -> None:
+        self._names = None
+        self._version = None
+
+
+category_names = CategoryNames()
+
+
+async def with_category_names(db: Database, rows: Iterable[Any]) -> list[dict]:
+    """Turn product rows selecting ``category_id`` into dicts with the
+    ``category_name`` the join used to provide.
+
+    Rows whose category does not exist keep a null ``category_name`` rather
+    than being left out, so pages stay as long as the totals say."""
+    rows = [dict(row._mapping) for row in rows]
+    names = await category_names.get(db)
+
+    for row in rows:
+        if row["category_id"] not in names:
+            logger.warning(
+                f"Product {row['id']} refers to missing category {row['category_id']}"
+            )
+        row["category_name"] = names.get(row["category_id"])
+    return rows
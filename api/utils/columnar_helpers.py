@@ -0,0 +1,385 @@
+import asyncio
+import logging
+import math
+import re
+from typing import Any, Iterable, Optional
+
+from databases import Database
+from fastapi import Request
+from sqlalchemy import select
+
+from api.config import config
+from api.database import category_table, product_price, product_table
+from api.models.pagination import PaginatedResponse
+from api.utils.pagination_helpers import encode_params, page_links
+from api.utils.response_cache_helpers import table_versions
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional, the SQL path serves every request
+    np = None
+
+logger = logging.getLogger(__name__)
+
+COLUMNAR_ENGINE = "columnar"
+
+CATALOG_TABLES = (product_table, category_table)
+
+# Outer join: a product whose category is missing stays, with a null
+# category_name, as it does on the SQL path
+catalog_query = select(
+    product_table.c.id,
+    product_table.c.name,
+    product_table.c.description,
+    product_price,
+    product_table.c.category_id,
+    category_table.c.name.label("category_name"),
+    product_table.c.image,
+    product_table.c.thumbnail,
+).outerjoin(category_table, product_table.c.category_id == category_table.c.id)
+
+
+def like_pattern(pattern: str) -> re.Pattern:
+    """Compile the regex equivalent of SQLite's ``lower(x) LIKE lower(pattern)``,
+    which is what ``ilike`` renders to: % and _ are wildcards and only ASCII
+    letters are case folded."""
+    parts = []
+    for char in pattern:
+        if char == "%":
+            parts.append(".*")
+        elif char == "_":
+            parts.append(".")
+        else:
+            parts.append(re.escape(char))
+    return re.compile("".join(parts), re.IGNORECASE | re.ASCII | re.DOTALL)
+
+
+def sqlite_real_text(value: float) -> str:
+    """Text SQLite gives a REAL when it is used as a string, ``%!.15g``."""
+    text = "%.15g" % value
+    mantissa, separator, exponent = text.partition("e")
+    if "." not in mantissa and mantissa.lstrip("-").isdigit():
+        mantissa += ".0"
+    return f"{mantissa}{separator}{exponent}"
+
+
+class StringTable:
+    """Interned strings, so a column of text is an array of int32 codes and
+    per-string work such as pattern matching runs once per distinct value."""
+
+    def __init__(self) -> None:
+        self.strings: list[Optional[str]] = []
+        self.codes: dict[Optional[str], int] = {}
+        self._ranks = None
+
+    def intern(self, value: Optional[str]) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.strings)
+            self.strings.append(value)
+            self._ranks = None
+        return code
+
+    def match(self, pattern: re.Pattern) -> "np.ndarray":
+        return np.fromiter(
+            (
+                value is not None and pattern.fullmatch(value) is not None
+                for value in self.strings
+            ),
+            dtype=bool,
+            count=len(self.strings),
+        )
+
+    def ranks(self) -> "np.ndarray":
+        """Position of every code in SQLite's BINARY order, NULL first. Python
+        compares code points, which orders like the UTF-8 bytes do."""
+        if self._ranks is None:
+            order = sorted(
+                range(len(self.strings)),
+                key=lambda code: (self.strings[code] is not None, self.strings[code]),
+            )
+            self._ranks = np.empty(len(order), dtype=np.int64)
+            self._ranks[order] = np.arange(len(order))
+        return self._ranks
+
+
+class ColumnarCatalog:
+    """In-memory copy of ``products`` joined with ``categories`` held as
+    column arrays, answering the filter, sort and page queries of
+    ``get_all_product`` without SQL.
+
+    Every process keeps its own copy, stamped with the ``table_versions`` of
+    the rows it holds. Product writes made through this process are applied
+    row by row through ``refresh``, which moves the stamp along. Any other
+    write (another worker, ``api.manage seed``, a category rename) leaves the
+    stamp behind and the next ``load`` reads every row again. Deleted rows
+    only clear their ``alive`` flag until that full load."""
+
+    COLUMNS = (
+        "ids",
+        "prices",
+        "category_ids",
+        "names",
+        "descriptions",
+        "images",
+        "thumbnails",
+        "alive",
+    )
+
+    def __init__(self, capacity: int = 1024) -> None:
+        self.loaded = False
+        self._versions: Optional[tuple[int, ...]] = None
+        self._lock = asyncio.Lock()
+        self._reset(capacity)
+
+    def _reset(self, capacity: int) -> None:
+        self.strings = StringTable()
+        self.size = 0
+        self.positions: dict[int, int] = {}
+        self.ids = np.zeros(capacity, dtype=np.int64)
+        self.prices = np.full(capacity, np.nan, dtype=np.float64)
+        self.category_ids = np.zeros(capacity, dtype=np.int32)
+        self.names = np.zeros(capacity, dtype=np.int32)
+        self.descriptions = np.zeros(capacity, dtype=np.int32)
+        self.images = np.zeros(capacity, dtype=np.int32)
+        self.thumbnails = np.zeros(capacity, dtype=np.int32)
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.category_codes = np.full(capacity, -1, dtype=np.int32)
+
+    def _grow(self) -> None:
+        for column in self.COLUMNS:
+            array = getattr(self, column)
+            grown = np.resize(array, len(array) * 2)
+            grown[len(array) :] = np.nan if column == "prices" else 0
+            setattr(self, column, grown)
+
+    def upsert(self, row: Any) -> None:
+        position = self.positions.get(row.id)
+        if position is None:
+            if self.size == len(self.ids):
+                self._grow()
+            position = self.positions[row.id] = self.size
+            self.size += 1
+
+        self.ids[position] = row.id
+        self.prices[position] = np.nan if row.price is None else row.price
+        self.category_ids[position] = row.category_id
+        self.names[position] = self.strings.intern(row.name)
+        self.descriptions[position] = self.strings.intern(row.description)
+        self.images[position] = self.strings.intern(row.image)
+        self.thumbnails[position] = self.strings.intern(row.thumbnail)
+        self.alive[position] = True
+
+        if row.category_id >= len(self.category_codes):
+            grown = np.full(row.category_id * 2 + 1, -1, dtype=np.int32)
+            grown[: len(self.category_codes)] = self.category_codes
+            self.category_codes = grown
+        self.category_codes[row.category_id] = self.strings.intern(row.category_name)
+
+    def remove(self, product_id: int) -> None:
+        position = self.positions.pop(product_id, None)
+        if position is not None:
+            self.alive[position] = False
+
+    async def load(self, db: Database) -> None:
+        """Read every row unless the copy is stamped with the current versions.
+
+        The versions are read before the rows, so a write committing in
+        between only costs one more load."""
+        if self.loaded and self._versions == await table_versions(db, CATALOG_TABLES):
+            return
+
+        async with self._lock:
+            versions = await table_versions(db, CATALOG_TABLES)
+            if self.loaded and self._versions == versions:
+                return
+
+            rows = await db.fetch_all(catalog_query.order_by(product_table.c.id))
+            self._reset(max(1024, len(rows)))
+            for row in rows:
+                self.upsert(row)
+            self.loaded = True
+            self._versions = versions
+
+        logger.info(f"Loaded {self.size} products into the columnar catalog")
+
+    async def refresh(
+        self,
+        db: Database,
+        product_ids: Iterable[int],
+        before: Optional[tuple[int, ...]],
+        after: Optional[tuple[int, ...]],
+    ) -> None:
+        """Apply the rows of a write that moved the versions from ``before``
+        to ``after``.
+
+        The stamp only moves to ``after`` when the copy was at ``before``, that
+        is when no other write happened since it was stamped. Otherwise it
+        stays behind and the next ``load`` reads every row."""
+        # Before the first load there is nothing to update. The lock orders
+        # refreshes after a load in progress and after each other, so rows
+        # are applied in the order they were read.
+        product_ids = set(product_ids)
+        if not product_ids:
+            return
+
+        async with self._lock:
+            if not self.loaded:
+                return
+
+            query = catalog_query.where(product_table.c.id.in_(product_ids))
+            rows = await db.fetch_all(query)
+            for row in rows:
+                self.upsert(row)
+            for product_id in product_ids - {row.id for row in rows}:
+                self.remove(product_id)
+            if before is not None and self._versions == before:
+                self._versions = after
+
+    def clear(self) -> None:
+        """Drop the rows, the next query loads them again."""
+        self.loaded = False
+        self._versions = None
+        self._reset(1024)
+
+    def _filter(self, filters: dict[str, Any]) -> "np.ndarray":
+        mask = self.alive[: self.size].copy()
+        for key, value in filters.items():
+            if not value:
+                mask[:] = False
+                break
+
+            pattern = like_pattern(f"%{value}%")
+            if key == "price":
+                prices, inverse = np.unique(
+                    self.prices[: self.size], return_inverse=True
+                )
+                matches = np.fromiter(
+                    (
+                        not math.isnan(price)
+                        and pattern.fullmatch(sqlite_real_text(price)) is not None
+                        for price in prices
+                    ),
+                    dtype=bool,
+                    count=len(prices),
+                )
+            else:
+                codes = {"name": self.names, "description": self.descriptions}[key]
+                matches = self.strings.match(pattern)
+                inverse = codes[: self.size]
+            mask &= matches[inverse]
+        return mask
+
+    def _sort_key(self, rows: "np.ndarray", sort: Optional[str]) -> "np.ndarray":
+        # NULL sorts first ascending and last descending, as in SQLite
+        if sort is None:
+            return self.ids[rows]
+        if sort.lstrip("-") == "price":
+            prices = self.prices[rows]
+            if sort.startswith("-"):
+                return np.where(np.isnan(prices), np.inf, -prices)
+            return np.where(np.isnan(prices), -np.inf, prices)
+
+        ranks = self.strings.ranks()[self.names[rows]]
+        return -ranks if sort.startswith("-") else ranks
+
+    def query(
+        self, filters: dict[str, Any], sort: Optional[str], page: int, per_page: int
+    ) -> tuple[int, list[dict[str, Any]]]:
+        """Return the total number of matches and the rows of one page."""
+        rows = np.flatnonzero(self._filter(filters))
+        total = len(rows)
+        offset = (page - 1) * per_page
+        limit = min(offset + per_page, total)
+        if offset >= total:
+            return total, []
+
+        key = self._sort_key(rows, sort)
+        candidates = np.arange(total)
+        if limit < total:
+            # Only rows up to the key of the last one on the page can be on it
+            threshold = np.partition(key, limit - 1)[limit - 1]
+            candidates = np.flatnonzero(key <= threshold)
+
+        # Ties fall back to id, like the ORDER BY <key>, id of the SQL path
+        order = np.lexsort((self.ids[rows[candidates]], key[candidates]))
+        page_rows = rows[candidates[order[offset:limit]]]
+        return total, [self._row(position) for position in page_rows]
+
+    def _row(self, position: int) -> dict[str, Any]:
+        strings = self.strings.strings
+        price = self.prices[position]
+        return {
+            "name": strings[self.names[position]],
+            "description": strings[self.descriptions[position]],
+            "price": None if math.isnan(price) else float(price),
+            "category_name": strings[self.category_codes[self.category_ids[position]]],
+            "image": strings[self.images[position]],
+            "id": int(self.ids[position]),
+            "thumbnail": strings[self.thumbnails[position]],
+        }
+
+
+columnar_catalog = ColumnarCatalog() if np is not None else None
+
+
+def use_columnar_catalog(cursor: Optional[str], q: Optional[str]) -> bool:
+    """Whether ``get_all_product`` is served from the columnar catalog.
+
+    Cursor pagination and full-text search always go to SQLite."""
+    if config.CATALOG_ENGINE != COLUMNAR_ENGINE:
+        return False
+    if columnar_catalog is None:
+        logger.warning("CATALOG_ENGINE is columnar but numpy is not installed")
+        return False
+    return cursor is None and q is None
+
+
+async def paginate_catalog(
+    request: Request,
+    page: int,
+    per_page: int,
+    db: Database,
+    path: str,
+    filters: dict[str, Any],
+    sort: Optional[str],
+) -> PaginatedResponse:
+    logger.info("Getting all products from the columnar catalog")
+    await columnar_catalog.load(db)
+
+    total, items = columnar_catalog.query(filters, sort, page, per_page)
+    params = encode_params({k: v for k, v in filters.items() if v}, sort)
+    next_page, prev_page = page_links(
+        f"{request.base_url}{path}", page, per_page, total, params
+    )
+
+    return PaginatedResponse(
+        page=page,
+        per_page=per_page,
+        totalItems=total,
+        nextPageUrl=next_page,
+        prevPageUrl=prev_page,
+        results=items,
+    )
+
+
+async def catalog_versions(db: Database) -> Optional[tuple[int, ...]]:
+    """Versions of the catalog tables, or None while no catalog is loaded.
+
+    Read first and last in the transaction of a product write, while it holds
+    the write lock, they tell ``refresh_catalog`` which versions the write
+    went from and to."""
+    if columnar_catalog is None or not columnar_catalog.loaded:
+        return None
+    return await table_versions(db, CATALOG_TABLES)
+
+
+async def refresh_catalog(
+    db: Database,
+    product_ids: Iterable[int],
+    before: Optional[tuple[int, ...]],
+    after: Optional[tuple[int, ...]],
+) -> None:
+    """Apply committed product writes to the columnar catalog, if it is used."""
+    if columnar_catalog is not None:
+        await columnar_catalog.refresh(db, product_ids, before, after)
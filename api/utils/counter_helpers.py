@@ -0,0 +1,77 @@
+import logging
+
+from databases import Database
+from sqlalchemy import Table, func, literal, select
+from sqlalchemy.sql import Select
+
+from api.database import row_count_table
+from api.utils.logging_helpers import log_sql
+from api.utils.pagination_helpers import count_items
+
+logger = logging.getLogger(__name__)
+
+ESTIMATE_SAMPLE_SIZE = 1000
+ESTIMATE_DESCRIPTION = (
+    "Report an estimated totalItems for filtered queries instead of counting "
+    "every match. Page links derived from an estimate may be off by a page."
+)
+
+
+async def increment_row_count(db: Database, table: Table, delta: int = 1) -> None:
+    """Adjust the maintained row count of ``table``.
+
+    Must run in the same transaction as the insert or delete it accounts for.
+    A table that has not been counted yet is left alone, it is seeded from the
+    real table contents the first time it is read."""
+    query = (
+        row_count_table.update()
+        .where(row_count_table.c.table_name == table.name)
+        .values(row_count=row_count_table.c.row_count + delta)
+    )
+
+    log_sql(logger, query)
+
+    await db.execute(query)
+
+
+async def get_row_count(db: Database, table: Table) -> tuple:
+    query = select(row_count_table.c.row_count).where(
+        row_count_table.c.table_name == table.name
+    )
+    result = await db.fetch_one(query)
+
+    if result is None:
+        logger.info(f"Seeding row count of {table.name}")
+        # Counting inside the INSERT keeps the seed consistent with writers that
+        # commit in between, the statement runs under the database write lock
+        seed_query = (
+            row_count_table.insert()
+            .prefix_with("OR IGNORE")
+            .from_select(
+                ["table_name", "row_count"],
+                select(literal(table.name), func.count()).select_from(table),
+            )
+        )
+        await db.execute(seed_query)
+        result = await db.fetch_one(query)
+
+    return (result.row_count,)
+
+
+async def estimate_row_count(db: Database, table: Table, query: Select) -> tuple:
+    """Estimate how many rows of ``table`` match ``query``.
+
+    Counts the matches among the newest ``ESTIMATE_SAMPLE_SIZE`` rows and scales
+    the result by the maintained table size, so the cost does not grow with the
+    table. Small tables are counted exactly."""
+    total = (await get_row_count(db, table))[0]
+    if total <= ESTIMATE_SAMPLE_SIZE:
+        return await count_items(db, query)
+
+    sample_ids = (
+        select(table.c.id).order_by(table.c.id.desc()).limit(ESTIMATE_SAMPLE_SIZE)
+    )
+    sample_query = query.where(query.selected_columns.id.in_(sample_ids))
+    matches = (await count_items(db, sample_query))[0]
+
+    return (round(matches * total / ESTIMATE_SAMPLE_SIZE),)
@@ -0,0 +1,60 @@
+import asyncio
+import logging
+from concurrent.futures import Executor
+from typing import Any, Callable, Optional
+
+from fastapi import HTTPException, status
+
+logger = logging.getLogger(__name__)
+
+
+class BoundedExecutor:
+    """Awaitable front for a thread or process pool that refuses new work with
+    503 once ``max_pending`` jobs are already queued or running, instead of
+    letting the queue and the latency of every caller grow without limit.
+
+    The pool itself is only created on first use."""
+
+    def __init__(
+        self, name: str, factory: Callable[[], Executor], max_pending: int
+    ) -> None:
+        self.name = name
+        self.factory = factory
+        self.max_pending = max_pending
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self._executor: Optional[Executor] = None
+
+    async def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            logger.warning(f"{self.name} pool is saturated, rejecting job")
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Server is busy, please retry shortly",
+                headers={"Retry-After": "1"},
+            )
+
+        if self._executor is None:
+            self._executor = self.factory()
+
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, func, *args)
+        finally:
+            self.pending -= 1
+            self.completed += 1
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "pending": self.pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,202 @@
+import asyncio
+import logging
+import os
+from collections import OrderedDict
+from io import BytesIO
+from pathlib import Path
+from typing import Optional
+
+import aiofiles
+from fastapi import HTTPException
+from PIL import Image
+
+from api.config import config
+from api.models.image import ImageFormat
+from api.utils.product_helpers import BASE_DIR, IMAGE_DIR, image_executor
+
+logger = logging.getLogger(__name__)
+
+VARIANT_SIZES = (64, 128, 256, 512, 1024)
+VARIANT_DIR = BASE_DIR / "variants"
+
+MEDIA_TYPES = {
+    ImageFormat.jpeg: "image/jpeg",
+    ImageFormat.png: "image/png",
+    ImageFormat.webp: "image/webp",
+}
+SOURCE_FORMATS = {
+    ".jpg": ImageFormat.jpeg,
+    ".jpeg": ImageFormat.jpeg,
+    ".png": ImageFormat.png,
+}
+SAVE_OPTIONS = {
+    ImageFormat.jpeg: {"quality": 85, "optimize": True},
+    ImageFormat.png: {"optimize": True},
+    ImageFormat.webp: {"quality": 80},
+}
+
+
+class DiskCache:
+    """Files under ``directory`` that are evicted least recently used first
+    once together they take more than ``max_bytes``.
+
+    The index is built from file modification times on first use and hits
+    touch the file, so the order survives restarts."""
+
+    def __init__(self, directory: Path, max_bytes: int) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: Optional[OrderedDict[str, int]] = None
+
+    def _index(self) -> OrderedDict[str, int]:
+        if self._entries is None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            files = []
+            for path in self.directory.iterdir():
+                # Skips .gitkeep and half written temporary files
+                if path.is_file() and not path.name.startswith("."):
+                    stat = path.stat()
+                    files.append((stat.st_mtime, path.name, stat.st_size))
+
+            self._entries = OrderedDict((name, size) for _, name, size in sorted(files))
+            self.size = sum(self._entries.values())
+            self._evict()
+        return self._entries
+
+    def get(self, key: str) -> Optional[Path]:
+        entries = self._index()
+        path = self.directory / key
+        if key not in entries or not path.exists():
+            self.size -= entries.pop(key, 0)
+            self.misses += 1
+            return None
+
+        entries.move_to_end(key)
+        os.utime(path)
+        self.hits += 1
+        return path
+
+    async def put(self, key: str, data: bytes) -> Path:
+        entries = self._index()
+        path = self.directory / key
+        temporary_path = self.directory / f".{key}.tmp"
+
+        async with aiofiles.open(temporary_path, "wb") as out_file:
+            await out_file.write(data)
+        os.replace(temporary_path, path)
+
+        self.size -= entries.pop(key, 0)
+        entries[key] = len(data)
+        self.size += len(data)
+        self._evict()
+        return path
+
+    def _evict(self) -> None:
+        entries = self._entries
+        # The newest entry stays even if it alone is over the budget
+        while self.size > self.max_bytes and len(entries) > 1:
+            key, size = entries.popitem(last=False)
+            (self.directory / key).unlink(missing_ok=True)
+            self.size -= size
+            self.evictions += 1
+            logger.debug("Evicted image variant %s", key)
+
+    def stats(self) -> dict[str, int]:
+        self._index()
+        return {
+            "files": len(self._entries),
+            "bytes": self.size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+variant_cache = DiskCache(VARIANT_DIR, config.IMAGE_VARIANT_CACHE_BYTES)
+
+# Concurrent first requests for the same variant share a single render
+_rendering: dict[str, asyncio.Future] = {}
+
+
+def variant_key(
+    name: str, width: Optional[int], height: Optional[int], fmt: ImageFormat
+) -> str:
+    return f"{name}.{width or 0}x{height or 0}.{fmt.value}"
+
+
+def render_variant(
+    image_path: Path,
+    width: Optional[int],
+    height: Optional[int],
+    fmt: ImageFormat,
+) -> bytes:
+    with Image.open(image_path) as img:
+        # A missing side is left unconstrained, thumbnail() keeps the aspect ratio
+        img.thumbnail((width or img.width, height or img.height))
+        if fmt == ImageFormat.jpeg and img.mode not in ("RGB", "L"):
+            img = img.convert("RGB")
+
+        img_bytes = BytesIO()
+        img.save(img_bytes, format=fmt.value.upper(), **SAVE_OPTIONS[fmt])
+        return img_bytes.getvalue()
+
+
+def validate_variant(
+    name: str, width: Optional[int], height: Optional[int]
+) -> tuple[Path, ImageFormat]:
+    if width is None and height is None:
+        raise HTTPException(status_code=400, detail="Provide w, h or both")
+
+    for size in (width, height):
+        if size is not None and size not in VARIANT_SIZES:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Invalid image size. Available sizes are {list(VARIANT_SIZES)}",
+            )
+
+    source_format = SOURCE_FORMATS.get(Path(name).suffix.lower())
+    if Path(name).name == name and source_format is not None:
+        # Content-addressed images are sharded, older uploads sit at the top
+        for image_path in (IMAGE_DIR / name[:2] / name, IMAGE_DIR / name):
+            if image_path.is_file():
+                return image_path, source_format
+
+    raise HTTPException(status_code=404, detail="Image not found")
+
+
+async def get_image_variant(
+    name: str,
+    width: Optional[int],
+    height: Optional[int],
+    fmt: Optional[ImageFormat],
+) -> tuple[Path, ImageFormat]:
+    image_path, source_format = validate_variant(name, width, height)
+    fmt = fmt or source_format
+    key = variant_key(name, width, height, fmt)
+
+    if path := variant_cache.get(key):
+        return path, fmt
+
+    if key not in _rendering:
+        logger.info(f"Rendering image variant {key}")
+        _rendering[key] = asyncio.ensure_future(
+            render_and_store(key, image_path, width, height, fmt)
+        )
+        _rendering[key].add_done_callback(lambda _: _rendering.pop(key, None))
+
+    return await asyncio.shield(_rendering[key]), fmt
+
+
+async def render_and_store(
+    key: str,
+    image_path: Path,
+    width: Optional[int],
+    height: Optional[int],
+    fmt: ImageFormat,
+) -> Path:
+    img_bytes = await image_executor.run(render_variant, image_path, width, height, fmt)
+    return await variant_cache.put(key, img_bytes)
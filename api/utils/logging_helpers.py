@@ -0,0 +1,26 @@
+import logging
+from typing import Optional
+
+from sqlalchemy.sql import ClauseElement
+
+
+class LazySQL:
+    """A statement rendered to SQL text only when a log record carrying it is
+    formatted, which happens on the log listener thread and only for records
+    that made it past the level check and the debug sampling."""
+
+    __slots__ = ("statement", "_text")
+
+    def __init__(self, statement: ClauseElement) -> None:
+        self.statement = statement
+        self._text: Optional[str] = None
+
+    def __str__(self) -> str:
+        # Every handler formats the record, compile the statement once
+        if self._text is None:
+            self._text = str(self.statement)
+        return self._text
+
+
+def log_sql(logger: logging.Logger, statement: ClauseElement) -> None:
+    logger.debug("Query: %s", LazySQL(statement))
@@ -0,0 +1,140 @@
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Iterable
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from api.utils.static_helpers import ZEROCOPY_SEND
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+SIZE_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+# Requests that matched no route share one label, so scanners probing random
+# paths cannot grow the number of series without bound
+UNMATCHED_ROUTE = "unmatched"
+
+
+class Histogram:
+    """Cumulative Prometheus histogram with fixed bucket bounds."""
+
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds: tuple) -> None:
+        self.bounds = bounds
+        # One count per bound and a last one for +Inf, made cumulative on export
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+    def samples(self, name: str, labels: str) -> Iterable[str]:
+        total = 0
+        for bound, count in zip((*self.bounds, "+Inf"), self.counts):
+            total += count
+            yield f'{name}_bucket{{{labels},le="{bound}"}} {total}'
+        yield f"{name}_sum{{{labels}}} {self.sum}"
+        yield f"{name}_count{{{labels}}} {total}"
+
+
+class RequestMetrics:
+    """Counters and histograms of the HTTP requests served, per route."""
+
+    def __init__(self) -> None:
+        self.clear()
+
+    def clear(self) -> None:
+        self.in_flight = 0
+        self.requests: defaultdict[tuple, int] = defaultdict(int)
+        self.latency: dict[tuple, Histogram] = {}
+        self.sizes: dict[tuple, Histogram] = {}
+
+    def observe(
+        self, method: str, route: str, status: int, seconds: float, size: int
+    ) -> None:
+        key = (method, route)
+        self.requests[(method, route, status)] += 1
+        latency = self.latency.get(key)
+        if latency is None:
+            latency = self.latency[key] = Histogram(LATENCY_BUCKETS)
+            self.sizes[key] = Histogram(SIZE_BUCKETS)
+        latency.observe(seconds)
+        self.sizes[key].observe(size)
+
+    def render(self) -> Iterable[str]:
+        yield "# TYPE http_requests_in_flight gauge"
+        yield f"http_requests_in_flight {self.in_flight}"
+
+        yield "# TYPE http_requests_total counter"
+        for (method, route, status), count in self.requests.items():
+            yield (
+                f'http_requests_total{{method="{method}",route="{route}",'
+                f'status="{status}"}} {count}'
+            )
+
+        for name, histograms in (
+            ("http_request_duration_seconds", self.latency),
+            ("http_response_size_bytes", self.sizes),
+        ):
+            yield f"# TYPE {name} histogram"
+            for (method, route), histogram in histograms.items():
+                yield from histogram.samples(name, f'method="{method}",route="{route}"')
+
+
+request_metrics = RequestMetrics()
+
+
+def route_label(scope: Scope) -> str:
+    """The path template of the route that handled the request, for example
+    ``/product/{product_id}``, never the raw path."""
+    route = scope.get("route")
+    if route is not None:
+        return scope.get("root_path", "") + route.path
+    # Mounted apps such as the image files only leave their prefix behind
+    return scope.get("root_path") or UNMATCHED_ROUTE
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware timing every HTTP request into request_metrics.
+
+    It only wraps ``send`` to catch the status and count body bytes, so the
+    response is still streamed and zero-copy sends pass through untouched."""
+
+    def __init__(self, app: ASGIApp, metrics: RequestMetrics = request_metrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        metrics = self.metrics
+        status = 500
+        size = 0
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            elif message["type"] == ZEROCOPY_SEND:
+                size += message.get("count") or 0
+            await send(message)
+
+        metrics.in_flight += 1
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            metrics.in_flight -= 1
+            metrics.observe(
+                scope["method"],
+                route_label(scope),
+                status,
+                time.perf_counter() - start,
+                size,
+            )
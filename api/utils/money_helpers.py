@@ -0,0 +1,17 @@
+from decimal import ROUND_HALF_UP, Decimal
+
+# Largest amount whose cents still fit a SQLite INTEGER
+MAX_AMOUNT = (2**63 - 1) // 100
+
+
+def to_cents(amount: float) -> int:
+    """Round an amount given by the API as a float to whole cents.
+
+    Going through the shortest decimal repr keeps 0.29 at 29 cents where
+    ``int(0.29 * 100)`` would give 28."""
+    return int((Decimal(str(amount)) * 100).quantize(Decimal(1), ROUND_HALF_UP))
+
+
+def format_cents(cents: int) -> str:
+    """Render cents the way ``total_price`` has always been sent, e.g. "8.00"."""
+    return str(Decimal(cents).scaleb(-2))
@@ -0,0 +1,114 @@
+import json
+import logging
+from typing import Any, Iterable
+
+from databases import Database
+from sqlalchemy import Table, func
+from sqlalchemy.sql import select
+
+from api.database import order_item_table, order_table, product_table
+from api.models.order import ProductQuantity
+from api.utils.logging_helpers import log_sql
+from api.utils.money_helpers import format_cents
+
+logger = logging.getLogger(__name__)
+
+# One JSON array of {product_id, quantity} per order, aggregated by SQLite.
+# The correlated subquery walks ix_order_items_order_id, so the items come
+# in insertion order.
+order_products = (
+    select(
+        func.json_group_array(
+            func.json_object(
+                "product_id",
+                order_item_table.c.product_id,
+                "quantity",
+                order_item_table.c.quantity,
+            )
+        )
+    )
+    .where(order_item_table.c.order_id == order_table.c.id)
+    .scalar_subquery()
+    .label("products")
+)
+
+# Amount of one order item in cents, SUM it for totals over any set of items
+line_total = (order_item_table.c.quantity * order_item_table.c.unit_price_cents).label(
+    "line_total"
+)
+
+# Rows per multi-row INSERT, well below SQLite's limit of bound parameters
+INSERT_CHUNK_SIZE = 500
+
+
+async def fetch_prices(db: Database, product_ids: Iterable[int]) -> dict[int, int]:
+    """Price in cents of every existing product in ``product_ids``, by id."""
+    query = select(product_table.c.id, product_table.c.price_cents).where(
+        product_table.c.id.in_(set(product_ids))
+    )
+    log_sql(logger, query)
+    return {row.id: row.price_cents for row in await db.fetch_all(query)}
+
+
+def find_missing_products(
+    products: list[ProductQuantity], prices: dict[int, int]
+) -> list[int]:
+    return [
+        product.product_id for product in products if product.product_id not in prices
+    ]
+
+
+def order_total(products: list[ProductQuantity], prices: dict[int, int]) -> int:
+    """Total in cents, equal to the ``line_total`` sum of the stored items."""
+    return sum(prices[product.product_id] * product.quantity for product in products)
+
+
+async def insert_rows(
+    db: Database, table: Table, rows: list[dict[str, Any]]
+) -> list[int]:
+    """Insert ``rows`` with multi-row INSERTs and return their ids in order.
+
+    A table with an INTEGER PRIMARY KEY and no AUTOINCREMENT gives every new
+    row the largest id plus one. The caller's transaction holds the write
+    lock, so the ids of one statement end at its last row id and have no
+    gaps."""
+    ids = []
+    for start in range(0, len(rows), INSERT_CHUNK_SIZE):
+        chunk = rows[start : start + INSERT_CHUNK_SIZE]
+        last_id = await db.execute(table.insert().values(chunk))
+        ids.extend(range(last_id - len(chunk) + 1, last_id + 1))
+    return ids
+
+
+async def insert_orders(
+    db: Database,
+    orders: list[dict[str, Any]],
+    items: list[list[ProductQuantity]],
+    prices: dict[int, int],
+) -> list[int]:
+    """Insert ``orders`` together with the items of each, priced from
+    ``prices``, and return the new order ids. Must run inside a transaction."""
+    order_ids = await insert_rows(db, order_table, orders)
+
+    item_rows = [
+        {
+            "order_id": order_id,
+            "product_id": product.product_id,
+            "quantity": product.quantity,
+            "unit_price_cents": prices[product.product_id],
+        }
+        for order_id, products in zip(order_ids, items)
+        for product in products
+    ]
+    if item_rows:
+        await insert_rows(db, order_item_table, item_rows)
+    return order_ids
+
+
+def order_from_row(row: Any) -> dict[str, Any]:
+    """Turn a row selecting ``order_products`` into an ``Order`` dict."""
+    return {
+        **row._mapping,
+        "total_price": format_cents(row.total_cents),
+        "products": json.loads(row.products),
+    }
@@ -1,15 +1,126 @@
+import base64
+import binascii
+import json
 import logging
 from typing import Any, Optional
 
 import sqlalchemy
 from databases import Database
-from fastapi import Request
-from sqlalchemy import Table
+from fastapi import HTTPException, Request
+from sqlalchemy import Table, or_
 
 from api.models.pagination import PaginatedResponse
+from api.utils.logging_helpers import log_sql
 
 logger = logging.getLogger(__name__)
 
+CURSOR_DESCRIPTION = (
+    "Opaque cursor from nextPageUrl/prevPageUrl. Pass an empty value to start "
+    "keyset pagination from the first page; `page` is ignored in this mode."
+)
+
+
+def encode_cursor(data: dict[str, Any]) -> str:
+    raw = json.dumps(data, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+# Sort key values a cursor may seek past, anything else cannot be bound
+CURSOR_VALUE_TYPES = (str, int, float, type(None))
+
+
+def decode_cursor(cursor: str) -> dict[str, Any]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        data = json.loads(raw)
+    except (binascii.Error, ValueError) as e:
+        raise HTTPException(status_code=400, detail="Invalid cursor") from e
+
+    if (
+        not isinstance(data, dict)
+        or not {"p", "id", "d"} <= data.keys()
+        or not isinstance(data["p"], int)
+        or not isinstance(data["id"], int)
+        or not isinstance(data.get("v"), CURSOR_VALUE_TYPES)
+        or data["d"] not in ("next", "prev")
+    ):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return data
+
+
+def apply_keyset(
+    query: sqlalchemy.sql.selectable.Select,
+    sort: Optional[str],
+    cursor_data: Optional[dict[str, Any]],
+) -> tuple[sqlalchemy.sql.selectable.Select, str]:
+    """Replace the ordering of ``query`` with ``(sort key, id)`` and seek past
+    the row encoded in the cursor instead of skipping rows with OFFSET.
+
+    Returns the query together with the name of the sort key column."""
+    key = sort.lstrip("-") if sort else "id"
+    descending = bool(sort and sort.startswith("-"))
+    forward = cursor_data is None or cursor_data["d"] == "next"
+    # Walking backwards flips the direction, the page is reversed afterwards
+    ascending = descending != forward
+
+    id_column = query.selected_columns.id
+    key_column = query.selected_columns[key]
+
+    if key == "id":
+        ordering = [id_column.asc() if ascending else id_column.desc()]
+    else:
+        ordering = [
+            key_column.asc() if ascending else key_column.desc(),
+            id_column.asc() if ascending else id_column.desc(),
+        ]
+    query = query.order_by(None).order_by(*ordering)
+
+    if cursor_data is not None:
+        position = cursor_data["id"]
+        past_id = id_column > position if ascending else id_column < position
+        if key == "id":
+            query = query.where(past_id)
+        else:
+            if "v" not in cursor_data:
+                raise HTTPException(status_code=400, detail="Invalid cursor")
+            value = cursor_data["v"]
+            # Spelled out instead of comparing (key, id) row values, which
+            # SQLite cannot seek an expression index such as ix_products_price with
+            if ascending:
+                query = query.where(
+                    key_column >= value, or_(key_column > value, past_id)
+                )
+            else:
+                query = query.where(
+                    key_column <= value, or_(key_column < value, past_id)
+                )
+
+    return query, key
+
+
+def encode_params(filters: dict[str, Any], sort: Optional[str]) -> str:
+    filter_params = "&".join(
+        f"&{key}={int(value) if isinstance(value, float) else value}"
+        for key, value in filters.items()
+    )
+
+    sort_params = f"&sort={sort}" if sort else ""
+    return f"{filter_params}{sort_params}"
+
+
+def page_links(
+    url: str, page: int, per_page: int, total: int, params: str
+) -> tuple[Optional[str], Optional[str]]:
+    next_page = (
+        f"{url}?page={page + 1}&per_page={per_page}{params}"
+        if page * per_page < total
+        else None
+    )
+    prev_page = (
+        f"{url}?page={page - 1}&per_page={per_page}{params}" if page > 1 else None
+    )
+    return next_page, prev_page
+
 
 async def paginate(
     request: Request,
@@ -22,46 +133,102 @@ async def paginate(
     filters: Optional[dict[str, Any]] = {},
     sort: Optional[str] = None,
     total: Optional[tuple] = None,
+    cursor: Optional[str] = None,
+    default_sort: Optional[str] = None,
 ) -> PaginatedResponse:
-    offset = (page - 1) * per_page
-    if isinstance(table, sqlalchemy.sql.selectable.Join):
-        logger.info(
-            f"Getting all {table.left.name} and {table.right.name} with pagination"
+    url = f"{request.base_url}{path}"
+    params = encode_params(filters, sort)
+
+    if cursor is not None:
+        return await paginate_with_cursor(
+            per_page,
+            table,
+            db,
+            url,
+            query,
+            params,
+            sort,
+            total,
+            cursor,
+            default_sort,
         )
-        filtered_paginated_query = query
-    else:
-        logger.info(f"Getting all {table.name} with pagination")
-        filtered_paginated_query = query.limit(per_page).offset(offset)
+
+    offset = (page - 1) * per_page
+    logger.info(f"Getting all {table.name} with pagination")
+    filtered_paginated_query = query.limit(per_page).offset(offset)
 
     items = await db.fetch_all(filtered_paginated_query)
 
     if total is None:
-        count_query = sqlalchemy.select(sqlalchemy.func.count()).select_from(
-            query.alias()
-        )
-        total = await db.fetch_one(count_query)
+        total = await count_items(db, query)
 
-    base_url = str(request.base_url)
+    next_page, prev_page = page_links(url, page, per_page, total[0], params)
 
-    filter_params = "&".join(
-        f"&{key}={int(value) if isinstance(value, float) else value}"
-        for key, value in filters.items()
+    log_sql(logger, query)
+    return PaginatedResponse(
+        page=page,
+        per_page=per_page,
+        totalItems=total[0],
+        nextPageUrl=next_page,
+        prevPageUrl=prev_page,
+        results=items,
     )
 
-    sort_params = f"&sort={sort}" if sort else ""
 
-    next_page = (
-        f"{base_url}{path}?page={page + 1}&per_page={per_page}{filter_params}{sort_params}"
-        if offset + per_page < total[0]
-        else None
-    )
-    prev_page = (
-        f"{base_url}{path}?page={page - 1}&per_page={per_page}{filter_params}{sort_params}"
-        if page > 1
-        else None
-    )
+async def paginate_with_cursor(
+    per_page: int,
+    table: Table,
+    db: Database,
+    url: str,
+    query: sqlalchemy.sql.selectable.Select,
+    params: str,
+    sort: Optional[str],
+    total: Optional[tuple],
+    cursor: str,
+    default_sort: Optional[str] = None,
+) -> PaginatedResponse:
+    logger.info(f"Getting all {table.name} with cursor pagination")
+
+    cursor_data = decode_cursor(cursor) if cursor else None
+    if cursor_data is not None and cursor_data.get("s") != sort:
+        raise HTTPException(
+            status_code=400, detail="Cursor does not match the requested sort"
+        )
+
+    page = cursor_data["p"] if cursor_data else 1
+    forward = cursor_data is None or cursor_data["d"] == "next"
+
+    keyset_query, key = apply_keyset(query, sort or default_sort, cursor_data)
+
+    # One extra row tells whether there is anything beyond this page
+    items = await db.fetch_all(keyset_query.limit(per_page + 1))
+    has_more = len(items) > per_page
+    items = items[:per_page]
+    if not forward:
+        items.reverse()
 
-    logger.debug(query)
+    if total is None:
+        total = await count_items(db, query)
+
+    if forward:
+        has_next, has_prev = has_more, cursor_data is not None
+    else:
+        has_next, has_prev = True, has_more
+
+    def page_url(item, page_number: int, direction: str) -> str:
+        position = {
+            "p": page_number,
+            "s": sort,
+            "v": item._mapping[key],
+            "id": item._mapping["id"],
+            "d": direction,
+        }
+        return f"{url}?per_page={per_page}&cursor={encode_cursor(position)}{params}"
+
+    next_page = page_url(items[-1], page + 1, "next") if items and has_next else None
+    prev_page = page_url(items[0], page - 1, "prev") if items and has_prev else None
+
+    log_sql(logger, keyset_query)
     return PaginatedResponse(
         page=page,
         per_page=per_page,
@@ -70,3 +237,10 @@ async def paginate(
         prevPageUrl=prev_page,
         results=items,
     )
+
+
+async def count_items(db: Database, query: sqlalchemy.sql.selectable.Select):
+    count_query = sqlalchemy.select(sqlalchemy.func.count()).select_from(
+        query.order_by(None).alias()
+    )
+    return await db.fetch_one(count_query)
@@ -1,13 +1,24 @@
-import datetime
+import hashlib
 import logging
+import multiprocessing
 import os
-import re
+import uuid
+from concurrent.futures import ProcessPoolExecutor
 from io import BytesIO
 from pathlib import Path
+from typing import NamedTuple, Optional
 
 import aiofiles
+from databases import Database
 from fastapi import HTTPException, UploadFile
 from PIL import Image
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert
+
+from api.config import config
+from api.database import image_table
+from api.utils.executor_helpers import BoundedExecutor
+from api.utils.logging_helpers import log_sql
 
 logger = logging.getLogger(__name__)
 
@@ -15,6 +26,11 @@ CHUNK_SIZE = 1024 * 1024
 MAX_IMAGE_SIZE = 5 * 1024 * 1024
 ALLOWED_IMAGE_TYPES = ["image/jpeg", "image/png"]
 ALLOWED_IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png"}
+IMAGE_SIGNATURES = {
+    b"\xff\xd8\xff": "image/jpeg",
+    b"\x89PNG\r\n\x1a\n": "image/png",
+}
+IMAGE_EXTENSIONS = {"image/jpeg": ".jpg", "image/png": ".png"}
 
 THUMBNAIL_SIZE = (128, 128)
 
@@ -22,81 +38,249 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 IMAGE_DIR = BASE_DIR / "images"
 THUMBNAIL_DIR = BASE_DIR / "thumbnails"
 
+# Decoding and resizing are CPU bound and hold the GIL, so they run in worker
+# processes. Spawned workers do not inherit the server's threads or sockets.
+image_executor = BoundedExecutor(
+    "image",
+    lambda: ProcessPoolExecutor(
+        max_workers=config.IMAGE_WORKERS,
+        mp_context=multiprocessing.get_context("spawn"),
+    ),
+    max_pending=config.IMAGE_MAX_PENDING,
+)
 
-def sanitize_filename(filename: str) -> str:
-    filename = Path(filename).name
-    filename = re.sub(r"[^\w\s.-]", "", filename)
-    filename = filename[:255]
 
-    timestamp = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
-    return f"{timestamp}_{filename}"
+class IngestedUpload(NamedTuple):
+    path: Path
+    digest: str
+    content_type: str
 
 
-async def is_file_too_large(file: UploadFile, max_size: int, chunk_size: int) -> bool:
-    total_size = 0
-    while chunk := await file.read(chunk_size):
-        total_size += len(chunk)
-        if total_size > max_size:
-            return True
-    return False
+class StoredImage(NamedTuple):
+    upload_path: Path
+    thumbnail_upload_path: Optional[Path]
+    digest: str
+    extension: str
+    image_path: Path
+    thumbnail_path: Path
 
 
-async def create_thumbnail(
-    image_path: Path, thumbnail_size: int, thumbnail_dir: Path
-) -> Path:
+def sniff_image_type(header: bytes) -> Optional[str]:
+    for signature, content_type in IMAGE_SIGNATURES.items():
+        if header.startswith(signature):
+            return content_type
+    return None
+
+
+def image_paths(digest: str, extension: str) -> tuple[Path, Path]:
+    # Two hex characters of fan-out keep every directory small
+    shard = digest[:2]
+    return (
+        IMAGE_DIR / shard / f"{digest}{extension}",
+        THUMBNAIL_DIR / shard / f"{digest}.png",
+    )
+
+
+async def ingest_upload(file: UploadFile, directory: Path) -> IngestedUpload:
+    """Check the size and magic bytes of ``file``, hash it and write it to a
+    hidden file in ``directory`` while reading it only once.
+
+    The caller renames the file into place once it knows where the digest
+    puts it. A rejected upload never leaves a partial file behind."""
+    digest = hashlib.sha256()
+    size = 0
+    content_type = None
+    temporary_path = directory / f".{uuid.uuid4().hex}.part"
+
+    try:
+        async with aiofiles.open(temporary_path, "wb") as out_file:
+            while chunk := await file.read(CHUNK_SIZE):
+                if size == 0:
+                    content_type = sniff_image_type(chunk)
+                    if content_type not in ALLOWED_IMAGE_TYPES:
+                        raise HTTPException(
+                            status_code=400,
+                            detail=f"Invalid image type. Available image type are {ALLOWED_IMAGE_TYPES}",
+                        )
+
+                size += len(chunk)
+                if size > MAX_IMAGE_SIZE:
+                    raise HTTPException(
+                        status_code=400,
+                        detail=f"The image is too large. Max size is {MAX_IMAGE_SIZE}",
+                    )
+
+                digest.update(chunk)
+                await out_file.write(chunk)
+
+        if size == 0:
+            raise HTTPException(status_code=400, detail="The image is empty")
+    except BaseException:
+        temporary_path.unlink(missing_ok=True)
+        raise
+
+    return IngestedUpload(temporary_path, digest.hexdigest(), content_type)
+
+
+def render_thumbnail(image_path: Path, thumbnail_size: tuple[int, int]) -> bytes:
     with Image.open(image_path) as img:
         img.thumbnail(thumbnail_size)
-        thumbnail_path = thumbnail_dir / f"thumbnail_{image_path.stem}.png"
 
         img_bytes = BytesIO()
         img.save(img_bytes, format="PNG")
-        img_bytes = img_bytes.getvalue()
+        return img_bytes.getvalue()
 
-        async with aiofiles.open(thumbnail_path, "wb") as out_file:
-            await out_file.write(img_bytes)
 
-        return thumbnail_path
+async def create_thumbnail(
+    image_path: Path, thumbnail_size: tuple[int, int], thumbnail_path: Path
+) -> Path:
+    img_bytes = await image_executor.run(render_thumbnail, image_path, thumbnail_size)
 
+    thumbnail_path.parent.mkdir(parents=True, exist_ok=True)
+    async with aiofiles.open(thumbnail_path, "wb") as out_file:
+        await out_file.write(img_bytes)
 
-async def save_product_image(file: UploadFile) -> tuple[Path, Path]:
-    if file:
-        logger.debug(f"File {file}\n {file.content_type}\n {file.filename}")
+    return thumbnail_path
 
-        if file.content_type not in ALLOWED_IMAGE_TYPES:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Invalid image type. Available image type are {ALLOWED_IMAGE_TYPES}",
-            )
 
-        if await is_file_too_large(file, MAX_IMAGE_SIZE, CHUNK_SIZE):
-            raise HTTPException(
-                status_code=400,
-                detail=f"The image is too large. Max size is {MAX_IMAGE_SIZE}",
-            )
-        file.file.seek(0)
+async def create_thumbnail_upload(image_path: Path) -> Path:
+    """Render the thumbnail of ``image_path`` to a hidden file in
+    ``THUMBNAIL_DIR``, for ``publish_image`` to rename into place."""
+    thumbnail_upload_path = THUMBNAIL_DIR / f".{uuid.uuid4().hex}.part"
+    try:
+        return await create_thumbnail(image_path, THUMBNAIL_SIZE, thumbnail_upload_path)
+    except BaseException:
+        thumbnail_upload_path.unlink(missing_ok=True)
+        raise
 
-        file_ext = os.path.splitext(file.filename)[1]
-        if file_ext.lower() not in ALLOWED_IMAGE_EXTENSIONS:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Invalid file extension. Only available file extension are: {ALLOWED_IMAGE_EXTENSIONS}",
-            )
 
-        safe_filename = sanitize_filename(file.filename)
-        file_location = IMAGE_DIR / safe_filename
-        IMAGE_DIR.mkdir(exist_ok=True)
+async def save_product_image(file: UploadFile) -> StoredImage:
+    """Validate and hash ``file`` and render its thumbnail unless it exists.
 
-        logger.debug(f"Safe filename: {safe_filename}")
-        logger.debug(f"File location: {file_location}")
+    The upload and the thumbnail stay in temporary files until the product
+    referencing them is committed, see ``acquire_image`` and ``publish_image``."""
+    logger.debug("File %s\n %s\n %s", file, file.content_type, file.filename)
 
-        async with aiofiles.open(file_location, "wb") as out_file:
-            while chunk := await file.read(CHUNK_SIZE):
-                await out_file.write(chunk)
+    if file.content_type not in ALLOWED_IMAGE_TYPES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid image type. Available image type are {ALLOWED_IMAGE_TYPES}",
+        )
+
+    file_ext = os.path.splitext(file.filename)[1]
+    if file_ext.lower() not in ALLOWED_IMAGE_EXTENSIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid file extension. Only available file extension are: {ALLOWED_IMAGE_EXTENSIONS}",
+        )
+
+    IMAGE_DIR.mkdir(exist_ok=True)
+    upload = await ingest_upload(file, IMAGE_DIR)
+
+    extension = IMAGE_EXTENSIONS[upload.content_type]
+    image_path, thumbnail_path = image_paths(upload.digest, extension)
+    logger.debug("Image location: %s", image_path)
+
+    thumbnail_upload_path = None
+    try:
+        # Identical bytes were uploaded before, their thumbnail is reused
+        if not thumbnail_path.exists():
+            thumbnail_upload_path = await create_thumbnail_upload(upload.path)
+    except BaseException:
+        upload.path.unlink(missing_ok=True)
+        raise
+
+    return StoredImage(
+        upload.path,
+        thumbnail_upload_path,
+        upload.digest,
+        extension,
+        image_path,
+        thumbnail_path,
+    )
 
-        THUMBNAIL_DIR.mkdir(exist_ok=True)
 
-        thumbnail_path = await create_thumbnail(
-            file_location, THUMBNAIL_SIZE, THUMBNAIL_DIR
+async def acquire_image(db: Database, image: StoredImage) -> None:
+    """Count one more product referencing ``image``.
+
+    Must run in the same transaction as the insert or update that stores the
+    image path on the product."""
+    query = (
+        insert(image_table)
+        .values(hash=image.digest, extension=image.extension, ref_count=1)
+        .on_conflict_do_update(
+            index_elements=[image_table.c.hash],
+            set_={"ref_count": image_table.c.ref_count + 1},
         )
+    )
+
+    log_sql(logger, query)
+
+    await db.execute(query)
+
+
+async def publish_image(image: StoredImage) -> None:
+    """Move the upload and its thumbnail into the store unless identical bytes
+    are already there.
+
+    Runs after the transaction that acquired the image committed, until then
+    ``release_image`` may remove the stored files of an unreferenced digest.
+    Both files are renamed into place, so a path in the store always holds a
+    complete file."""
+    if image.image_path.exists():
+        image.upload_path.unlink(missing_ok=True)
+    else:
+        image.image_path.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(image.upload_path, image.image_path)
+
+    thumbnail_upload_path = image.thumbnail_upload_path
+    if image.thumbnail_path.exists():
+        if thumbnail_upload_path is not None:
+            thumbnail_upload_path.unlink(missing_ok=True)
+        return
+
+    # The reused thumbnail was released before this transaction committed
+    if thumbnail_upload_path is None:
+        thumbnail_upload_path = await create_thumbnail_upload(image.image_path)
+    image.thumbnail_path.parent.mkdir(parents=True, exist_ok=True)
+    os.replace(thumbnail_upload_path, image.thumbnail_path)
+
+
+def discard_image(image: StoredImage) -> None:
+    image.upload_path.unlink(missing_ok=True)
+    if image.thumbnail_upload_path is not None:
+        image.thumbnail_upload_path.unlink(missing_ok=True)
+
+
+async def release_image(
+    db: Database, image: Optional[str], thumbnail: Optional[str]
+) -> None:
+    """Drop one reference to the stored ``image`` and delete its files once
+    nothing references it any more.
+
+    Must run inside the transaction that deletes or repoints the product. The
+    files are removed while that transaction holds the write lock, so a
+    concurrent upload of the same bytes either keeps the reference alive or
+    acquires it afresh afterwards and publishes the files again."""
+    if not image:
+        return
+
+    digest = Path(image).stem
+    query = (
+        image_table.update()
+        .where(image_table.c.hash == digest)
+        .values(ref_count=image_table.c.ref_count - 1)
+    )
+    await db.execute(query)
+
+    query = select(image_table.c.ref_count).where(image_table.c.hash == digest)
+    row = await db.fetch_one(query)
+    # Images uploaded before the store existed have no reference count
+    if row is None or row.ref_count > 0:
+        return
 
-        return file_location, thumbnail_path
+    logger.info(f"Deleting unreferenced image {digest}")
+    await db.execute(image_table.delete().where(image_table.c.hash == digest))
+    Path(image).unlink(missing_ok=True)
+    if thumbnail:
+        Path(thumbnail).unlink(missing_ok=True)
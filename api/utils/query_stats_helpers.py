@@ -0,0 +1,164 @@
+import logging
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Any, Hashable, NamedTuple, Optional, Union
+
+from asgi_correlation_id import correlation_id
+from databases import Database
+from sqlalchemy.sql import ClauseElement
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from api.config import config
+from api.utils.logging_helpers import LazySQL
+
+logger = logging.getLogger(__name__)
+
+Query = Union[ClauseElement, str]
+
+
+def normalized_sql(query: Query) -> str:
+    """SQL text of ``query`` with its values left as placeholders."""
+    return " ".join(str(query).split())
+
+
+def statement_key(query: Query) -> Hashable:
+    """Identify the shape of a statement regardless of its bound values.
+
+    SQLAlchemy statements carry a memoized cache key, which is far cheaper
+    than compiling them to text on every call."""
+    if isinstance(query, str):
+        return normalized_sql(query)
+    cache_key = query._generate_cache_key()
+    return cache_key.key if cache_key is not None else normalized_sql(query)
+
+
+class QueryRecord(NamedTuple):
+    key: Hashable
+    query: Query
+    seconds: float
+
+
+class QueryStats:
+    """Every query run while handling one request."""
+
+    def __init__(self, correlation_id: Optional[str] = None) -> None:
+        self.correlation_id = correlation_id
+        self.queries: list[QueryRecord] = []
+        self.seconds = 0.0
+
+    @property
+    def count(self) -> int:
+        return len(self.queries)
+
+    def record(self, query: Query, seconds: float) -> None:
+        self.queries.append(QueryRecord(statement_key(query), query, seconds))
+        self.seconds += seconds
+
+    def repeated(self, threshold: int) -> list[tuple[Query, int]]:
+        """Statements run at least ``threshold`` times, the usual sign of a
+        query issued once per row of another one."""
+        counts = Counter(record.key for record in self.queries)
+        first = {}
+        for record in self.queries:
+            first.setdefault(record.key, record.query)
+        return [
+            (first[key], count) for key, count in counts.items() if count >= threshold
+        ]
+
+
+request_queries: ContextVar[Optional[QueryStats]] = ContextVar(
+    "request_queries", default=None
+)
+
+
+class InstrumentedDatabase(Database):
+    """Database timing every query, logging slow ones and adding them to the
+    QueryStats of the request being handled, if any."""
+
+    def record(self, query: Query, seconds: float) -> None:
+        if seconds * 1000 >= config.SLOW_QUERY_MS:
+            logger.warning(
+                "Slow query took %.1f ms: %s", seconds * 1000, LazySQL(query)
+            )
+        stats = request_queries.get()
+        if stats is not None:
+            stats.record(query, seconds)
+
+    async def fetch_all(self, query: Query, values: Optional[dict] = None) -> list:
+        start = time.perf_counter()
+        try:
+            return await super().fetch_all(query, values)
+        finally:
+            self.record(query, time.perf_counter() - start)
+
+    async def fetch_one(self, query: Query, values: Optional[dict] = None) -> Any:
+        start = time.perf_counter()
+        try:
+            return await super().fetch_one(query, values)
+        finally:
+            self.record(query, time.perf_counter() - start)
+
+    async def fetch_val(
+        self, query: Query, values: Optional[dict] = None, column: Any = 0
+    ) -> Any:
+        start = time.perf_counter()
+        try:
+            return await super().fetch_val(query, values, column)
+        finally:
+            self.record(query, time.perf_counter() - start)
+
+    async def execute(self, query: Query, values: Optional[dict] = None) -> Any:
+        start = time.perf_counter()
+        try:
+            return await super().execute(query, values)
+        finally:
+            self.record(query, time.perf_counter() - start)
+
+    async def execute_many(self, query: Query, values: list) -> None:
+        start = time.perf_counter()
+        try:
+            return await super().execute_many(query, values)
+        finally:
+            self.record(query, time.perf_counter() - start)
+
+
+class QueryStatsMiddleware:
+    """Pure ASGI middleware collecting the QueryStats of every HTTP request.
+
+    Statements repeated ``config.REPEATED_QUERY_THRESHOLD`` times or more are
+    logged as a likely N+1 once the request is done. With ``headers`` the
+    response carries the query count and time spent so far in
+    ``X-Query-Count`` and ``X-Query-Time``, in milliseconds."""
+
+    def __init__(self, app: ASGIApp, headers: bool = False) -> None:
+        self.app = app
+        self.headers = headers
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats(correlation_id.get())
+        token = request_queries.set(stats)
+
+        async def send_with_headers(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers["X-Query-Count"] = str(stats.count)
+                headers["X-Query-Time"] = f"{stats.seconds * 1000:.2f}"
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_headers if self.headers else send)
+        finally:
+            request_queries.reset(token)
+            for query, count in stats.repeated(config.REPEATED_QUERY_THRESHOLD):
+                logger.warning(
+                    "Statement ran %d times in one request, possibly an N+1: %s",
+                    count,
+                    LazySQL(query),
+                )
+            logger.debug("%d queries took %.2f ms", stats.count, stats.seconds * 1000)
@@ -0,0 +1,57 @@
+import logging
+from typing import Any, Awaitable, Callable, Hashable, Iterable
+
+from databases import Database
+from fastapi import Response
+from pydantic import BaseModel
+from sqlalchemy import Table, select
+
+from api.config import config
+from api.database import table_version_table
+from api.utils.cache_helpers import ResponseCache
+
+logger = logging.getLogger(__name__)
+
+response_cache = ResponseCache(config.RESPONSE_CACHE_MAX_BYTES)
+
+
+async def table_versions(db: Database, tables: Iterable[Table]) -> tuple[int, ...]:
+    """Current write stamps of ``tables``.
+
+    Triggers bump them in the transaction of every write (see
+    api.migrations), whichever process or connection makes it."""
+    names = [table.name for table in tables]
+    query = select(table_version_table).where(
+        table_version_table.c.table_name.in_(names)
+    )
+    versions = {row.table_name: row.version for row in await db.fetch_all(query)}
+    return tuple(versions.get(name, 0) for name in names)
+
+
+async def cached_response(
+    db: Database,
+    key: tuple[Hashable, ...],
+    tables: tuple[Table, ...],
+    response_model: type[BaseModel],
+    build: Callable[[], Awaitable[Any]],
+) -> Response:
+    """Return the cached JSON body for ``key`` or build, validate and cache it.
+
+    The table versions are read before ``build`` runs, so a write committing
+    while it runs leaves the new entry under a version that is already gone."""
+    key = (*key, await table_versions(db, tables))
+
+    body = response_cache.get(key)
+    if body is not None:
+        return Response(body, media_type="application/json", headers={"X-Cache": "HIT"})
+
+    result = await build()
+    body = (
+        response_model.model_validate(result, from_attributes=True)
+        .model_dump_json()
+        .encode()
+    )
+    response_cache.set(key, body)
+
+    logger.debug("Cached %d bytes for %s", len(body), key)
+    return Response(body, media_type="application/json", headers={"X-Cache": "MISS"})
@@ -0,0 +1,120 @@
+import logging
+
+from databases import Database
+from sqlalchemy import Table, distinct, func
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.sql import Select, select
+
+from api.database import (
+    order_item_table,
+    order_table,
+    product_table,
+    sales_by_category_table,
+    sales_by_day_table,
+    sales_by_product_table,
+)
+from api.utils.logging_helpers import log_sql
+from api.utils.order_helpers import line_total
+
+logger = logging.getLogger(__name__)
+
+# Orders aggregated per statement when rebuilding from history
+REBUILD_CHUNK_SIZE = 10_000
+
+ROLLUP_TABLES = (sales_by_day_table, sales_by_product_table, sales_by_category_table)
+
+units = func.coalesce(func.sum(order_item_table.c.quantity), 0)
+revenue_cents = func.coalesce(func.sum(line_total), 0)
+
+
+def add_to_rollup(table: Table, query: Select):
+    """INSERT the rows of ``query`` into ``table``, adding them to the
+    counters of rows that are already there."""
+    key = [column.name for column in table.primary_key]
+    columns = [column.name for column in table.columns]
+    statement = insert(table).from_select(columns, query)
+    return statement.on_conflict_do_update(
+        index_elements=key,
+        set_={
+            name: table.c[name] + statement.excluded[name]
+            for name in columns
+            if name not in key
+        },
+    )
+
+
+def rollup_statements(first_order_id: int, last_order_id: int) -> list:
+    """Statements adding the orders with ids from ``first_order_id`` to
+    ``last_order_id`` to every rollup table.
+
+    Products are attributed to the category they are in when this runs,
+    items of deleted products only count towards days and products."""
+    orders = order_table.c.id.between(first_order_id, last_order_id)
+    items = order_item_table.c.order_id.between(first_order_id, last_order_id)
+
+    by_day = (
+        select(
+            func.date(order_table.c.order_date).label("day"),
+            func.count(distinct(order_table.c.id)),
+            units,
+            revenue_cents,
+        )
+        .select_from(
+            order_table.outerjoin(
+                order_item_table, order_item_table.c.order_id == order_table.c.id
+            )
+        )
+        .where(orders)
+        .group_by("day")
+    )
+    by_product = (
+        select(order_item_table.c.product_id, units, revenue_cents)
+        .where(items)
+        .group_by(order_item_table.c.product_id)
+    )
+    by_category = (
+        select(product_table.c.category_id, units, revenue_cents)
+        .select_from(
+            order_item_table.join(
+                product_table, product_table.c.id == order_item_table.c.product_id
+            )
+        )
+        .where(items)
+        .group_by(product_table.c.category_id)
+    )
+
+    return [
+        add_to_rollup(sales_by_day_table, by_day),
+        add_to_rollup(sales_by_product_table, by_product),
+        add_to_rollup(sales_by_category_table, by_category),
+    ]
+
+
+async def update_rollups(db: Database, first_order_id: int, last_order_id: int) -> None:
+    """Add newly created orders to the rollups. Run it in the transaction
+    inserting them, so reports never see an order twice or not at all."""
+    for statement in rollup_statements(first_order_id, last_order_id):
+        log_sql(logger, statement)
+        await db.execute(statement)
+
+
+async def rebuild_rollups(db: Database) -> int:
+    """Recompute every rollup from the full order history and return the
+    number of orders it covers."""
+    async with db.transaction():
+        for table in ROLLUP_TABLES:
+            await db.execute(table.delete())
+
+        bounds = await db.fetch_one(
+            select(func.min(order_table.c.id), func.max(order_table.c.id))
+        )
+        first, last = bounds[0], bounds[1]
+        if first is None:
+            return 0
+
+        for start in range(first, last + 1, REBUILD_CHUNK_SIZE):
+            end = min(start + REBUILD_CHUNK_SIZE - 1, last)
+            logger.info(f"Rolling up orders {start} to {end}")
+            await update_rollups(db, start, end)
+
+        return await db.fetch_val(select(func.count()).select_from(order_table))
@@ -0,0 +1,37 @@
+import logging
+import re
+from typing import Optional
+
+from sqlalchemy import func, literal_column, sql
+from sqlalchemy.sql import Select
+
+from api.database import product_search_table, product_table
+
+logger = logging.getLogger(__name__)
+
+SEARCH_DESCRIPTION = (
+    "Full-text search over product name, description and category name. "
+    "Results are ranked by relevance unless `sort` is given."
+)
+
+
+def build_match_expression(q: str) -> Optional[str]:
+    """Turn free text into an FTS5 query where every word must match as a
+    prefix. Quoting each word keeps FTS5 operators in the input inert."""
+    words = re.findall(r"\w+", q)
+    if not words:
+        return None
+    return " ".join(f'"{word}"*' for word in words)
+
+
+def apply_search(q: str, query: Select) -> Select:
+    logger.info("Applying full-text search to Select query")
+    match = build_match_expression(q)
+    fts = literal_column(product_search_table.name)
+
+    query = query.add_columns(func.bm25(fts).label("rank")).join(
+        product_search_table, product_search_table.c.rowid == product_table.c.id
+    )
+    if match is None:
+        return query.where(sql.false())
+    return query.where(fts.op("MATCH")(match))
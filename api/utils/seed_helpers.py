@@ -0,0 +1,292 @@
+import logging
+import random
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+from itertools import accumulate, islice
+from typing import AsyncIterator, Iterable, Iterator
+
+from aiosqlite import Connection as RawConnection
+from databases import Database
+from sqlalchemy import Table
+
+from api.database import (
+    category_table,
+    order_item_table,
+    order_table,
+    product_table,
+    row_count_table,
+    user_table,
+)
+from api.models.user import UserRole
+from api.security import get_password_hash
+from api.utils.rollup_helpers import rebuild_rollups
+
+logger = logging.getLogger(__name__)
+
+# Rows per executemany call, large enough to amortize the trip to the
+# aiosqlite thread and small enough to keep a batch of tuples in memory
+LOAD_BATCH_SIZE = 50_000
+
+# Only for the duration of a load: a crash mid-load may corrupt the file
+BULK_LOAD_PRAGMAS = {
+    "synchronous": "OFF",
+    "cache_size": -256 * 1024,
+    "temp_store": "MEMORY",
+}
+
+WORDS = ["apple", "chair", "lamp", "table", "shirt", "phone", "bottle", "desk"]
+
+
+@dataclass
+class SeedPlan:
+    """How many rows of every kind to add and how to shape them."""
+
+    categories: int = 50
+    products: int = 100_000
+    users: int = 10_000
+    orders: int = 100_000
+    max_items: int = 5
+    # Exponent of the Zipf law picking the products of order items
+    popularity: float = 1.1
+    days: int = 365
+    sellers_every: int = 100
+    password: str = "password"
+    seed: int = 0
+
+
+def insert_sql(table: Table, columns: list[str]) -> str:
+    placeholders = ", ".join("?" * len(columns))
+    return f"INSERT INTO {table.name} ({', '.join(columns)}) VALUES ({placeholders})"
+
+
+async def load_rows(
+    raw: RawConnection, table: Table, columns: list[str], rows: Iterable[tuple]
+) -> int:
+    """executemany ``rows`` into ``table`` in batches of LOAD_BATCH_SIZE."""
+    sql = insert_sql(table, columns)
+    rows = iter(rows)
+    count = 0
+    while batch := list(islice(rows, LOAD_BATCH_SIZE)):
+        await raw.executemany(sql, batch)
+        count += len(batch)
+    return count
+
+
+async def next_id(raw: RawConnection, table: Table) -> int:
+    [(last,)] = await raw.execute_fetchall(f"SELECT max(id) FROM {table.name}")
+    return (last or 0) + 1
+
+
+@asynccontextmanager
+async def bulk_load_pragmas(raw: RawConnection) -> AsyncIterator[None]:
+    # The safety level cannot change inside a transaction, loading into one
+    # that is already open (as in the tests) goes with the current settings
+    if raw.in_transaction:
+        yield
+        return
+
+    previous = {}
+    for name, value in BULK_LOAD_PRAGMAS.items():
+        [(previous[name],)] = await raw.execute_fetchall(f"PRAGMA {name}")
+        await raw.execute(f"PRAGMA {name} = {value}")
+    try:
+        yield
+    finally:
+        for name, value in previous.items():
+            await raw.execute(f"PRAGMA {name} = {value}")
+
+
+@asynccontextmanager
+async def deferred_product_search(raw: RawConnection) -> AsyncIterator[None]:
+    """Index products inserted in the block with one INSERT ... SELECT instead
+    of the per-row trigger, then put the trigger back. Run it in a
+    transaction so no other writer sees the trigger missing."""
+    [(trigger,)] = await raw.execute_fetchall(
+        "SELECT sql FROM sqlite_master WHERE type = 'trigger' "
+        "AND name = 'products_fts_insert'"
+    )
+    first = await next_id(raw, product_table)
+    await raw.execute("DROP TRIGGER products_fts_insert")
+    yield
+    await raw.execute(
+        """
+        INSERT INTO products_fts (rowid, name, description, category_name)
+        SELECT products.id, products.name, products.description, categories.name
+        FROM products JOIN categories ON products.category_id = categories.id
+        WHERE products.id >= ?
+        """,
+        (first,),
+    )
+    await raw.execute(trigger)
+
+
+def category_rows(first_id: int, count: int) -> Iterator[tuple]:
+    for category_id in range(first_id, first_id + count):
+        yield category_id, f"Category {category_id}"
+
+
+def product_rows(
+    rng: random.Random, first_id: int, count: int, category_ids: list[int]
+) -> Iterator[tuple]:
+    for product_id in range(first_id, first_id + count):
+        words = rng.sample(WORDS, 3)
+        yield (
+            product_id,
+            f"{words[0].title()} {words[1]} {product_id}",
+            f"{words[1]} {words[2]} {rng.choice(WORDS)}",
+            rng.randint(100, 100_000),
+            rng.choice(category_ids),
+        )
+
+
+def user_rows(plan: SeedPlan, first_id: int, password_hash: str) -> Iterator[tuple]:
+    for user_id in range(first_id, first_id + plan.users):
+        role = UserRole.seller if user_id % plan.sellers_every == 0 else UserRole.client
+        yield user_id, f"user{user_id}@example.com", password_hash, True, role.value
+
+
+def order_rows(
+    rng: random.Random,
+    plan: SeedPlan,
+    first_id: int,
+    customer_ids: list[int],
+    prices: dict[int, int],
+) -> Iterator[tuple[tuple, list[tuple]]]:
+    """Orders with their items. A few products take most of the items: the
+    one of popularity rank r is picked with a weight of 1 / r**popularity."""
+    ranked = list(prices)
+    rng.shuffle(ranked)
+    weights = list(
+        accumulate(1 / rank**plan.popularity for rank in range(1, len(ranked) + 1))
+    )
+    # Dates are spread over the days before the load, the same on any given day
+    today = datetime.combine(date.today(), time())
+
+    for order_id in range(first_id, first_id + plan.orders):
+        products = set(
+            rng.choices(ranked, cum_weights=weights, k=rng.randint(1, plan.max_items))
+        )
+        items = [
+            (order_id, product_id, rng.randint(1, 5), prices[product_id])
+            for product_id in products
+        ]
+        order_date = today - timedelta(minutes=rng.randrange(plan.days * 24 * 60))
+        yield (
+            (
+                order_id,
+                "1 Main St",
+                order_date.isoformat(" "),
+                (order_date + timedelta(days=7)).isoformat(" "),
+                sum(quantity * price for _, _, quantity, price in items),
+                rng.choice(customer_ids),
+            ),
+            items,
+        )
+
+
+async def load_orders(
+    raw: RawConnection, orders: Iterator[tuple[tuple, list[tuple]]]
+) -> tuple[int, int]:
+    order_columns = [
+        "id",
+        "delivery_address",
+        "order_date",
+        "payment_due_date",
+        "total_cents",
+        "customer_id",
+    ]
+    item_columns = ["order_id", "product_id", "quantity", "unit_price_cents"]
+    order_count = item_count = 0
+    while batch := list(islice(orders, LOAD_BATCH_SIZE)):
+        order_count += await load_rows(
+            raw, order_table, order_columns, (order for order, _ in batch)
+        )
+        item_count += await load_rows(
+            raw,
+            order_item_table,
+            item_columns,
+            (item for _, items in batch for item in items),
+        )
+    return order_count, item_count
+
+
+async def seed_database(db: Database, plan: SeedPlan) -> dict[str, int]:
+    """Add the rows of ``plan`` to the database and return how many went
+    into every table.
+
+    Everything is loaded in one transaction on one connection, with
+    BULK_LOAD_PRAGMAS. New rows get ids after the existing ones, and products,
+    users and orders draw on the existing categories, users and products as
+    well as the new ones. The rollups and row counts are rebuilt afterwards."""
+    rng = random.Random(plan.seed)
+    # Every user shares one hash, bcrypt costs a quarter of a second per call
+    password_hash = get_password_hash(plan.password)
+    counts = {}
+
+    async with db.connection() as connection:
+        raw = connection.raw_connection
+        async with bulk_load_pragmas(raw):
+            async with connection.transaction():
+                counts["categories"] = await load_rows(
+                    raw,
+                    category_table,
+                    ["id", "name"],
+                    category_rows(await next_id(raw, category_table), plan.categories),
+                )
+                category_ids = [
+                    row[0]
+                    for row in await raw.execute_fetchall("SELECT id FROM categories")
+                ]
+                if plan.products and not category_ids:
+                    raise ValueError("Products need at least one category")
+
+                async with deferred_product_search(raw):
+                    counts["products"] = await load_rows(
+                        raw,
+                        product_table,
+                        ["id", "name", "description", "price_cents", "category_id"],
+                        product_rows(
+                            rng,
+                            await next_id(raw, product_table),
+                            plan.products,
+                            category_ids,
+                        ),
+                    )
+
+                counts["users"] = await load_rows(
+                    raw,
+                    user_table,
+                    ["id", "email", "password", "confirmed", "role"],
+                    user_rows(plan, await next_id(raw, user_table), password_hash),
+                )
+
+                if plan.orders:
+                    prices = dict(
+                        await raw.execute_fetchall(
+                            "SELECT id, price_cents FROM products"
+                        )
+                    )
+                    customer_ids = [
+                        row[0]
+                        for row in await raw.execute_fetchall("SELECT id FROM users")
+                    ]
+                    if not prices or not customer_ids:
+                        raise ValueError("Orders need at least one product and user")
+                    counts["orders"], counts["order_items"] = await load_orders(
+                        raw,
+                        order_rows(
+                            rng,
+                            plan,
+                            await next_id(raw, order_table),
+                            customer_ids,
+                            prices,
+                        ),
+                    )
+
+    logger.info(f"Loaded {counts}, rebuilding the rollups")
+    if plan.orders:
+        await rebuild_rollups(db)
+    # Recounted from the tables the next time they are read
+    await db.execute(row_count_table.delete())
+    return counts
@@ -8,7 +8,8 @@ logger = logging.getLogger(__name__)
 
 
 def apply_sorting(sort_field: dict[str, Any], query: Select):
+    # Ties keep insertion order whichever index SQLite walks to sort
     if sort_field.startswith("-"):
-        return query.order_by(desc(sort_field[1:]))
+        return query.order_by(desc(sort_field[1:]), "id")
     else:
-        return query.order_by(sort_field)
+        return query.order_by(sort_field, "id")
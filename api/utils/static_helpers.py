@@ -0,0 +1,198 @@
+import logging
+import os
+import re
+from pathlib import Path
+from typing import Optional
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+CONTENT_HASH = re.compile(r"[0-9a-f]{64}")
+
+# A content-addressed name changes whenever the bytes do
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "public, no-cache"
+
+ZEROCOPY_SEND = "http.response.zerocopysend"
+
+
+def content_hash(path: str) -> Optional[str]:
+    stem = Path(path).name.split(".")[0]
+    return stem if CONTENT_HASH.fullmatch(stem) else None
+
+
+def cache_control(path: str) -> str:
+    if content_hash(path):
+        return IMMUTABLE_CACHE_CONTROL
+    return REVALIDATE_CACHE_CONTROL
+
+
+def parse_byte_range(value: str, size: int) -> Optional[tuple[int, int]]:
+    """Return the inclusive first and last byte of a single ``bytes`` range.
+
+    Anything else, including multiple ranges, gives None and is answered with
+    the whole file. A first byte at or past ``size`` is not satisfiable."""
+    unit, _, ranges = value.partition("=")
+    if unit.strip().lower() != "bytes" or "," in ranges:
+        return None
+
+    first, separator, last = ranges.strip().partition("-")
+    if not separator:
+        return None
+
+    try:
+        if first:
+            first, last = int(first), int(last) if last else None
+            if first < 0 or (last is not None and last < first):
+                return None
+            return first, size - 1 if last is None else min(last, size - 1)
+
+        suffix = int(last)
+        if suffix <= 0:
+            return None
+        return max(size - suffix, 0), size - 1
+    except ValueError:
+        return None
+
+
+class RangeFileResponse(FileResponse):
+    """FileResponse for the inclusive byte range ``first``-``last`` of the file.
+
+    Servers that implement the ASGI zero-copy send extension get the file
+    descriptor and hand the copying to ``sendfile``."""
+
+    def __init__(
+        self,
+        path: str,
+        stat_result: os.stat_result,
+        first: int,
+        last: int,
+        status_code: int = 200,
+        headers: Optional[dict[str, str]] = None,
+        method: Optional[str] = None,
+    ) -> None:
+        headers = {**(headers or {}), "content-length": str(last - first + 1)}
+        super().__init__(
+            path,
+            status_code=status_code,
+            headers=headers,
+            stat_result=stat_result,
+            method=method,
+        )
+        self.first = first
+        self.last = last
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send(
+            {
+                "type": "http.response.start",
+                "status": self.status_code,
+                "headers": self.raw_headers,
+            }
+        )
+
+        count = self.last - self.first + 1
+        if self.send_header_only or count <= 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        elif ZEROCOPY_SEND in scope.get("extensions", {}):
+            with open(self.path, "rb") as file:
+                await send(
+                    {
+                        "type": ZEROCOPY_SEND,
+                        "file": file,
+                        "offset": self.first,
+                        "count": count,
+                        "more_body": False,
+                    }
+                )
+        else:
+            async with await anyio.open_file(self.path, mode="rb") as file:
+                if self.first:
+                    await file.seek(self.first)
+                while count > 0:
+                    chunk = await file.read(min(self.chunk_size, count))
+                    count -= len(chunk)
+                    more_body = count > 0 and len(chunk) > 0
+                    await send(
+                        {
+                            "type": "http.response.body",
+                            "body": chunk,
+                            "more_body": more_body,
+                        }
+                    )
+                    if not more_body:
+                        break
+
+        if self.background is not None:
+            await self.background()
+
+
+class ImageFiles(StaticFiles):
+    """StaticFiles for uploaded images and thumbnails.
+
+    Content-addressed files are cached as immutable with their digest as the
+    ETag, anything else is revalidated. Single byte ranges are honoured."""
+
+    def file_response(
+        self,
+        full_path: str,
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        request_headers = Headers(scope=scope)
+        method = scope["method"]
+        size = stat_result.st_size
+
+        headers = {"accept-ranges": "bytes", "cache-control": cache_control(full_path)}
+        if digest := content_hash(full_path):
+            headers["etag"] = f'"{digest}"'
+
+        response = RangeFileResponse(
+            full_path, stat_result, 0, size - 1, status_code, headers, method
+        )
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+
+        requested = request_headers.get("range")
+        # A stale If-Range means the client's partial copy is of another file
+        if_range = request_headers.get("if-range", response.headers["etag"])
+        if (
+            status_code != 200
+            or requested is None
+            or if_range != response.headers["etag"]
+        ):
+            return response
+
+        byte_range = parse_byte_range(requested, size)
+        if byte_range is None:
+            return response
+
+        first, last = byte_range
+        if first >= size:
+            return Response(
+                status_code=416,
+                headers={**headers, "content-range": f"bytes */{size}"},
+            )
+
+        headers["content-range"] = f"bytes {first}-{last}/{size}"
+        return RangeFileResponse(
+            full_path, stat_result, first, last, 206, headers, method
+        )
+
+    def is_not_modified(
+        self, response_headers: Headers, request_headers: Headers
+    ) -> bool:
+        # If-None-Match may list several tags and takes precedence over dates
+        if_none_match = request_headers.get("if-none-match")
+        if if_none_match is None:
+            return super().is_not_modified(response_headers, request_headers)
+
+        etag = response_headers["etag"].removeprefix("W/")
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tags or etag in tags
@@ -0,0 +1,23 @@
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from databases import Database
+from databases.core import Transaction
+
+# A write matching no rows: all it does is take the write lock of the database
+TAKE_WRITE_LOCK = "UPDATE row_counts SET row_count = row_count WHERE 0"
+
+
+@asynccontextmanager
+async def write_transaction(db: Database) -> AsyncIterator[Transaction]:
+    """``db.transaction()`` holding the write lock from its first statement.
+
+    databases opens SQLite transactions with a deferred BEGIN, so a block
+    reading before it writes, or a trigger reading another table, first takes
+    a shared lock and then has to upgrade it. SQLite fails that upgrade with
+    "database is locked" as soon as another connection is writing instead of
+    waiting for it. Writing first makes the transaction wait its turn under
+    the busy timeout, the way BEGIN IMMEDIATE would."""
+    async with db.transaction() as transaction:
+        await db.execute(TAKE_WRITE_LOCK)
+        yield transaction